@@ -0,0 +1,251 @@
+# NM_ann.py
+"""
+Similarity search backends for the recommender.
+
+Every backend answers candidates(query): the catalog rows worth scoring
+for a unit-length query vector, or None for "every row".
+
+  exact : scores the whole catalog (the default, same results as before)
+  ivf   : inverted-file index. Rows are clustered with spherical k-means
+          into n_lists lists; a query only scores the rows of the n_probe
+          lists whose centroids are closest to it. Work per query is about
+          n_lists + n_rows * n_probe / n_lists instead of n_rows.
+
+n_probe is the recall/latency knob: n_probe = n_lists is exact search.
+
+    python NM_ann.py --n-probe 1 2 4 8 --k 10             # current catalog
+    python NM_ann.py --synthetic 1000000 --n-probe 4 16   # generated catalog
+"""
+import argparse
+import time
+
+import numpy as np
+
+from NM_neighbors import unit_rows
+
+# ---------------------------------------------------
+# IVF CONFIG
+# ---------------------------------------------------
+DEFAULT_N_PROBE = 8
+KMEANS_ITERS = 10
+KMEANS_SAMPLE = 100_000    # rows the centroids are fitted on
+ASSIGN_BLOCK = 16_384      # rows per (block x n_lists) assignment product
+
+
+def default_n_lists(n_rows):
+    return max(1, int(np.sqrt(n_rows)))
+
+
+# ---------------------------------------------------
+# BACKENDS
+# ---------------------------------------------------
+class ExactIndex:
+    """
+    Brute force: every row is a candidate.
+    """
+
+    name = "exact"
+    approximate = False
+
+    def __init__(self, X_unit):
+        self.n_rows = len(X_unit)
+
+    def candidates(self, query, n_probe=None):
+        return None
+
+    def describe(self):
+        return "exact"
+
+
+class IVFIndex:
+    """
+    Inverted-file index over unit-length rows (dot product = cosine).
+
+    centroids : (n_lists, d) unit centroids
+    lists     : CSR layout of row ids per list (offsets / rows)
+    """
+
+    name = "ivf"
+    approximate = True
+
+    def __init__(self, X_unit, n_lists=None, n_probe=DEFAULT_N_PROBE,
+                 n_iter=KMEANS_ITERS, sample=KMEANS_SAMPLE, seed=0):
+        X_unit = np.asarray(X_unit, dtype=float)
+        self.n_rows = len(X_unit)
+        n_lists = min(n_lists or default_n_lists(self.n_rows), max(self.n_rows, 1))
+        self.n_probe = n_probe
+
+        rng = np.random.default_rng(seed)
+        self.centroids = self._fit(X_unit, n_lists, n_iter, sample, rng)
+
+        assign = self._assign(X_unit)
+        order = np.argsort(assign, kind="stable")
+        self.list_rows = order
+        self.list_offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(assign, minlength=len(self.centroids))))
+        )
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def _assign(self, X):
+        """
+        Nearest centroid of every row, in blocks to bound memory.
+        """
+        assign = np.empty(len(X), dtype=np.int64)
+        for start in range(0, len(X), ASSIGN_BLOCK):
+            block = X[start:start + ASSIGN_BLOCK]
+            assign[start:start + ASSIGN_BLOCK] = np.argmax(block @ self.centroids.T, axis=1)
+        return assign
+
+    def _fit(self, X, n_lists, n_iter, sample, rng):
+        """
+        Spherical k-means on a row sample. Empty lists keep their centroid.
+        """
+        if len(X) > sample:
+            X = X[rng.choice(len(X), sample, replace=False)]
+        if len(X) == 0:
+            return np.zeros((1, X.shape[1]))
+
+        self.centroids = X[rng.choice(len(X), n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assign = self._assign(X)
+            counts = np.bincount(assign, minlength=n_lists)
+            sums = np.column_stack([
+                np.bincount(assign, weights=X[:, j], minlength=n_lists)
+                for j in range(X.shape[1])
+            ])
+            filled = counts > 0
+            self.centroids[filled] = unit_rows(sums[filled])
+        return self.centroids
+
+    def candidates(self, query, n_probe=None):
+        """
+        Sorted row ids in the n_probe lists nearest to query.
+        """
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        if n_probe >= self.n_lists:
+            return None
+
+        scores = self.centroids @ np.asarray(query, dtype=float)
+        probe = np.argpartition(-scores, n_probe - 1)[:n_probe]
+        rows = [self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]] for l in probe]
+        return np.sort(np.concatenate(rows))
+
+    def describe(self):
+        return f"ivf (n_lists={self.n_lists}, n_probe={self.n_probe})"
+
+
+BACKENDS = {"exact": ExactIndex, "ivf": IVFIndex}
+
+
+def make_index(name, X_unit, **params):
+    """
+    Build the backend registered under name.
+    """
+    if name not in BACKENDS:
+        raise ValueError(
+            f"unknown similarity backend {name!r}; choose from {', '.join(BACKENDS)}"
+        )
+    return BACKENDS[name](X_unit, **params)
+
+
+# ---------------------------------------------------
+# RECALL REPORT
+# ---------------------------------------------------
+def _top_k(sims, k):
+    k = min(k, len(sims))
+    if k == 0:
+        return np.empty(0, dtype=int)
+    top = np.argpartition(-sims, k - 1)[:k]
+    return top[np.argsort(-sims[top], kind="stable")]
+
+
+def recall_at_k(X_unit, index, k=10, n_queries=200, n_probe=None, seed=0):
+    """
+    Recall@k of index against exact search, over random catalog rows used
+    as queries (the row itself excluded). A returned row counts as a hit
+    when its similarity reaches the exact k-th best, so ties do not count
+    as misses. Also reports mean query time and the share of rows scored.
+    """
+    X_unit = np.asarray(X_unit, dtype=float)
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(X_unit), min(n_queries, len(X_unit)), replace=False)
+
+    hits = scanned = 0
+    exact_s = ann_s = 0.0
+    for q in queries:
+        t0 = time.perf_counter()
+        sims = X_unit @ X_unit[q]
+        sims[q] = -np.inf
+        exact = _top_k(sims, k)
+        exact_s += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        cand = index.candidates(X_unit[q], n_probe)
+        if cand is None:
+            cand = np.arange(len(X_unit))
+        cand = cand[cand != q]
+        found = cand[_top_k(X_unit[cand] @ X_unit[q], k)]
+        ann_s += time.perf_counter() - t0
+
+        if len(exact):
+            kth = sims[exact[-1]]
+            hits += min(int((sims[found] >= kth - 1e-12).sum()), len(exact))
+        scanned += len(cand)
+
+    n = max(len(queries), 1)
+    return {
+        "k": k,
+        "recall": hits / max(n * min(k, len(X_unit) - 1), 1),
+        "scanned": scanned / n / max(len(X_unit), 1),
+        "exact_ms": 1000 * exact_s / n,
+        "ann_ms": 1000 * ann_s / n,
+    }
+
+
+def synthetic_catalog(n_rows, n_features=6, n_groups=200, seed=0):
+    """
+    Unit rows drawn around n_groups directions, like food categories.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_groups, n_features))
+    X = centers[rng.integers(0, n_groups, n_rows)] + 0.3 * rng.normal(size=(n_rows, n_features))
+    return unit_rows(X)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@K of the IVF backend against exact search.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-lists", type=int, default=None)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[1, 2, 4, DEFAULT_N_PROBE, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument(
+        "--synthetic", type=int, default=None,
+        help="use a generated catalog of this many rows instead of the nutrition CSV"
+    )
+    args = parser.parse_args()
+
+    if args.synthetic:
+        X_unit = synthetic_catalog(args.synthetic)
+    else:
+        from NM_recommender import load_catalog
+        catalog = load_catalog()
+        mean, std = catalog.normalization()
+        X_unit = unit_rows((catalog.features - mean) / std)
+
+    t0 = time.perf_counter()
+    index = IVFIndex(X_unit, n_lists=args.n_lists)
+    print(f"Rows: {len(X_unit):,}   lists: {index.n_lists:,}   "
+          f"build: {time.perf_counter() - t0:.2f}s")
+
+    print(f"{'n_probe':>8} {'recall@' + str(args.k):>10} {'scanned':>9} {'exact ms':>9} {'ivf ms':>8}")
+    for n_probe in args.n_probe:
+        r = recall_at_k(X_unit, index, args.k, args.queries, n_probe)
+        print(f"{n_probe:>8} {r['recall']:>10.3f} {r['scanned']:>8.1%} "
+              f"{r['exact_ms']:>9.3f} {r['ann_ms']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
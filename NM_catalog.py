@@ -0,0 +1,273 @@
+# NM_catalog.py
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from NM_neighbors import source_fingerprint
+
+# ---------------------------------------------------
+# BINARY ARTIFACT CONFIG
+# ---------------------------------------------------
+ARTIFACT_VERSION = 1
+ARTIFACT_ARRAYS = ("foods", "features", "codes")
+
+
+def artifact_path_for(csv_path):
+    """
+    The binary catalog lives next to the nutrition CSV it was built from.
+    """
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + ".catalog")
+
+
+# ---------------------------------------------------
+# FOOD RECORD (one catalog row)
+# ---------------------------------------------------
+class FoodRecord:
+    """
+    Lightweight read-only view of one catalog row.
+
+    Supports record["protein"] / record.get(...) like the pandas rows it
+    replaces, without materializing a Series.
+    """
+
+    __slots__ = ("catalog", "food_id")
+
+    def __init__(self, catalog, food_id):
+        self.catalog = catalog
+        self.food_id = food_id
+
+    def __getitem__(self, key):
+        if key == "food":
+            return self.catalog.foods[self.food_id]
+        return float(self.catalog.column(key)[self.food_id])
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return ["food"] + self.catalog.feature_names
+
+    def to_dict(self):
+        return {k: self[k] for k in self.keys()}
+
+    def __repr__(self):
+        return f"FoodRecord({self.food_id}, {self.to_dict()})"
+
+
+# ---------------------------------------------------
+# FOOD CATALOG
+# ---------------------------------------------------
+class FoodCatalog:
+    """
+    Read-only columnar nutrition catalog.
+
+    foods    : food name per row (object or fixed-width str array)
+    features : contiguous float64 matrix, one column per feature name
+    codes    : int code per row; rows sharing a name share a code
+
+    A food id is the row position. Names map to the first row carrying
+    them, matching the old nutrition_df[nutrition_df["food"] == name]
+    .iloc[0] lookups. The name index is built on first lookup.
+    """
+
+    def __init__(self, foods, features, feature_names, codes=None, mean=None, std=None):
+        self.foods = foods if isinstance(foods, np.ndarray) else np.asarray(foods, dtype=object)
+        self.features = np.ascontiguousarray(features, dtype=np.float64)
+        self.features.setflags(write=False)
+        self.feature_names = list(feature_names)
+
+        self._columns = {name: j for j, name in enumerate(self.feature_names)}
+
+        if codes is None:
+            codes, _ = pd.factorize(self.foods)
+        self.codes = codes
+        self.codes.setflags(write=False)
+
+        self._mean = mean
+        self._std = std
+        self._rows = None
+        self._ids_by_name = None
+        self._version = None
+
+    @classmethod
+    def from_frame(cls, df, feature_names):
+        return cls(df["food"].to_numpy(), df[feature_names].to_numpy(), feature_names)
+
+    @property
+    def _ids(self):
+        if self._ids_by_name is None:
+            self._rows = pd.Series(np.arange(len(self.foods))).groupby(self.codes).indices
+            self._ids_by_name = {
+                str(self.foods[rows[0]]): int(rows[0])
+                for code, rows in self._rows.items() if code >= 0
+            }
+        return self._ids_by_name
+
+    def normalization(self):
+        """
+        Per-feature (mean, std) used to z-score the features.
+        """
+        if self._mean is None:
+            self._mean = self.features.mean(axis=0)
+            self._std = self.features.std(axis=0)
+        return self._mean, self._std
+
+    @property
+    def version(self):
+        """
+        Content hash of names and features; changes whenever the catalog does.
+        """
+        if self._version is None:
+            h = hashlib.sha1()
+            h.update("\0".join(self.feature_names).encode("utf-8"))
+            h.update("\0".join(map(str, self.foods)).encode("utf-8"))
+            h.update(self.features.tobytes())
+            self._version = h.hexdigest()[:16]
+        return self._version
+
+    def __len__(self):
+        return len(self.foods)
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def names(self):
+        """
+        Distinct food names, in catalog order.
+        """
+        return list(self._ids)
+
+    def food_id(self, name, default=None):
+        return self._ids.get(name, default)
+
+    def ids_of(self, name):
+        """
+        Every row carrying this name (empty if unknown).
+        """
+        food_id = self._ids.get(name)
+        if food_id is None:
+            return np.empty(0, dtype=int)
+        return self._rows[self.codes[food_id]]
+
+    def column(self, name):
+        return self.features[:, self._columns[name]]
+
+    def row(self, food_id):
+        return FoodRecord(self, food_id)
+
+    def lookup(self, name):
+        """
+        Record for a food name, or None if the name is unknown.
+        """
+        food_id = self._ids.get(name)
+        return None if food_id is None else FoodRecord(self, food_id)
+
+    def to_frame(self, rows=None):
+        rows = slice(None) if rows is None else rows
+        df = pd.DataFrame(self.features[rows], columns=self.feature_names)
+        df.insert(0, "food", self.foods[rows])
+        if not isinstance(rows, slice):
+            df.index = rows
+        return df
+
+    # ---------------------------------------------------
+    # BINARY ARTIFACT (.npy arrays + meta.json)
+    # ---------------------------------------------------
+    def save(self, path, source_path=None):
+        """
+        Write the catalog as plain .npy arrays plus a meta.json holding the
+        format version, feature names and normalization stats. meta.json is
+        written last, so a half-written artifact never loads.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        meta_path = path / "meta.json"
+        if meta_path.exists():
+            meta_path.unlink()
+
+        # fixed-width strings instead of an object array: loads without pickle
+        np.save(path / "foods.npy", np.asarray(self.foods, dtype=str))
+        np.save(path / "features.npy", self.features)
+        np.save(path / "codes.npy", np.asarray(self.codes))
+
+        mean, std = self.normalization()
+        meta = {
+            "version": ARTIFACT_VERSION,
+            "n_rows": len(self),
+            "feature_names": self.feature_names,
+            "mean": mean.tolist(),
+            "std": std.tolist(),
+            "catalog_version": self.version,
+            "source_sha1": source_fingerprint(source_path) if source_path else None,
+        }
+        meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load an artifact written by save(); arrays are memory-mapped.
+        """
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        mode = "r" if mmap else None
+        arrays = {
+            name: np.load(path / f"{name}.npy", mmap_mode=mode)
+            for name in ARTIFACT_ARRAYS
+        }
+
+        catalog = cls(
+            arrays["foods"], arrays["features"], meta["feature_names"],
+            codes=arrays["codes"],
+            mean=np.asarray(meta["mean"]),
+            std=np.asarray(meta["std"]),
+        )
+        catalog._version = meta["catalog_version"]
+        return catalog
+
+
+def check_catalog_artifact(path, source_path=None, feature_names=None, source_sha1=None):
+    """
+    Return (ok, reason). The artifact is stale when the source CSV changed
+    since it was written, or when it has another format or feature set.
+    source_sha1 is source_fingerprint(source_path) when the caller already
+    has it.
+    """
+    meta_path = Path(path) / "meta.json"
+    if not meta_path.exists():
+        return False, f"missing: {path}"
+
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except Exception as e:
+        return False, f"unreadable: {e}"
+
+    if meta.get("version") != ARTIFACT_VERSION:
+        return False, "artifact format version changed"
+
+    if feature_names is not None and meta.get("feature_names") != list(feature_names):
+        return False, "feature set changed"
+
+    if source_sha1 is None and source_path is not None and Path(source_path).exists():
+        source_sha1 = source_fingerprint(source_path)
+    if source_sha1 is not None and meta.get("source_sha1") != source_sha1:
+        return False, "nutrition CSV changed since build"
+
+    return True, "fresh"
+
+
+def load_catalog_artifact(path, source_path=None, feature_names=None, source_sha1=None):
+    """
+    Memory-mapped catalog, or None if the artifact is missing or stale.
+    """
+    ok, _ = check_catalog_artifact(path, source_path, feature_names, source_sha1)
+    if not ok:
+        return None
+    return FoodCatalog.load(path)
@@ -1,46 +1,39 @@
 import pandas as pd
-import json
-import gzip
+
+from NM_columnar import write_table
+from NM_ingest import read_jsonl_columns
+from NM_normalize import join_categories, lower_strip
 
 meta_path = "C:/Users/Chandu/Downloads/meta_Grocery_and_Gourmet_Food.jsonl.gz"
-meta = []
-with gzip.open(meta_path, "rt", encoding="utf-8") as f:
-    for line in f:
-        meta.append(json.loads(line))
-meta_df = pd.DataFrame(meta)
-
-print("Meta columns:", meta_df.columns.tolist())
-
-working = meta_df.copy()
-
-if "parent_asin" in working.columns:
-    working = working.rename(columns={"parent_asin": "asin"})
-
-for col in ["asin", "title", "description", "main_category", "categories", "price", "features"]:
-    if col not in working.columns:
-        working[col] = None  
-
-def clean_categories(cat):
-    if isinstance(cat, list) and len(cat) > 0:
-        try:
-            if isinstance(cat[0], list):
-                return " > ".join([str(x) for x in cat[0]])
-            else:
-                return " > ".join([str(x) for x in cat])
-        except Exception:
-            return str(cat)
-    elif isinstance(cat, str):
-        return cat
-    else:
-        return None
-
-working.loc[:, "categories_clean"] = working["categories"].apply(clean_categories)
-
-clean_meta = working.loc[:, ["asin", "title", "description", "main_category", "categories_clean", "price", "features"]].copy()
-clean_meta = clean_meta.rename(columns={"categories_clean": "categories"})
-
-clean_meta.loc[:, "title_clean"] = clean_meta["title"].fillna("").astype(str).str.lower().str.strip()
-clean_meta.loc[:, "desc_clean"] = clean_meta["description"].fillna("").astype(str).str.lower().str.strip()
-
-clean_meta.to_csv("C:/Users/Chandu/OneDrive/Desktop/NutriMatch/clean_metadata.csv", index=False)
-print("Saved clean_metadata.csv with rows:", len(clean_meta))
+
+META_FIELDS = ["parent_asin", "asin", "title", "description", "main_category", "categories", "price", "features"]
+
+
+def main():
+    meta_df = pd.DataFrame(read_jsonl_columns(meta_path, fields=META_FIELDS, label="metadata"))
+
+    print("Meta columns:", meta_df.columns.tolist())
+
+    working = meta_df.copy()
+
+    if "parent_asin" in working.columns:
+        working = working.rename(columns={"parent_asin": "asin"})
+
+    for col in ["asin", "title", "description", "main_category", "categories", "price", "features"]:
+        if col not in working.columns:
+            working[col] = None  
+
+    working.loc[:, "categories_clean"] = join_categories(working["categories"], keep_strings=True)
+
+    clean_meta = working.loc[:, ["asin", "title", "description", "main_category", "categories_clean", "price", "features"]].copy()
+    clean_meta = clean_meta.rename(columns={"categories_clean": "categories"})
+
+    clean_meta.loc[:, "title_clean"] = lower_strip(clean_meta["title"])
+    clean_meta.loc[:, "desc_clean"] = lower_strip(clean_meta["description"])
+
+    write_table(clean_meta, "C:/Users/Chandu/OneDrive/Desktop/NutriMatch/clean_metadata.parquet")
+    print("Saved clean_metadata.parquet with rows:", len(clean_meta))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# NM_columnar.py
+import shutil
+import zlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# ---------------------------------------------------
+# DATASET CONFIG
+# ---------------------------------------------------
+# Rows are hive-partitioned by a hash bucket of their ASIN
+# (<root>/asin_bucket=<n>/part-*.parquet), so a lookup for a few ASINs
+# opens only the buckets they fall in.
+BUCKET_COLUMN = "asin_bucket"
+N_BUCKETS = 16
+COMPRESSION = "zstd"
+
+STRING = pa.string()
+LABEL = pa.dictionary(pa.int8(), pa.string())
+
+# Declared column types. Columns not listed keep their numeric dtype, or
+# are stored as strings (nested values included, as the CSVs did).
+COLUMN_TYPES = {
+    # metadata
+    "asin": STRING,
+    "parent_asin": STRING,
+    "title": STRING,
+    "description": STRING,
+    "main_category": STRING,
+    "categories": STRING,
+    "categories_clean": STRING,
+    "features": STRING,
+    "price": STRING,           # listing price as in the source ("$3.99")
+    "average_rating": pa.float64(),
+    "rating_number": pa.int64(),
+    "title_clean": STRING,
+    "desc_clean": STRING,
+    # reviews
+    "user_id": STRING,
+    "text": STRING,
+    "review_text": STRING,
+    "summary": STRING,
+    "review_time": STRING,
+    "review_clean": STRING,
+    "rating": pa.float64(),
+    "overall": pa.float64(),
+    "helpful_vote": pa.int64(),
+    "timestamp": pa.int64(),
+    "unixReviewTime": pa.int64(),
+    "verified": pa.bool_(),
+    "verified_purchase": pa.bool_(),
+    "reviewText": STRING,
+    "reviewTime": STRING,
+    "reviewerID": STRING,
+    "reviewerName": STRING,
+    "vote": STRING,            # "1,234" in the 2018 dumps
+    "style": STRING,
+    "image": STRING,
+    "images": STRING,
+    "sentiment": LABEL,
+    "review_id": pa.int64(),
+    # review aggregates
+    "top_review_ids": pa.list_(pa.int64()),
+    # food links
+    "food": STRING,
+    "score": pa.float64(),
+}
+
+# Tables whose price went through NM_normalize.clean_price (clean_meta)
+PRICED_COLUMN_TYPES = {**COLUMN_TYPES, "price": pa.float64()}
+
+
+def asin_buckets(asins, n_buckets=N_BUCKETS):
+    """
+    Partition bucket per ASIN (CRC-32, so it is stable across runs).
+    """
+    return np.fromiter(
+        (zlib.crc32(str(a).encode("utf-8")) % n_buckets for a in asins),
+        dtype=np.int16,
+    )
+
+
+# ---------------------------------------------------
+# SCHEMA / CONVERSION
+# ---------------------------------------------------
+def infer_schema(df, column_types=COLUMN_TYPES):
+    fields = []
+    for name, values in df.items():
+        if name in column_types:
+            type_ = column_types[name]
+        elif values.isna().all():
+            # nothing to infer from (e.g. a field the first chunk lacks)
+            type_ = STRING
+        elif pd.api.types.is_bool_dtype(values):
+            type_ = pa.bool_()
+        elif pd.api.types.is_numeric_dtype(values):
+            type_ = pa.from_numpy_dtype(values.dtype)
+        else:
+            type_ = STRING
+        fields.append(pa.field(name, type_))
+    return pa.schema(fields)
+
+
+def _as_strings(values):
+    return values.astype(object).where(values.isna(), values.astype(str))
+
+
+def _to_numeric(values, name):
+    """
+    values as numbers; missing and blank values become null, anything
+    else that does not parse raises ValueError.
+    """
+    parsed = pd.to_numeric(values, errors="coerce")
+    bad = parsed.isna() & values.notna()
+    if bad.any():
+        bad &= values[bad].astype(str).str.strip() != ""
+        if bad.any():
+            raise ValueError(
+                f"column {name!r}: {int(bad.sum())} values are not numbers "
+                f"(first: {values[bad].iloc[0]!r})"
+            )
+    return parsed
+
+
+def to_arrow(df, schema):
+    """
+    Cast df to schema. Missing columns become null; a value that does not
+    fit a numeric column raises ValueError instead of being dropped.
+    """
+    columns = []
+    for field in schema:
+        values = df[field.name] if field.name in df else pd.Series(None, index=df.index, dtype=object)
+
+        if pa.types.is_floating(field.type) or pa.types.is_integer(field.type):
+            values = _to_numeric(values, field.name)
+        elif pa.types.is_boolean(field.type):
+            values = values.map(lambda v: None if pd.isna(v) else bool(v))
+        elif pa.types.is_list(field.type):
+            pass
+        else:
+            values = _as_strings(values)
+
+        columns.append(pa.array(values, type=field.type, from_pandas=True))
+
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+# ---------------------------------------------------
+# WRITE
+# ---------------------------------------------------
+class PartitionedWriter:
+    """
+    Appends DataFrame chunks to an ASIN-partitioned Parquet dataset.
+
+    The schema is fixed by the first chunk (declared types from
+    COLUMN_TYPES, the rest inferred), so every part file lines up.
+    An existing dataset at root is replaced.
+    """
+
+    def __init__(self, root, key="asin", column_types=COLUMN_TYPES):
+        self.root = Path(root)
+        self.key = key
+        self.column_types = column_types
+        self.schema = None
+        self.n_parts = 0
+        self.n_rows = 0
+
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        self.root.mkdir(parents=True)
+
+    def write(self, df):
+        if self.schema is None:
+            self.schema = infer_schema(df, self.column_types)
+
+        table = to_arrow(df, self.schema)
+
+        if table.num_rows == 0:
+            # write_dataset writes no file for no rows; keep the schema readable
+            if self.n_rows == 0:
+                bucket_dir = self.root / f"{BUCKET_COLUMN}=0"
+                bucket_dir.mkdir(exist_ok=True)
+                pq.write_table(
+                    table, bucket_dir / f"part-{self.n_parts:05d}-empty.parquet",
+                    compression=COMPRESSION
+                )
+                self.n_parts += 1
+            return
+
+        table = table.append_column(
+            BUCKET_COLUMN, pa.array(asin_buckets(df[self.key]), type=pa.int16())
+        )
+
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([(BUCKET_COLUMN, pa.int16())]), flavor="hive"
+            ),
+            basename_template=f"part-{self.n_parts:05d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression=COMPRESSION
+            ),
+        )
+        self.n_parts += 1
+        self.n_rows += len(df)
+
+
+def write_table(df, root, key="asin", column_types=COLUMN_TYPES):
+    """
+    Write one DataFrame as a partitioned dataset.
+    """
+    writer = PartitionedWriter(root, key=key, column_types=column_types)
+    writer.write(df)
+    return writer.root
+
+
+# ---------------------------------------------------
+# READ
+# ---------------------------------------------------
+def read_table(root, columns=None, asins=None, key="asin"):
+    """
+    Load a dataset written by PartitionedWriter as a DataFrame.
+
+    Rows come back grouped by ASIN bucket, not in the order they were
+    written; sort on a column when the order matters.
+
+    columns : only these columns are read from disk (None = all but the
+              partition column)
+    asins   : only rows for these ASINs; other buckets are never opened
+    """
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != BUCKET_COLUMN]
+
+    row_filter = None
+    if asins is not None:
+        asins = sorted({str(a) for a in asins})
+        buckets = sorted({int(b) for b in asin_buckets(asins)})
+        row_filter = ds.field(BUCKET_COLUMN).isin(buckets) & ds.field(key).isin(asins)
+
+    return dataset.to_table(columns=list(columns), filter=row_filter).to_pandas()
@@ -0,0 +1,283 @@
+# NM_cooccur.py
+"""
+Item-item co-occurrence model built from the interaction log.
+
+  R : users x foods, summed interaction weight per (user, food)
+  C : foods x foods, C = R.T @ R (weighted co-occurrence)
+
+Both are scipy.sparse CSR matrices indexed by database ids (users.user_id,
+foods.food_id). New interactions are folded in incrementally: with D the
+new events, (R + D).T @ (R + D) = C + D.T @ R + R.T @ D + D.T @ D, and only
+the rows of users present in D take part. The model remembers the last
+interaction_id it consumed and is persisted next to the database.
+
+The similarity of foods i and j is the cosine C[i, j] / sqrt(C[i, i] C[j, j]),
+so popular foods do not dominate every row.
+
+    python NM_cooccur.py             # fold in new interactions and save
+    python NM_cooccur.py --rebuild   # rebuild from the whole log
+    python NM_cooccur.py --check
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+import db
+
+# ---------------------------------------------------
+# MODEL CONFIG
+# ---------------------------------------------------
+MODEL_VERSION = 1
+READ_CHUNK = 1_000_000     # interactions read from SQLite per step
+SAVE_EVERY = 10_000        # new events folded in before refresh() saves
+
+
+def model_path_for(db_path):
+    """
+    The model lives next to the database it was built from.
+    """
+    db_path = Path(db_path)
+    return db_path.with_name(db_path.stem + ".cooccur.npz")
+
+
+def _resized(m, shape):
+    m = m.tocsr()
+    if m.shape != shape:
+        m.resize(shape)
+    return m
+
+
+# ---------------------------------------------------
+# MODEL
+# ---------------------------------------------------
+class CooccurrenceModel:
+    """
+    Sparse user x food and food x food matrices plus the id of the last
+    interaction folded into them.
+    """
+
+    def __init__(self, R=None, C=None, last_id=0):
+        self.R = sp.csr_matrix((0, 0)) if R is None else R.tocsr()
+        self.C = sp.csr_matrix((0, 0)) if C is None else C.tocsr()
+        self.last_id = last_id
+        self.unsaved = 0
+        self.refreshed_at = 0.0
+        self._diag = self.C.diagonal()
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.last_id
+
+    @property
+    def n_foods(self):
+        return self.C.shape[0]
+
+    def update(self, users, foods, weights):
+        """
+        Fold events (parallel arrays of user ids, food ids, weights) into
+        R and C.
+        """
+        users = np.asarray(users, dtype=np.int64)
+        foods = np.asarray(foods, dtype=np.int64)
+        if len(users) == 0:
+            return
+
+        n_users = max(self.R.shape[0], int(users.max()) + 1)
+        n_foods = max(self.C.shape[0], int(foods.max()) + 1)
+
+        D = sp.csr_matrix(
+            (np.asarray(weights, dtype=float), (users, foods)),
+            shape=(n_users, n_foods)
+        )
+        R = _resized(self.R.copy(), (n_users, n_foods))
+
+        touched = np.unique(users)
+        D_t, R_t = D[touched], R[touched]
+        cross = (D_t.T @ R_t).tocsr()
+        C = _resized(self.C.copy(), (n_foods, n_foods)) + cross + cross.T + (D_t.T @ D_t)
+        C.sort_indices()
+
+        R = R + D
+        diag = C.diagonal()
+        with self._lock:
+            self.R, self.C, self._diag = R, C, diag
+
+    def similar_items(self, food_id):
+        """
+        (food_ids, cosine similarities) of the foods co-occurring with
+        food_id, itself excluded. Empty for unknown foods.
+        """
+        with self._lock:
+            C, diag = self.C, self._diag
+
+        if food_id is None or not 0 <= food_id < C.shape[0] or diag[food_id] <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        start, end = C.indptr[food_id], C.indptr[food_id + 1]
+        ids = C.indices[start:end].astype(np.int64)
+        sims = C.data[start:end] / np.sqrt(diag[food_id] * diag[ids])
+
+        keep = (ids != food_id) & (sims > 0)
+        return ids[keep], sims[keep]
+
+    # ---------------------------------------------------
+    # INCREMENTAL REFRESH FROM SQLITE
+    # ---------------------------------------------------
+    def refresh(self, path=None, chunk_size=READ_CHUNK):
+        """
+        Fold in interactions logged since last_id (by any process). Saves
+        to path once SAVE_EVERY events are unsaved. Returns the number of
+        new events.
+        """
+        added = 0
+        with db.connection() as conn:
+            max_id = conn.execute("SELECT MAX(interaction_id) FROM interactions").fetchone()[0] or 0
+            if max_id < self.last_id:
+                raise ValueError("interaction log is behind the model; rebuild it")
+
+            while True:
+                rows = conn.execute(
+                    """
+                    SELECT interaction_id, user_id, food_id, interaction_weight
+                    FROM interactions
+                    WHERE interaction_id > ?
+                    ORDER BY interaction_id
+                    LIMIT ?
+                    """,
+                    (self.last_id, chunk_size)
+                ).fetchall()
+                if not rows:
+                    break
+
+                ids, users, foods, weights = zip(*rows)
+                self.update(users, foods, weights)
+                self.last_id = ids[-1]
+                added += len(rows)
+
+        self.unsaved += added
+        self.refreshed_at = time.monotonic()
+        if path is not None and self.unsaved >= SAVE_EVERY:
+            self.save(path)
+        return added
+
+    # ---------------------------------------------------
+    # PERSISTENCE
+    # ---------------------------------------------------
+    def save(self, path):
+        """
+        Write R, C and meta to one .npz, replacing the old file atomically.
+        """
+        path = Path(path)
+        meta = {
+            "version": MODEL_VERSION,
+            "last_interaction_id": int(self.last_id),
+            "n_users": int(self.R.shape[0]),
+            "n_foods": int(self.C.shape[0]),
+        }
+        arrays = {"meta": np.array(json.dumps(meta))}
+        for name, m in (("R", self.R), ("C", self.C)):
+            arrays[f"{name}_data"] = m.data
+            arrays[f"{name}_indices"] = m.indices
+            arrays[f"{name}_indptr"] = m.indptr
+            arrays[f"{name}_shape"] = np.array(m.shape)
+
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        self.unsaved = 0
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != MODEL_VERSION:
+                raise ValueError("model format version changed")
+
+            R, C = (
+                sp.csr_matrix(
+                    (data[f"{n}_data"], data[f"{n}_indices"], data[f"{n}_indptr"]),
+                    shape=tuple(data[f"{n}_shape"])
+                )
+                for n in ("R", "C")
+            )
+
+        return cls(R, C, meta["last_interaction_id"])
+
+
+def load_cooccurrence(path=None):
+    """
+    The persisted model brought up to date with the interaction log, or
+    a model rebuilt from the whole log when the file is missing, stale
+    or unreadable.
+    """
+    path = Path(path or model_path_for(db.DB_PATH))
+
+    model = None
+    if path.exists():
+        try:
+            model = CooccurrenceModel.load(path)
+            model.refresh(path)
+        except Exception as e:
+            print(f"⚠ Rebuilding co-occurrence model ({e})")
+            model = None
+
+    if model is None:
+        model = CooccurrenceModel()
+        model.refresh()
+        model.save(path)
+
+    return model
+
+
+# ---------------------------------------------------
+# MAINTENANCE COMMAND
+# ---------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Update the item co-occurrence model.")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild from the whole log")
+    parser.add_argument(
+        "--check", action="store_true",
+        help="only report how far the saved model is behind the log"
+    )
+    args = parser.parse_args()
+
+    path = model_path_for(db.DB_PATH)
+
+    if args.check:
+        if not path.exists():
+            print(f"⚠ missing: {path}")
+            return
+        model = CooccurrenceModel.load(path)
+        with db.connection() as conn:
+            behind = conn.execute(
+                "SELECT COUNT(*) FROM interactions WHERE interaction_id > ?",
+                (model.last_id,)
+            ).fetchone()[0]
+        print(("✅ " if behind == 0 else "⚠ ") + f"{behind} interactions not folded in")
+        return
+
+    t0 = time.perf_counter()
+    if args.rebuild or not path.exists():
+        model = CooccurrenceModel()
+        added = model.refresh()
+    else:
+        model = CooccurrenceModel.load(path)
+        added = model.refresh()
+    model.save(path)
+
+    print(f"✅ Folded in {added:,} interactions in {time.perf_counter() - t0:.2f}s "
+          f"({model.R.shape[0]:,} users x {model.n_foods:,} foods, "
+          f"{model.C.nnz:,} co-occurring pairs) -> {path}")
+
+
+if __name__ == "__main__":
+    main()
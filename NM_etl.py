@@ -0,0 +1,250 @@
+# NM_etl.py
+"""
+One entry point for the Amazon ETL: each source dump is decompressed and
+parsed once per run and its records are fanned out to every stale output.
+
+    python NM_etl.py            # rebuild stale outputs only
+    python NM_etl.py --check    # report what is stale, build nothing
+    python NM_etl.py --force merge clean_meta
+
+Stage fingerprints (stage version + source size/mtime + upstream stage
+fingerprints) are kept in etl_manifest.json next to the outputs; a stage
+is rebuilt when its fingerprint changed or one of its outputs is missing.
+"""
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from NM_clean_meta import build_clean_meta, cols_we_need
+from NM_clean_reviews import clean_review_rows
+from NM_columnar import PRICED_COLUMN_TYPES, PartitionedWriter, read_table, write_table
+from NM_phase2_clean_merge import (
+    CHUNK_SIZE, META_FIELDS, META_PATH, OUT_DIR, REV_PATH,
+    ReviewMerger, build_clean_metadata, iter_review_chunks, load_metadata,
+    open_sentiment_cache,
+)
+
+# ---------------------------------------------------
+# STAGES
+# ---------------------------------------------------
+# Bump a stage's version when its code changes so its outputs (and every
+# stage downstream of it) are rebuilt. Stages are listed in build order.
+STAGES = {
+    "clean_metadata": {
+        "version": 2,              # 2: raw price kept as text
+        "sources": ["meta"],
+        "deps": [],
+        "outputs": ["clean_metadata.parquet"],
+    },
+    "clean_meta": {
+        "version": 1,
+        "sources": ["meta"],
+        "deps": [],
+        "outputs": ["clean_meta.parquet"],
+    },
+    "clean_reviews": {
+        "version": 1,
+        "sources": ["reviews"],
+        "deps": [],
+        "outputs": ["clean_reviews.parquet"],
+    },
+    "merge": {
+        "version": 2,              # 2: review columns from the dump layout
+        "sources": ["reviews"],
+        "deps": ["clean_metadata"],
+        "outputs": [
+            "filtered_reviews.parquet",
+            "merged_reviews_metadata.parquet",
+            "review_stats.parquet",
+        ],
+    },
+}
+
+MANIFEST_NAME = "etl_manifest.json"
+
+# metadata fields decoded in the single metadata pass (union over stages)
+ETL_META_FIELDS = list(dict.fromkeys(META_FIELDS + cols_we_need))
+
+
+def source_stamp(path):
+    """
+    Size and mtime of a source dump. Hashing a multi-GB gzip would cost
+    the very pass this module avoids.
+    """
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def stage_fingerprints(sources, stages=STAGES):
+    """
+    sources: {"meta": path, "reviews": path}
+    """
+    stamps = {name: source_stamp(path) for name, path in sources.items()}
+    fingerprints = {}
+    for name, stage in stages.items():
+        key = {
+            "version": stage["version"],
+            "sources": {s: stamps[s] for s in stage["sources"]},
+            "deps": {d: fingerprints[d] for d in stage["deps"]},
+        }
+        fingerprints[name] = hashlib.sha1(
+            json.dumps(key, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+    return fingerprints
+
+
+def load_manifest(out_dir):
+    path = Path(out_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(out_dir, manifest):
+    path = Path(out_dir) / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def stale_stages(out_dir, fingerprints, manifest, force=()):
+    """
+    {stage: reason} for every stage that needs a rebuild.
+    """
+    stale = {}
+    for name, stage in STAGES.items():
+        upstream = [d for d in stage["deps"] if d in stale]
+        if name in force:
+            stale[name] = "forced"
+        elif upstream:
+            stale[name] = f"upstream {', '.join(upstream)} rebuilt"
+        elif manifest.get(name) != fingerprints[name]:
+            stale[name] = "inputs or version changed"
+        else:
+            missing = [o for o in stage["outputs"] if not (Path(out_dir) / o).exists()]
+            if missing:
+                stale[name] = f"missing {', '.join(missing)}"
+    return stale
+
+
+# ---------------------------------------------------
+# RUN
+# ---------------------------------------------------
+def run(out_dir=OUT_DIR, meta_path=META_PATH, rev_path=REV_PATH,
+        force=(), chunk_size=CHUNK_SIZE):
+    """
+    Rebuild the stale stages, reading each source at most once.
+    Returns the names of the rebuilt stages.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    out = Path(out_dir)
+
+    fingerprints = stage_fingerprints({"meta": meta_path, "reviews": rev_path})
+    manifest = load_manifest(out_dir)
+    stale = stale_stages(out_dir, fingerprints, manifest, force)
+
+    if not stale:
+        print("✅ All ETL outputs are up to date")
+        return []
+
+    for name, reason in stale.items():
+        print(f"⚠ {name}: {reason}")
+
+    def done(name):
+        manifest[name] = fingerprints[name]
+        save_manifest(out_dir, manifest)
+
+    # ---------- metadata: one pass ----------
+    clean_meta = None
+    if {"clean_metadata", "clean_meta"} & stale.keys():
+        print("\n========== METADATA PASS ==========\n")
+        meta_df = load_metadata(meta_path, fields=ETL_META_FIELDS)
+        print("Metadata rows:", len(meta_df))
+
+        if "clean_metadata" in stale:
+            clean_meta = build_clean_metadata(meta_df)
+            write_table(clean_meta, out / "clean_metadata.parquet")
+            print("✔ clean_metadata:", len(clean_meta), "rows")
+            done("clean_metadata")
+
+        if "clean_meta" in stale:
+            priced = build_clean_meta(meta_df)
+            write_table(
+                priced, out / "clean_meta.parquet", key="parent_asin",
+                column_types=PRICED_COLUMN_TYPES
+            )
+            print("✔ clean_meta:", len(priced), "rows")
+            done("clean_meta")
+
+        del meta_df
+
+    # ---------- reviews: one pass, fanned out ----------
+    if {"clean_reviews", "merge"} & stale.keys():
+        print("\n========== REVIEWS PASS ==========\n")
+
+        cleaner = None
+        if "clean_reviews" in stale:
+            cleaner = PartitionedWriter(out / "clean_reviews.parquet")
+
+        merger = sentiment_cache = None
+        if "merge" in stale:
+            if clean_meta is None:
+                clean_meta = read_table(out / "clean_metadata.parquet")
+            sentiment_cache = open_sentiment_cache()
+            merger = ReviewMerger(clean_meta, out_dir, sentiment_cache)
+
+        for chunk in iter_review_chunks(rev_path, chunk_size):
+            if cleaner is not None:
+                cleaner.write(clean_review_rows(chunk))
+            if merger is not None:
+                merger.add(chunk)
+            del chunk
+
+        if cleaner is not None:
+            print("✔ clean_reviews:", cleaner.n_rows, "rows")
+            done("clean_reviews")
+
+        if merger is not None:
+            merger.finish()
+            if sentiment_cache is not None:
+                sentiment_cache.close()
+            done("merge")
+
+    return list(stale)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Amazon review/metadata ETL.")
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--meta", default=META_PATH, help="metadata .jsonl.gz dump")
+    parser.add_argument("--reviews", default=REV_PATH, help="reviews .jsonl.gz dump")
+    parser.add_argument(
+        "--force", nargs="+", default=[], choices=list(STAGES),
+        help="rebuild these stages even if they are fresh"
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="only report which stages are stale"
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        stale = stale_stages(
+            args.out_dir,
+            stage_fingerprints({"meta": args.meta, "reviews": args.reviews}),
+            load_manifest(args.out_dir),
+            args.force
+        )
+        for name in STAGES:
+            print(("⚠ " if name in stale else "✅ ") + f"{name}: {stale.get(name, 'fresh')}")
+        return
+
+    rebuilt = run(args.out_dir, args.meta, args.reviews, force=args.force)
+    if rebuilt:
+        print("\n✅ Rebuilt:", ", ".join(rebuilt))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# NM_ingest.py
+"""
+Parallel reader for the gzip JSONL dumps.
+
+The parent decompresses the file and cuts it into newline-aligned blocks;
+worker processes decode the blocks and hand back only the requested
+fields as column batches ({field: [values]}), in file order.
+pd.DataFrame(batch) gives the same frame as pd.DataFrame(list_of_dicts)
+restricted to those fields.
+
+orjson is used for decoding when installed, json otherwise.
+"""
+import atexit
+import gzip
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+try:
+    import orjson
+    _loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    _loads = json.loads
+    JSON_BACKEND = "json"
+
+# ---------------------------------------------------
+# READER CONFIG
+# ---------------------------------------------------
+BLOCK_BYTES = 4 << 20      # decompressed bytes per worker task
+INFLIGHT_PER_WORKER = 2    # blocks queued per worker (bounds parent memory)
+PROGRESS_EVERY = 200_000   # lines between progress messages
+
+
+def _open(path):
+    path = str(path)
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def iter_blocks(path, block_bytes=BLOCK_BYTES):
+    """
+    Decompressed file content in blocks of about block_bytes, each ending
+    on a line boundary.
+    """
+    rest = b""
+    with _open(path) as f:
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                break
+            data = rest + data
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                rest = data
+                continue
+            yield data[:cut]
+            rest = data[cut:]
+
+    if rest:
+        yield rest
+
+
+# ---------------------------------------------------
+# DECODING (runs in the workers)
+# ---------------------------------------------------
+def decode_block(block, fields=None):
+    """
+    Decode one block of JSON lines.
+
+    Returns (n_rows, n_lines, n_errors, columns). columns holds the fields
+    seen in the block (all keys when fields is None); rows lacking a field
+    get None. Malformed lines and non-object values are counted and skipped.
+    """
+    columns = {}
+    n_rows = n_lines = n_errors = 0
+
+    for line in block.split(b"\n"):
+        if not line.strip():
+            continue
+        n_lines += 1
+
+        try:
+            record = _loads(line)
+        except ValueError:
+            n_errors += 1
+            continue
+        if not isinstance(record, dict):
+            n_errors += 1
+            continue
+
+        keys = record if fields is None else [f for f in fields if f in record]
+        for key in keys:
+            if key not in columns:
+                columns[key] = [None] * n_rows
+        for key, values in columns.items():
+            values.append(record.get(key))
+        n_rows += 1
+
+    return n_rows, n_lines, n_errors, columns
+
+
+def concat_batches(batches):
+    """
+    Join (n_rows, columns) batches into one; fields missing from a batch
+    are filled with None.
+    """
+    total = 0
+    out = {}
+    for n_rows, columns in batches:
+        for key in columns:
+            if key not in out:
+                out[key] = [None] * total
+        for key, values in out.items():
+            values.extend(columns[key] if key in columns else [None] * n_rows)
+        total += n_rows
+    return total, out
+
+
+# ---------------------------------------------------
+# PROCESS POOL
+# ---------------------------------------------------
+_pool = None
+_pool_workers = 0
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        _shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        _pool_workers = workers
+    return _pool
+
+
+def _shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+atexit.register(_shutdown_pool)
+
+
+def _map_ordered(fn, items, workers):
+    """
+    map(fn, items) over the pool, in order, with a bounded number of
+    blocks in flight.
+    """
+    if workers <= 1:
+        yield from map(fn, items)
+        return
+
+    pool = _get_pool(workers)
+    window = workers * INFLIGHT_PER_WORKER
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+# ---------------------------------------------------
+# PUBLIC READERS
+# ---------------------------------------------------
+def iter_jsonl_batches(path, fields=None, workers=None, block_bytes=BLOCK_BYTES):
+    """
+    Yield (n_rows, n_lines, n_errors, columns) per decoded block, in file
+    order. workers defaults to os.cpu_count(); workers=1 decodes in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    fields = None if fields is None else tuple(fields)
+    decode = partial(decode_block, fields=fields)
+    yield from _map_ordered(decode, iter_blocks(path, block_bytes), workers)
+
+
+def iter_jsonl_chunks(path, chunk_size, fields=None, workers=None, label=None):
+    """
+    Column batches of at least chunk_size rows (the whole file in one
+    batch when chunk_size is None). With a label, progress and the number
+    of skipped lines are printed.
+    """
+    pending = []
+    n_pending = 0
+    n_lines = n_errors = 0
+    next_report = PROGRESS_EVERY
+
+    for n_rows, lines, errors, columns in iter_jsonl_batches(path, fields, workers):
+        n_lines += lines
+        n_errors += errors
+        if label and n_lines >= next_report:
+            print(f"Loaded {n_lines:,} {label}...")
+            next_report = (n_lines // PROGRESS_EVERY + 1) * PROGRESS_EVERY
+
+        pending.append((n_rows, columns))
+        n_pending += n_rows
+        if chunk_size and n_pending >= chunk_size:
+            yield concat_batches(pending)[1]
+            pending = []
+            n_pending = 0
+
+    if n_pending:
+        yield concat_batches(pending)[1]
+
+    if label and n_errors:
+        print(f"⚠ Skipped {n_errors:,} malformed {label} lines")
+
+
+def read_jsonl_columns(path, fields=None, workers=None, label=None):
+    """
+    The whole file as one column batch.
+    """
+    for columns in iter_jsonl_chunks(path, None, fields, workers, label):
+        return columns
+    return {}
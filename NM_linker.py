@@ -0,0 +1,519 @@
+# NM_linker.py
+"""
+Links Amazon products (clean_metadata title_clean) to nutrition catalog
+foods, so reviews and sentiment can be attached to a recommended food.
+
+Food names are tokenized into an inverted index (token -> foods). A
+product is scored only against foods sharing at least one of its tokens;
+title tokens missing from the index are matched to food tokens through a
+character n-gram index. A food's score is the share of its idf-weighted
+name tokens found in the title, so every food of a title is covered in
+one sparse join instead of an all-pairs string comparison.
+
+    python NM_linker.py            # link new / changed products only
+    python NM_linker.py --check    # report whether the links are fresh
+    python NM_linker.py --force    # relink everything
+
+The food <-> asin table is written as food_links.parquet next to the ETL
+outputs, with the title hashes and food names it was built from, so a
+rerun only scores products whose title changed, plus, when foods were
+added or removed, the products whose title tokens lead to a food whose
+token weights changed. A change of the linker settings relinks every
+product.
+"""
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import scipy.sparse as sp
+
+from NM_columnar import read_table, write_table
+
+# ---------------------------------------------------
+# LINKER CONFIG
+# ---------------------------------------------------
+# Bump when scoring or tokenization changes so saved links are rebuilt.
+LINKER_VERSION = 2
+
+MIN_TOKEN_LEN = 2          # shorter tokens (and all-digit ones) are ignored
+NGRAM = 3                  # character n-gram size for fuzzy token matches
+FUZZY_MIN_LEN = 4          # shorter title tokens only match exactly
+FUZZY_MIN_SIM = 0.75       # n-gram Dice similarity for a fuzzy token match
+MIN_SCORE = 0.75           # share of a food's name a title must cover
+IDF_REFERENCE = 1000       # idf = log(1 + IDF_REFERENCE / df); no catalog size
+                           # term, so a new food reweights only foods sharing
+                           # one of its tokens
+TOP_K = 3                  # foods kept per product
+
+CHUNK_TITLES = 20_000      # titles per worker task
+
+LINKS_NAME = "food_links.parquet"
+TITLES_NAME = "food_links_titles.parquet"
+META_NAME = "food_links.json"
+
+
+# ---------------------------------------------------
+# TOKENIZATION
+# ---------------------------------------------------
+def tokenize(texts):
+    """
+    (rows, tokens): the lower-cased [a-z0-9] runs of every text, with a
+    plural "s" dropped, as parallel arrays. rows[i] is the position of the
+    text tokens[i] came from. Short and all-digit tokens are left out.
+    """
+    arr = pa.array(pd.Series(texts, dtype=object).fillna("").astype(str), type=pa.string())
+    lists = pc.split_pattern_regex(pc.utf8_lower(arr), r"[^a-z0-9]+")
+
+    tokens = pc.list_flatten(lists)
+    rows = pc.list_parent_indices(lists)
+
+    keep = pc.and_(
+        pc.greater_equal(pc.utf8_length(tokens), MIN_TOKEN_LEN),
+        pc.invert(pc.match_substring_regex(tokens, r"^[0-9]+$")),
+    )
+    tokens = pc.replace_substring_regex(tokens.filter(keep), r"^([a-z]{2,}[^s])s$", r"\1")
+    rows = rows.filter(keep)
+
+    return (
+        rows.to_numpy().astype(np.int64),
+        tokens.to_numpy(zero_copy_only=False),
+    )
+
+
+def char_grams(token):
+    padded = f" {token} "
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+# ---------------------------------------------------
+# FOOD INDEX
+# ---------------------------------------------------
+class FoodIndex:
+    """
+    Inverted index over food names.
+
+    vocab    : distinct food tokens, sorted
+    postings : vocab x foods CSR matrix, a token's share of each food's
+               idf weight
+    grams    : character n-gram -> vocab token ids, for fuzzy matches
+    """
+
+    def __init__(self, foods):
+        self.foods = np.asarray(list(foods), dtype=object)
+        n_foods = len(self.foods)
+
+        rows, tokens = tokenize(self.foods)
+        codes, vocab = pd.factorize(tokens, sort=True)
+        self.vocab = np.asarray(vocab, dtype=object)
+        self.token_ids = {t: i for i, t in enumerate(self.vocab)}
+        n_vocab = len(self.vocab)
+
+        pairs = np.unique(rows * n_vocab + codes)
+        food_ids, token_ids = pairs // n_vocab, pairs % n_vocab
+
+        df = np.bincount(token_ids, minlength=n_vocab)
+        idf = np.log1p(IDF_REFERENCE / np.maximum(df, 1))
+        weights = idf[token_ids]
+        weights = weights / np.bincount(food_ids, weights=weights, minlength=n_foods)[food_ids]
+
+        # more tokens = more specific name, preferred among equal scores
+        self.n_tokens = np.bincount(food_ids, minlength=n_foods)
+
+        self.postings = sp.csr_matrix(
+            (weights, (token_ids, food_ids)), shape=(n_vocab, n_foods)
+        )
+
+        grams = {}
+        for token_id, token in enumerate(self.vocab):
+            for gram in char_grams(token):
+                grams.setdefault(gram, []).append(token_id)
+        self.grams = {g: np.array(ids) for g, ids in grams.items()}
+        self.gram_counts = np.array([len(char_grams(t)) for t in self.vocab])
+
+        self._matches = {}
+
+    def __len__(self):
+        return len(self.foods)
+
+    def weight_table(self):
+        """
+        DataFrame (food, token, weight): every food name token and its share
+        of the food's idf weight.
+        """
+        entries = self.postings.tocoo()
+        return pd.DataFrame({
+            "food": self.foods[entries.col].astype(str),
+            "token": self.vocab[entries.row],
+            "weight": entries.data,
+        }).drop_duplicates(["food", "token"])
+
+    def match_token(self, token):
+        """
+        (vocab id, similarity) of the food token standing in for a title
+        token; (-1, 0.0) when none is close enough. Memoized.
+        """
+        match = self._matches.get(token)
+        if match is not None:
+            return match
+
+        token_id = self.token_ids.get(token)
+        if token_id is not None:
+            match = (token_id, 1.0)
+        elif len(token) < FUZZY_MIN_LEN:
+            match = (-1, 0.0)
+        else:
+            grams = char_grams(token)
+            hits = [self.grams[g] for g in grams if g in self.grams]
+            match = (-1, 0.0)
+            if hits:
+                ids, shared = np.unique(np.concatenate(hits), return_counts=True)
+                sims = 2 * shared / (len(grams) + self.gram_counts[ids])
+                best = int(np.argmax(sims))
+                if sims[best] >= FUZZY_MIN_SIM:
+                    match = (int(ids[best]), float(sims[best]))
+
+        self._matches[token] = match
+        return match
+
+    def link_titles(self, titles, min_score=MIN_SCORE, top_k=TOP_K):
+        """
+        (rows, food ids, scores) for the top_k foods of every title scoring
+        at least min_score; rows index titles. Ordered by row, then best
+        first.
+        """
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+        rows, tokens = tokenize(titles)
+        if len(rows) == 0 or len(self.vocab) == 0:
+            return empty
+
+        codes, distinct = pd.factorize(tokens)
+        matches = np.array([self.match_token(t) for t in distinct]).reshape(-1, 2)
+        token_ids = matches[codes, 0].astype(np.int64)
+        sims = matches[codes, 1]
+
+        found = token_ids >= 0
+        if not found.any():
+            return empty
+        rows, token_ids, sims = rows[found], token_ids[found], sims[found]
+
+        # one entry per (title, food token), keeping the closest title token
+        key = rows * len(self.vocab) + token_ids
+        order = np.lexsort((-sims, key))
+        first = np.concatenate(([True], key[order][1:] != key[order][:-1]))
+        pick = order[first]
+        rows, token_ids, sims = rows[pick], token_ids[pick], sims[pick]
+
+        # titles x vocab times vocab x foods: every matched token's posting list
+        matched = sp.csr_matrix(
+            (sims, (rows, token_ids)), shape=(int(rows.max()) + 1, len(self.vocab))
+        )
+        scores = (matched @ self.postings).tocoo()
+        out_rows, out_foods = scores.row.astype(np.int64), scores.col.astype(np.int64)
+        scores = scores.data
+
+        # float sums of weights that add up to 1 can land just below it
+        keep = scores >= min_score - 1e-9
+        out_rows, out_foods, scores = out_rows[keep], out_foods[keep], np.minimum(scores[keep], 1.0)
+
+        order = np.lexsort((out_foods, -self.n_tokens[out_foods], -scores.round(9), out_rows))
+        out_rows, out_foods, scores = out_rows[order], out_foods[order], scores[order]
+
+        group_start = np.flatnonzero(np.concatenate(([True], out_rows[1:] != out_rows[:-1])))
+        rank = np.arange(len(out_rows)) - np.repeat(group_start, np.diff(np.append(group_start, len(out_rows))))
+        keep = rank < top_k
+
+        return out_rows[keep], out_foods[keep], scores[keep]
+
+
+# ---------------------------------------------------
+# PARALLEL LINKING
+# ---------------------------------------------------
+_worker_index = None
+
+
+def _init_worker(index):
+    global _worker_index
+    _worker_index = index
+
+
+def _link_chunk(task):
+    start, titles, min_score, top_k = task
+    rows, foods, scores = _worker_index.link_titles(titles, min_score, top_k)
+    return rows + start, foods, scores
+
+
+def link_products(index, asins, titles, workers=None, min_score=MIN_SCORE,
+                  top_k=TOP_K, chunk_size=CHUNK_TITLES):
+    """
+    DataFrame (asin, food, score) of the foods linked to each product.
+    Titles are scored in chunks across worker processes (workers=None:
+    all cores; 1 scores in-process).
+    """
+    asins = np.asarray(asins, dtype=object)
+    titles = np.asarray(titles, dtype=object)
+    tasks = [
+        (start, titles[start:start + chunk_size], min_score, top_k)
+        for start in range(0, len(titles), chunk_size)
+    ]
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        _init_worker(index)
+        results = [_link_chunk(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(index,)
+        ) as pool:
+            results = list(pool.map(_link_chunk, tasks))
+
+    if not results:
+        return pd.DataFrame({"asin": [], "food": [], "score": []})
+
+    rows, foods, scores = (np.concatenate(parts) for parts in zip(*results))
+    return pd.DataFrame({
+        "asin": asins[rows],
+        "food": index.foods[foods],
+        "score": scores.round(4),
+    })
+
+
+# ---------------------------------------------------
+# INCREMENTAL RUN
+# ---------------------------------------------------
+def links_key():
+    """
+    Hash of the linker settings the links depend on (titles and food names
+    are tracked separately, so they can be relinked incrementally).
+    """
+    key = {
+        "version": LINKER_VERSION,
+        "params": [
+            MIN_TOKEN_LEN, NGRAM, FUZZY_MIN_LEN, FUZZY_MIN_SIM, MIN_SCORE, TOP_K,
+            IDF_REFERENCE,
+        ],
+    }
+    return hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+def food_names(foods):
+    return sorted({str(f) for f in foods})
+
+
+def affected_by_food_change(old_index, new_index, titles):
+    """
+    Boolean mask of the titles whose links can differ between old_index and
+    new_index: some title token is matched differently (another vocab token
+    or similarity), or is matched to a token of a food whose token weights
+    changed (added and removed foods included). Every other title scores
+    the same foods identically under both indexes.
+    """
+    titles = pd.Series(titles, dtype=object).fillna("").astype(str).to_numpy(dtype=object)
+    affected = np.zeros(len(titles), dtype=bool)
+
+    old_w, new_w = old_index.weight_table(), new_index.weight_table()
+    both = old_w.merge(new_w, on=["food", "token"], how="outer", suffixes=("_old", "_new"))
+    changed = ~np.isclose(both["weight_old"], both["weight_new"], rtol=0, atol=1e-12)
+    changed_foods = set(both.loc[changed, "food"])
+    changed_tokens = set(old_w.loc[old_w["food"].isin(changed_foods), "token"]) | set(
+        new_w.loc[new_w["food"].isin(changed_foods), "token"]
+    )
+    if not changed_tokens or len(titles) == 0:
+        return affected
+
+    # A title token matched differently, or to a changed token, equals a
+    # changed token or fuzzy-matches one (old or new), so it shares one of
+    # its inner n-grams: tokenize only titles holding one of those.
+    pieces = set()
+    for token in changed_tokens:
+        pieces |= {token[i:i + NGRAM] for i in range(len(token) - NGRAM + 1)} or {token}
+    lowered = pc.utf8_lower(pa.array(titles, type=pa.string()))
+    candidates = np.flatnonzero(
+        pc.match_substring_regex(lowered, "|".join(sorted(pieces))).to_numpy(zero_copy_only=False)
+    )
+
+    rows, tokens = tokenize(titles[candidates])
+    if len(rows) == 0:
+        return affected
+
+    def matched(index, token):
+        token_id, sim = index.match_token(token)
+        return (None, 0.0) if token_id < 0 else (index.vocab[token_id], sim)
+
+    codes, distinct = pd.factorize(tokens)
+    token_affected = np.zeros(len(distinct), dtype=bool)
+    for i, token in enumerate(distinct):
+        old, new = matched(old_index, token), matched(new_index, token)
+        token_affected[i] = old != new or old[0] in changed_tokens or new[0] in changed_tokens
+
+    affected[candidates[rows[token_affected[codes]]]] = True
+    return affected
+
+
+def title_hashes(titles):
+    """
+    Stable 64-bit hash per title (same value across runs and processes).
+    """
+    return pd.util.hash_pandas_object(
+        pd.Series(titles, dtype=object).fillna("").astype(str), index=False
+    ).to_numpy()
+
+
+def load_products(out_dir):
+    """
+    (asin, title_clean) of every product with a non-empty title.
+    """
+    products = read_table(Path(out_dir) / "clean_metadata.parquet", columns=["asin", "title_clean"])
+    products = products[products["title_clean"].fillna("").str.len() > 0]
+    return products.drop_duplicates("asin").reset_index(drop=True)
+
+
+def load_links_meta(out_dir):
+    path = Path(out_dir) / META_NAME
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _check_settings(out_dir):
+    """
+    Return (ok, reason): saved links exist and match the linker settings,
+    whatever foods they were built for.
+    """
+    out = Path(out_dir)
+    meta = load_links_meta(out_dir)
+    if not meta or not (out / LINKS_NAME).exists() or not (out / TITLES_NAME).exists():
+        return False, "missing: food links"
+    if meta.get("links_key") != links_key():
+        return False, "linker settings changed"
+    return True, "fresh"
+
+
+def check_links(out_dir, foods):
+    """
+    Return (ok, reason), like check_neighbor_index.
+    """
+    ok, reason = _check_settings(out_dir)
+    if not ok:
+        return ok, reason
+    old, new = set(load_links_meta(out_dir)["foods"]), set(food_names(foods))
+    if old != new:
+        return False, f"food names changed ({len(new - old)} added, {len(old - new)} removed)"
+    return True, "fresh"
+
+
+def run(out_dir, foods, force=False, workers=None):
+    """
+    Link every product of out_dir/clean_metadata.parquet to foods, rescoring
+    only products that are new, whose title changed since the last run, or
+    whose links depend on added / removed foods. Returns the links DataFrame.
+    """
+    out = Path(out_dir)
+    products = load_products(out_dir)
+    products["title_hash"] = title_hashes(products["title_clean"])
+
+    key = links_key()
+    foods = food_names(foods)   # the order breaks score ties; same as the saved list
+    index = FoodIndex(foods)
+    settings_ok, _ = _check_settings(out_dir)
+    ok, reason = check_links(out_dir, foods)
+
+    # joins rather than isin: isin over Arrow strings is a Python loop
+    keep = np.zeros(len(products), dtype=bool)
+    old_links = None
+    if settings_ok and not force:
+        seen = read_table(out / TITLES_NAME, columns=["asin", "title_hash"])
+        keep = products[["asin", "title_hash"]].merge(
+            seen, how="left", indicator=True
+        )["_merge"].eq("both").to_numpy().copy()
+
+        if not ok:
+            affected = affected_by_food_change(
+                FoodIndex(load_links_meta(out_dir)["foods"]), index,
+                products.loc[keep, "title_clean"]
+            )
+            print(f"⚠ {reason[0].upper() + reason[1:]}: relinking {int(affected.sum()):,} "
+                  f"of {int(keep.sum()):,} unchanged products")
+            keep[np.flatnonzero(keep)[affected]] = False
+
+        old_links = read_table(out / LINKS_NAME, columns=["asin", "food", "score"])
+        old_links = old_links.merge(products.loc[keep, ["asin"]], on="asin")
+    else:
+        print(f"⚠ Relinking all products: {'forced' if force else reason}")
+
+    todo = products[~keep]
+    print(f"Products: {len(products):,} ({len(todo):,} to link)")
+
+    new_links = link_products(index, todo["asin"], todo["title_clean"], workers=workers)
+
+    links = new_links if old_links is None else pd.concat([old_links, new_links], ignore_index=True)
+    links = links.sort_values(["asin", "score"], ascending=[True, False], kind="stable")
+    links = links.reset_index(drop=True)
+
+    # meta.json last: a half-written run is relinked from scratch
+    meta_path = out / META_NAME
+    if meta_path.exists():
+        meta_path.unlink()
+    write_table(links, out / LINKS_NAME)
+    write_table(products[["asin", "title_hash"]], out / TITLES_NAME)
+    meta = {
+        "links_key": key,
+        "foods": foods,
+        "n_foods": len(foods),
+        "n_products": len(products),
+        "n_linked_products": int(links["asin"].nunique()),
+        "n_links": len(links),
+    }
+    meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    print(f"✔ Linked {meta['n_linked_products']:,} / {len(products):,} products "
+          f"to {links['food'].nunique():,} foods ({len(links):,} links)")
+    return links
+
+
+# ---------------------------------------------------
+# READ
+# ---------------------------------------------------
+def load_food_links(path, foods=None, asins=None):
+    """
+    (asin, food, score) rows of a saved link table, for these foods and / or
+    ASINs (only the ASINs' partitions are opened).
+    """
+    links = read_table(path, columns=["asin", "food", "score"], asins=asins)
+    if foods is not None:
+        links = links[links["food"].isin(list(foods))]
+    return links.reset_index(drop=True)
+
+
+def main():
+    from NM_phase2_clean_merge import OUT_DIR
+    from NM_recommender import load_catalog
+
+    parser = argparse.ArgumentParser(description="Link Amazon products to nutrition foods.")
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="relink every product")
+    parser.add_argument(
+        "--check", action="store_true",
+        help="only report whether the links match the current foods"
+    )
+    args = parser.parse_args()
+
+    foods = load_catalog().names()
+
+    if args.check:
+        ok, reason = check_links(args.out_dir, foods)
+        print(("✅ " if ok else "⚠ ") + reason)
+        return
+
+    run(args.out_dir, foods, force=args.force, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# NM_neighbors.py
+import argparse
+import hashlib
+import json
+import numpy as np
+from pathlib import Path
+
+# ---------------------------------------------------
+# INDEX CONFIG
+# ---------------------------------------------------
+INDEX_VERSION = 1
+DEFAULT_K = 50
+BLOCK_SIZE = 1024
+
+
+def index_path_for(csv_path):
+    """
+    The neighbor index lives next to the nutrition CSV it was built from.
+    """
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.stem + ".neighbors.npz")
+
+
+def source_fingerprint(csv_path):
+    """
+    SHA-1 of the nutrition CSV, used to detect a stale index.
+    """
+    h = hashlib.sha1()
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def unit_rows(X):
+    """
+    Row-normalize X so that a dot product equals cosine similarity.
+    Zero rows stay zero (same convention as sklearn's cosine_similarity).
+    """
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return X / norms
+
+
+# ---------------------------------------------------
+# BUILD
+# ---------------------------------------------------
+def build_neighbor_index(X_norm, k=DEFAULT_K, block_size=BLOCK_SIZE):
+    """
+    Top-k most similar rows (cosine over X_norm) for every row.
+
+    Returns (neighbors, sims): int32 row ids and float32 similarities,
+    both shaped (n_rows, k) and sorted by similarity, highest first.
+    A row is never listed as its own neighbor.
+    """
+    unit = unit_rows(np.asarray(X_norm, dtype=float))
+    n = len(unit)
+    k = max(min(k, n - 1), 0)
+
+    neighbors = np.empty((n, k), dtype=np.int32)
+    sims = np.empty((n, k), dtype=np.float32)
+
+    if k == 0:
+        return neighbors, sims
+
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        block = unit[start:end] @ unit.T
+        block[np.arange(end - start), np.arange(start, end)] = -np.inf
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_sims = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_sims, axis=1, kind="stable")
+
+        neighbors[start:end] = np.take_along_axis(top, order, axis=1)
+        sims[start:end] = np.take_along_axis(top_sims, order, axis=1)
+
+    return neighbors, sims
+
+
+def save_neighbor_index(csv_path, neighbors, sims, features):
+    meta = {
+        "version": INDEX_VERSION,
+        "k": int(neighbors.shape[1]),
+        "n_rows": int(neighbors.shape[0]),
+        "features": list(features),
+        "source_sha1": source_fingerprint(csv_path),
+    }
+
+    path = index_path_for(csv_path)
+    np.savez(
+        path,
+        neighbors=neighbors,
+        sims=sims,
+        meta=np.array(json.dumps(meta)),
+    )
+    return path
+
+
+# ---------------------------------------------------
+# LOAD + STALENESS CHECK
+# ---------------------------------------------------
+def check_neighbor_index(csv_path, n_rows=None, features=None, source_sha1=None):
+    """
+    Return (ok, reason). The index is stale when the CSV changed since the
+    build, or when it was built for a different row count / feature set.
+    source_sha1 is source_fingerprint(csv_path) when the caller already
+    has it.
+    """
+    path = index_path_for(csv_path)
+    if not path.exists():
+        return False, f"missing: {path}"
+
+    try:
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+    except Exception as e:
+        return False, f"unreadable: {e}"
+
+    if meta.get("version") != INDEX_VERSION:
+        return False, "index format version changed"
+
+    if n_rows is not None and meta.get("n_rows") != n_rows:
+        return False, "row count changed"
+
+    if features is not None and meta.get("features") != list(features):
+        return False, "feature set changed"
+
+    if source_sha1 is None:
+        source_sha1 = source_fingerprint(csv_path)
+    if meta.get("source_sha1") != source_sha1:
+        return False, "nutrition CSV changed since build"
+
+    return True, "fresh"
+
+
+def load_neighbor_index(csv_path, n_rows=None, features=None, source_sha1=None):
+    """
+    Load the persisted index, or None if it is missing or stale.
+    """
+    ok, _ = check_neighbor_index(csv_path, n_rows, features, source_sha1)
+    if not ok:
+        return None
+
+    with np.load(index_path_for(csv_path)) as data:
+        return {
+            "neighbors": data["neighbors"],
+            "sims": data["sims"],
+            "meta": json.loads(str(data["meta"])),
+        }
+
+
+# ---------------------------------------------------
+# REBUILD COMMAND
+# ---------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or check the item-item neighbor index."
+    )
+    parser.add_argument("--k", type=int, default=DEFAULT_K)
+    parser.add_argument(
+        "--check", action="store_true",
+        help="only report whether the index is fresh"
+    )
+    args = parser.parse_args()
+
+    from NM_recommender import NUTRITION_PATH, NUTRITION_FEATURES, X_norm
+
+    if args.check:
+        ok, reason = check_neighbor_index(
+            NUTRITION_PATH, len(X_norm), NUTRITION_FEATURES
+        )
+        print(("✅ " if ok else "⚠ ") + reason)
+        return
+
+    neighbors, sims = build_neighbor_index(X_norm, k=args.k)
+    path = save_neighbor_index(NUTRITION_PATH, neighbors, sims, NUTRITION_FEATURES)
+    print(f"✅ Neighbor index ({neighbors.shape[0]} x {neighbors.shape[1]}) saved to: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# NM_normalize.py
+"""
+Column-wise text / price / category normalization shared by the ETL scripts.
+
+Each function takes a Series (or sequence) and returns an object Series on
+the same index holding exactly what the old per-row helpers produced.
+The work runs in Arrow compute kernels and numpy passes over the Arrow
+string buffers. Rows where Arrow and Python string semantics can differ
+(non-ASCII case mapping, the \\x1c-\\x1f separators that str.strip()
+treats as whitespace) and columns of mixed types go through the row-wise
+definition instead.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+CATEGORY_SEP = " > "
+
+# ASCII characters str.strip() removes but Arrow's ASCII trim keeps
+_PY_ONLY_SPACE = "[\x1c-\x1f]"
+_ARROW_ERRORS = (pa.ArrowInvalid, pa.ArrowTypeError)
+
+
+def _byte_table(chars):
+    table = np.zeros(256, dtype=bool)
+    table[np.frombuffer(chars.encode("ascii"), dtype=np.uint8)] = True
+    return table
+
+
+_TEXT_BYTES = _byte_table("abcdefghijklmnopqrstuvwxyz0123456789 ")
+_PRICE_BYTES = _byte_table("0123456789.")
+_FLOAT_PATTERN = r"^(?:[0-9]+\.?[0-9]*|\.[0-9]+)$"
+
+
+def _series(s):
+    return s if isinstance(s, pd.Series) else pd.Series(s, dtype=object)
+
+
+def _to_series(arr, index):
+    return pd.Series(arr.to_numpy(zero_copy_only=False), index=index, dtype=object)
+
+
+def _string_array(values):
+    """
+    Arrow strings, or None when values holds anything but str / missing.
+    """
+    try:
+        return pa.array(values, type=pa.string(), from_pandas=True)
+    except _ARROW_ERRORS:
+        return None
+
+
+def _keep_bytes(arr, table):
+    """
+    Drop every byte of arr (strings, no nulls) whose table entry is False,
+    in one pass over the data buffer. Bytes >= 0x80 must map to False so
+    multi-byte characters go away whole.
+    """
+    arr = pa.concat_arrays([arr]) if arr.offset else arr
+    offsets = np.frombuffer(arr.buffers()[1], dtype=np.int32)[:len(arr) + 1]
+    data_buf = arr.buffers()[2]
+    if data_buf is None or offsets[-1] == 0:
+        return arr
+
+    data = np.frombuffer(data_buf, dtype=np.uint8)[offsets[0]:offsets[-1]]
+    keep = table[data]
+    kept = np.concatenate(([0], np.cumsum(keep, dtype=np.int64)))
+    new_offsets = kept[offsets - offsets[0]].astype(np.int32)
+
+    return pa.StringArray.from_buffers(
+        len(arr), pa.py_buffer(new_offsets), pa.py_buffer(data[keep].tobytes())
+    )
+
+
+def _ascii_lower_strip(arr, python_fn):
+    """
+    Lower-case and strip arr. ASCII rows use Arrow's ASCII kernels; the
+    rest use python_fn so results match str.lower() / str.strip().
+    """
+    out = pc.ascii_lower(pc.ascii_trim_whitespace(arr)).to_numpy(zero_copy_only=False)
+
+    fast = pc.and_(pc.string_is_ascii(arr), pc.invert(pc.match_substring_regex(arr, _PY_ONLY_SPACE)))
+    slow = np.flatnonzero(~fast.fill_null(True).to_numpy(zero_copy_only=False) & arr.is_valid().to_numpy(zero_copy_only=False))
+    if len(slow):
+        out[slow] = [python_fn(v) for v in arr.take(pa.array(slow)).to_pylist()]
+    return out
+
+
+# ---------------------------------------------------
+# TEXT
+# ---------------------------------------------------
+def lower_strip(s):
+    """
+    Lower-cased, stripped strings, missing values as "" (title_clean /
+    desc_clean). This is the pandas expression the scripts used, kept
+    as is: its .str methods already run vectorized, and the result is a
+    pandas string Series.
+    """
+    return _series(s).fillna("").astype(str).str.lower().str.strip()
+
+
+def simple_clean(s):
+    """
+    Review text: newlines to spaces, stripped, lower-cased; missing -> "".
+    """
+    s = _series(s)
+    arr = _string_array(s.to_numpy())
+    if arr is None:
+        text = s.astype(object).map(lambda v: None if pd.isna(v) else str(v))
+        arr = pa.array(text.to_numpy(), type=pa.string(), from_pandas=True)
+    arr = pc.replace_substring(arr.fill_null(""), "\n", " ")
+    out = _ascii_lower_strip(arr, lambda v: v.strip().lower())
+    return pd.Series(out, index=s.index, dtype=object)
+
+
+def clean_text(s):
+    """
+    Lower-case and keep only [a-z0-9 ], stripped; non-strings -> "".
+    """
+    s = _series(s)
+    arr = _string_array(s.to_numpy())
+    if arr is None:
+        arr = pa.array(s.where(s.map(type).eq(str)).to_numpy(), type=pa.string(), from_pandas=True)
+
+    arr = arr.fill_null("")
+
+    text = pc.ascii_trim(_keep_bytes(pc.ascii_lower(arr), _TEXT_BYTES), " ")
+    out = text.to_numpy(zero_copy_only=False)
+
+    # str.lower() can turn non-ASCII letters into kept ASCII ones
+    slow = np.flatnonzero(~pc.string_is_ascii(arr).to_numpy(zero_copy_only=False))
+    if len(slow):
+        out[slow] = [
+            re.sub(r"[^a-z0-9 ]", "", v.lower()).strip()
+            for v in arr.take(pa.array(slow)).to_pylist()
+        ]
+    return pd.Series(out, index=s.index, dtype=object)
+
+
+# ---------------------------------------------------
+# PRICE
+# ---------------------------------------------------
+def clean_price(s):
+    """
+    Strings keep only digits and dots and parse as float (None when that
+    fails); numbers pass through; missing stays missing.
+    """
+    s = _series(s)
+    arr = _string_array(s.to_numpy())
+    if arr is None:
+        is_str = s.map(type).eq(str)
+        arr = pa.array(s.where(is_str).to_numpy(), type=pa.string(), from_pandas=True)
+    else:
+        is_str = pd.Series(arr.is_valid().to_numpy(zero_copy_only=False), index=s.index)
+
+    digits = _keep_bytes(arr.fill_null(""), _PRICE_BYTES)
+    digits = pc.if_else(pc.match_substring_regex(digits, _FLOAT_PATTERN), digits, pa.scalar(None, pa.string()))
+    parsed = pd.Series(pc.cast(digits, pa.float64()).to_numpy(zero_copy_only=False), index=s.index)
+
+    out = s.where(~is_str, parsed)
+    return out.where(out.notna(), None).infer_objects()
+
+
+# ---------------------------------------------------
+# CATEGORIES
+# ---------------------------------------------------
+def _row_join_categories(cat, keep_strings=False):
+    if isinstance(cat, list) and len(cat) > 0:
+        if isinstance(cat[0], list):
+            return CATEGORY_SEP.join(str(x) for x in cat[0])
+        return CATEGORY_SEP.join(str(x) for x in cat)
+    if keep_strings and isinstance(cat, str):
+        return cat
+    return None
+
+
+def _row_last_category(cat):
+    if isinstance(cat, list) and len(cat) > 0:
+        try:
+            return cat[0][-1]
+        except Exception:
+            return None
+    return None
+
+
+def _flat_string_lists(values):
+    """
+    list<string> array when every value is a flat list of strings without
+    nulls (or missing), else None.
+    """
+    try:
+        arr = pa.array(values, type=pa.list_(pa.string()), from_pandas=True)
+    except _ARROW_ERRORS:
+        return None
+    if arr.values.null_count:
+        return None
+    return arr
+
+
+def join_categories(s, keep_strings=False):
+    """
+    Non-empty category lists joined with " > " (a nested list contributes
+    its first inner list). With keep_strings, str values pass through.
+    Everything else -> None.
+    """
+    s = _series(s)
+    arr = _flat_string_lists(s.to_numpy())
+    if arr is None:
+        return s.map(lambda cat: _row_join_categories(cat, keep_strings)).astype(object)
+
+    joined = pc.binary_join(arr, CATEGORY_SEP)
+    empty = pc.equal(pc.list_value_length(arr), 0)
+    joined = pc.if_else(empty, pa.scalar(None, pa.string()), joined)
+    return _to_series(joined, s.index)
+
+
+def last_category(s):
+    """
+    cat[0][-1] for non-empty lists (None when that fails), None otherwise.
+    """
+    s = _series(s)
+    arr = _flat_string_lists(s.to_numpy())
+    if arr is None:
+        return s.map(_row_last_category).astype(object)
+
+    offsets = arr.offsets.to_numpy()
+    nonempty = np.flatnonzero(np.diff(offsets) > 0)
+    firsts = arr.values.take(pa.array(offsets[nonempty]))
+
+    last = pc.utf8_slice_codeunits(firsts, start=-1)
+    last = pc.if_else(pc.equal(last, ""), pa.scalar(None, pa.string()), last)
+
+    out = np.full(len(s), None, dtype=object)
+    out[nonempty] = last.to_numpy(zero_copy_only=False)
+    return pd.Series(out, index=s.index, dtype=object)
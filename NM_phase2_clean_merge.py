@@ -1,167 +1,305 @@
 import pandas as pd
-import json, gzip, os
-from NM_sentiment import get_sentiment
+import os
+from collections import Counter
+from NM_columnar import PartitionedWriter, write_table
+from NM_ingest import iter_jsonl_chunks, read_jsonl_columns
+from NM_normalize import join_categories, lower_strip, simple_clean
+from NM_review_stats import ReviewAggregator
+from NM_sentiment import SentimentCache, get_sentiment_batch
 
 
 META_PATH = r"C:/Users/Chandu/Downloads/meta_Grocery_and_Gourmet_Food.jsonl.gz"
 REV_PATH  = r"C:/Users/Chandu/Downloads/Grocery_and_Gourmet_Food.jsonl.gz"
 OUT_DIR   = r"C:/Users/Chandu/OneDrive/Desktop/NutriMatch/final"
-os.makedirs(OUT_DIR, exist_ok=True)
 
-print("\n========== LOADING METADATA ==========\n")
-
-meta = []
-with gzip.open(META_PATH, "rt", encoding="utf-8") as f:
-    for line in f:
-        try:
-            meta.append(json.loads(line))
-        except:
-            continue
-
-meta_df = pd.DataFrame(meta)
-print("Metadata rows:", len(meta_df))
-print("Metadata columns:", meta_df.columns.tolist())
-
-meta_clean = meta_df.copy()
-
-if "parent_asin" in meta_clean.columns:
-    meta_clean["asin"] = meta_clean["parent_asin"]
-else:
-    meta_clean["asin"] = None
-
-meta_clean["asin"] = meta_clean["asin"].astype(str)
-
-required_meta_cols = ["asin", "title", "description", "categories", "price"]
-
-for col in required_meta_cols:
-    if col not in meta_clean.columns:
-        meta_clean[col] = None
-
-def clean_categories(cat):
-    if isinstance(cat, list) and len(cat) > 0:
-        if isinstance(cat[0], list):
-            return " > ".join(str(x) for x in cat[0])
-        else:
-            return " > ".join(str(x) for x in cat)
+# Reviews are streamed CHUNK_SIZE lines at a time, so peak memory follows
+# the chunk size rather than the size of the dump. None = one chunk.
+CHUNK_SIZE = 100_000
+
+# processes used for VADER scoring (None = all cores)
+SENTIMENT_WORKERS = None
+
+# processes used for JSON decoding of the dumps (None = all cores)
+INGEST_WORKERS = None
+
+# metadata fields the merge needs; the rest are never materialized
+META_FIELDS = ["parent_asin", "title", "description", "categories", "price"]
+
+# Review fields of the known dump layouts, keyed by the text field that
+# identifies the layout. Sparse fields (images, vote, ...) can be missing
+# from a whole chunk, so the output columns come from here, not from the
+# fields the first chunk happens to hold.
+REVIEW_LAYOUTS = {
+    # Amazon Reviews 2023
+    "text": [
+        "rating", "title", "text", "images", "asin", "parent_asin", "user_id",
+        "timestamp", "helpful_vote", "verified_purchase",
+    ],
+    # Amazon Reviews 2018
+    "reviewText": [
+        "overall", "verified", "reviewTime", "reviewerID", "asin", "style",
+        "reviewerName", "reviewText", "summary", "unixReviewTime", "vote", "image",
+    ],
+}
+
+# VADER scores persisted by text hash; reruns only score new texts.
+# None disables the cache.
+SENTIMENT_CACHE_PATH = os.path.join(OUT_DIR, "sentiment_cache.sqlite")
+
+def iter_review_chunks(path, chunk_size, fields=None):
+    """
+    Yield review column batches ({field: values}) of about chunk_size rows
+    (the whole file in one batch when chunk_size is None), decoded in
+    parallel. Malformed lines are skipped.
+    """
+    yield from iter_jsonl_chunks(
+        path, chunk_size, fields=fields, workers=INGEST_WORKERS, label="reviews"
+    )
+
+def find_asin_key(columns):
+    if "asin" in columns:
+        return "asin"
+    for key in ["product_asin", "asin13", "ASIN"]:
+        if key in columns:
+            return key
+    return "asin"
+
+def review_columns(columns):
+    """
+    The declared fields of the layout columns belong to, followed by any
+    other field among columns; columns as they are for an unknown layout.
+    """
+    for text_field, fields in REVIEW_LAYOUTS.items():
+        if text_field in columns:
+            return list(dict.fromkeys(fields + list(columns)))
+    return list(columns)
+
+def find_review_text_col(df):
+    candidates = ["reviewText", "review_text", "text", "review"]
+    for c in candidates:
+        if c in df.columns:
+            return c
+
+    for c in df.columns:
+        if df[c].dtype == object:
+            if df[c].astype(str).str.len().mean() > 20:
+                return c
     return None
 
-meta_clean["categories_clean"] = meta_clean["categories"].apply(clean_categories)
-
-meta_clean["title_clean"] = meta_clean["title"].fillna("").astype(str).str.lower().str.strip()
-meta_clean["desc_clean"]  = meta_clean["description"].fillna("").astype(str).str.lower().str.strip()
 
-clean_meta = meta_clean.loc[:, ["asin", "title", "description",
-                                "categories_clean", "price",
-                                "title_clean", "desc_clean"]]
-
-clean_meta = clean_meta.rename(columns={"categories_clean": "categories"})
-
-clean_meta = clean_meta[clean_meta["asin"].notna()]
-print("\nFinal metadata rows:", len(clean_meta))
-
-meta_out = os.path.join(OUT_DIR, "clean_metadata.csv")
-clean_meta.to_csv(meta_out, index=False)
-print("✔ Saved clean metadata ->", meta_out)
-
-print("\n========== LOADING REVIEWS ==========\n")
-
-recs = []
-with gzip.open(REV_PATH, "rt", encoding="utf-8") as f:
-    for i, line in enumerate(f):
-        try:
-            recs.append(json.loads(line))
-        except:
-            continue
-
-        if (i + 1) % 200000 == 0:
-            print(f"Loaded {i+1:,} reviews...")
-
-reviews_df = pd.DataFrame(recs)
-print("Total reviews loaded:", len(reviews_df))
-print("Review columns:", reviews_df.columns.tolist())
-
-if "asin" not in reviews_df.columns:
-    possible_keys = ["product_asin", "asin13", "ASIN"]
-    for key in possible_keys:
-        if key in reviews_df.columns:
-            reviews_df = reviews_df.rename(columns={key: "asin"})
-            break
-
-reviews_df["asin"] = reviews_df["asin"].astype(str)
+def load_metadata(path, fields=META_FIELDS):
+    """
+    The requested fields of the whole metadata dump as a DataFrame
+    (fields=None keeps every field; bad lines are skipped).
+    """
+    return pd.DataFrame(read_jsonl_columns(
+        path, fields=fields, workers=INGEST_WORKERS, label="metadata"
+    ))
+
+def build_clean_metadata(meta_df):
+    """
+    One row per product (asin = parent_asin) with cleaned categories and
+    lower-cased title / description; the table reviews are merged with.
+    """
+    meta_clean = meta_df.copy()
+
+    if "parent_asin" in meta_clean.columns:
+        meta_clean["asin"] = meta_clean["parent_asin"]
+    else:
+        meta_clean["asin"] = None
+
+    meta_clean["asin"] = meta_clean["asin"].astype(str)
+
+    required_meta_cols = ["asin", "title", "description", "categories", "price"]
+
+    for col in required_meta_cols:
+        if col not in meta_clean.columns:
+            meta_clean[col] = None
+
+    meta_clean["categories_clean"] = join_categories(meta_clean["categories"])
+
+    meta_clean["title_clean"] = lower_strip(meta_clean["title"])
+    meta_clean["desc_clean"]  = lower_strip(meta_clean["description"])
+
+    clean_meta = meta_clean.loc[:, ["asin", "title", "description",
+                                    "categories_clean", "price",
+                                    "title_clean", "desc_clean"]]
+
+    clean_meta = clean_meta.rename(columns={"categories_clean": "categories"})
+
+    clean_meta = clean_meta[clean_meta["asin"].notna()]
+    return clean_meta
+
+
+class ReviewMerger:
+    """
+    Filters raw review chunks to known products, cleans and scores their
+    text and merges them with clean_meta, appending every chunk to the
+    filtered / merged datasets and the review aggregates in out_dir.
+
+    Feed chunks with add(); finish() writes the aggregates and reports.
+    """
+
+    def __init__(self, clean_meta, out_dir, sentiment_cache=None, workers=SENTIMENT_WORKERS):
+        self.clean_meta = clean_meta
+        self.meta_asins = set(clean_meta["asin"])
+        self.sentiment_cache = sentiment_cache
+        self.workers = workers
+
+        self.rev_out = os.path.join(out_dir, "filtered_reviews.parquet")
+        self.merged_out = os.path.join(out_dir, "merged_reviews_metadata.parquet")
+        self.stats_out = os.path.join(out_dir, "review_stats.parquet")
+
+        # outputs are appended chunk by chunk as ASIN-partitioned Parquet parts
+        self.rev_writer = PartitionedWriter(self.rev_out)
+        self.merged_writer = PartitionedWriter(self.merged_out)
+        self.review_stats = ReviewAggregator()
+
+        # column layout is fixed once (declared layout + first chunk) so every
+        # appended chunk lines up
+        self.review_columns = None
+        self.dropped_columns = set()
+        self.asin_key = "asin"
+        self.review_text_col = None
+        self.title_col = None
+
+        self.n_loaded = self.n_filtered = self.n_kept = self.n_merged = self.n_titled = 0
+        self.title_counts = Counter()
+        self.sample_row = None
+
+    def add(self, chunk):
+        reviews_df = pd.DataFrame(chunk)
+
+        if self.review_columns is None:
+            self.asin_key = find_asin_key(reviews_df.columns)
+            self.review_columns = [
+                "asin" if c == self.asin_key else c for c in review_columns(reviews_df.columns)
+            ]
+            print("Review columns:", self.review_columns)
+
+        reviews_df = reviews_df.rename(columns={self.asin_key: "asin"})
+        dropped = set(reviews_df.columns) - set(self.review_columns) - self.dropped_columns
+        if dropped:
+            print(f"⚠ Review fields outside the output layout are not kept: {sorted(dropped)}")
+            self.dropped_columns |= dropped
+        reviews_df = reviews_df.reindex(columns=self.review_columns)
+        self.n_loaded += len(reviews_df)
+
+        reviews_df["asin"] = reviews_df["asin"].astype(str)
+        reviews_filtered = reviews_df[reviews_df["asin"].isin(self.meta_asins)].copy()
+        del reviews_df
+        self.n_filtered += len(reviews_filtered)
+
+        if self.review_text_col is None:
+            self.review_text_col = find_review_text_col(reviews_filtered)
+            print("Using review text column:", self.review_text_col)
+
+        reviews_filtered["review_clean"] = simple_clean(reviews_filtered[self.review_text_col])
+        reviews_filtered = reviews_filtered[reviews_filtered["review_clean"].str.len() > 0]
+        self.n_kept += len(reviews_filtered)
+
+        self.rev_writer.write(reviews_filtered)
+
+        merged = reviews_filtered.merge(
+            self.clean_meta,
+            on="asin",
+            how="left",
+            suffixes=("_rev", "_meta")
+        )
+        merged["sentiment"] = get_sentiment_batch(
+            merged["review_clean"], workers=self.workers, cache=self.sentiment_cache
+        )[1]
+        # stable row id, referenced by the top reviews in review_stats
+        merged.insert(0, "review_id", range(self.n_merged, self.n_merged + len(merged)))
+        self.n_merged += len(merged)
+
+        if self.title_col is None:
+            for col in ["title", "title_meta", "title_rev"]:
+                if col in merged.columns:
+                    self.title_col = col
+                    break
+
+        if self.title_col:
+            self.n_titled += merged[self.title_col].notna().sum()
+            self.title_counts.update(merged[self.title_col].dropna())
+
+        if self.sample_row is None and len(merged):
+            self.sample_row = merged.iloc[0].to_dict()
+
+        self.merged_writer.write(merged)
+        self.review_stats.add(merged)
+
+    def finish(self):
+        print("Total reviews loaded:", self.n_loaded)
+        print("Reviews AFTER filtering to metadata ASINs:", self.n_filtered)
+        print("Reviews after removing empty text:", self.n_kept)
+        print("✔ Saved filtered reviews ->", self.rev_out)
+
+        print("Merged total rows:", self.n_merged)
+
+        if self.title_col:
+            print("Rows with metadata title:", self.n_titled)
+        else:
+            print("⚠ No title column found after merge")
 
-meta_asins = set(clean_meta["asin"].astype(str))
-reviews_filtered = reviews_df[reviews_df["asin"].isin(meta_asins)].copy()
+        print("✔ Saved merged dataset ->", self.merged_out)
 
-print("Reviews AFTER filtering to metadata ASINs:", len(reviews_filtered))
+        stats = self.review_stats.write(self.stats_out)
+        print(f"✔ Saved review stats for {len(stats) - 1:,} products ->", self.stats_out)
 
-candidates = ["reviewText", "review_text", "text", "review"]
-review_text_col = None
+        cache = self.sentiment_cache
+        if cache is not None:
+            print(f"Sentiment cache: {cache.hits:,} / {cache.lookups:,} "
+                  f"distinct texts hit ({cache.hit_rate:.1%}), "
+                  f"{len(cache):,} cached")
 
-for c in candidates:
-    if c in reviews_filtered.columns:
-        review_text_col = c
-        break
+    def print_sample(self):
+        print("\n========== SAMPLE OUTPUT ==========\n")
 
-if review_text_col is None:
-    for c in reviews_filtered.columns:
-        if reviews_filtered[c].dtype == object:
-            if reviews_filtered[c].astype(str).str.len().mean() > 20:
-                review_text_col = c
-                break
+        if self.title_col:
+            print("Top reviewed products:")
+            print(pd.Series(self.title_counts, name="count").sort_values(ascending=False, kind="stable").head(10))
 
-print("Using review text column:", review_text_col)
+        print("\nSample merged row:")
+        print(self.sample_row)
 
-def simple_clean(s):
-    if pd.isna(s):
-        return ""
-    return str(s).replace("\n", " ").strip().lower()
 
-reviews_filtered["review_clean"] = reviews_filtered[review_text_col].apply(simple_clean)
+def open_sentiment_cache():
+    return SentimentCache(SENTIMENT_CACHE_PATH) if SENTIMENT_CACHE_PATH else None
 
-reviews_filtered = reviews_filtered[reviews_filtered["review_clean"].str.len() > 0]
-print("Reviews after removing empty text:", len(reviews_filtered))
 
-rev_out = os.path.join(OUT_DIR, "filtered_reviews.csv")
-reviews_filtered.to_csv(rev_out, index=False)
-print("✔ Saved filtered reviews ->", rev_out)
+def main():
+    os.makedirs(OUT_DIR, exist_ok=True)
 
-print("\n========== MERGING REVIEWS + METADATA ==========\n")
+    print("\n========== LOADING METADATA ==========\n")
 
-clean_meta["asin"] = clean_meta["asin"].astype(str)
-reviews_filtered["asin"] = reviews_filtered["asin"].astype(str)
+    meta_df = load_metadata(META_PATH)
+    print("Metadata rows:", len(meta_df))
+    print("Metadata columns:", meta_df.columns.tolist())
 
-merged = reviews_filtered.merge(
-    clean_meta,
-    on="asin",
-    how="left",
-    suffixes=("_rev", "_meta")
-)
-merged["sentiment"] = merged["review_clean"].apply(get_sentiment)
+    clean_meta = build_clean_metadata(meta_df)
+    del meta_df
+    print("\nFinal metadata rows:", len(clean_meta))
 
+    meta_out = os.path.join(OUT_DIR, "clean_metadata.parquet")
+    write_table(clean_meta, meta_out)
+    print("✔ Saved clean metadata ->", meta_out)
 
-print("Merged total rows:", len(merged))
+    print("\n========== STREAMING REVIEWS + MERGE ==========\n")
 
-title_col = None
-for col in ["title", "title_meta", "title_rev"]:
-    if col in merged.columns:
-        title_col = col
-        break
+    sentiment_cache = open_sentiment_cache()
+    merger = ReviewMerger(clean_meta, OUT_DIR, sentiment_cache)
 
-if title_col:
-    print("Rows with metadata title:", merged[title_col].notna().sum())
-else:
-    print("⚠ No title column found after merge")
+    for chunk in iter_review_chunks(REV_PATH, CHUNK_SIZE):
+        merger.add(chunk)
+        del chunk
 
-merged_out = os.path.join(OUT_DIR, "merged_reviews_metadata.csv")
-merged.to_csv(merged_out, index=False)
-print("✔ Saved merged dataset ->", merged_out)
+    merger.finish()
+    if sentiment_cache is not None:
+        sentiment_cache.close()
 
-print("\n========== SAMPLE OUTPUT ==========\n")
+    merger.print_sample()
 
-if title_col:
-    print("Top reviewed products:")
-    print(merged[title_col].value_counts().head(10))
 
-print("\nSample merged row:")
-print(merged.iloc[0].to_dict())
-                     
\ No newline at end of file
+if __name__ == "__main__":
+    main()
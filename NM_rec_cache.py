@@ -0,0 +1,182 @@
+# NM_rec_cache.py
+"""
+Result caches for recommend_snacks.
+
+LRUCache keeps results in process memory, bounded by entry count.
+DiskResultCache is an optional SQLite file shared by every process on
+the machine, bounded the same way. Both are keyed by tuples that carry
+the catalog and per-user interaction versions, so stale entries are
+never looked up again and simply age out.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import pyarrow as pa
+
+DEFAULT_MAX_ENTRIES = 1024
+DISK_MAX_ENTRIES = 50_000
+DISK_TRIM_EVERY = 256      # puts between size checks of the disk cache
+
+
+# ---------------------------------------------------
+# IN-PROCESS LRU
+# ---------------------------------------------------
+class LRUCache:
+    """
+    Thread-safe least-recently-used map with hit / miss / eviction counts.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# ---------------------------------------------------
+# CROSS-PROCESS DISK CACHE
+# ---------------------------------------------------
+def _encode(df):
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _decode(blob):
+    return pa.ipc.open_stream(blob).read_all().to_pandas()
+
+
+def _disk_key(key):
+    return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).digest()
+
+
+class DiskResultCache:
+    """
+    DataFrame results in a local SQLite file (Arrow IPC bytes, no pickle),
+    least recently used rows trimmed past max_entries. Other values are
+    not stored.
+    """
+
+    def __init__(self, path, max_entries=DISK_MAX_ENTRIES):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = self.misses = 0
+
+        self.conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS rec_cache (
+                key BLOB PRIMARY KEY,
+                value BLOB NOT NULL,
+                used REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_rec_cache_used ON rec_cache (used)")
+        self.conn.commit()
+
+    def get(self, key, default=None):
+        k = _disk_key(key)
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM rec_cache WHERE key = ?", (k,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.conn.execute("UPDATE rec_cache SET used = ? WHERE key = ?", (time.time(), k))
+            self.conn.commit()
+            self.hits += 1
+        return _decode(row[0])
+
+    def put(self, key, df):
+        if not hasattr(df, "columns"):
+            return
+        blob = _encode(df)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rec_cache (key, value, used) VALUES (?, ?, ?)",
+                (_disk_key(key), blob, time.time())
+            )
+            self._puts += 1
+            if self._puts % DISK_TRIM_EVERY == 0:
+                self._trim()
+            self.conn.commit()
+
+    def _count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM rec_cache").fetchone()[0]
+
+    def _trim(self):
+        excess = self._count() - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM rec_cache WHERE key IN "
+                "(SELECT key FROM rec_cache ORDER BY used LIMIT ?)",
+                (excess,)
+            )
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM rec_cache")
+            self.conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._count()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self.conn.close()
@@ -1,54 +1,253 @@
 # NM_recommender.py
+import hashlib
+import threading
+import time
 import pandas as pd
 import numpy as np
-import sqlite3
-from sklearn.metrics.pairwise import cosine_similarity
 from pathlib import Path
 
+import db
+from NM_ann import BACKENDS, make_index
+from NM_cooccur import load_cooccurrence, model_path_for
+from NM_catalog import FoodCatalog, artifact_path_for, load_catalog_artifact
+from NM_neighbors import load_neighbor_index, source_fingerprint, unit_rows
+from NM_rec_cache import DiskResultCache, LRUCache
+from NM_timing import span, timed
+
 # ---------------------------------------------------
 # PATHS
 # ---------------------------------------------------
-DB_PATH = Path("C:/Users/Chandu/OneDrive/Desktop/NutriMatch/nutrimatchDB.db")
 NUTRITION_PATH = Path(
     "C:/Users/Chandu/OneDrive/Desktop/NutriMatch/final/clean_nutrition_dataset.csv"
 )
 
-# ---------------------------------------------------
-# LOAD NUTRITION DATA (READ-ONLY)
-# ---------------------------------------------------
-nutrition_df = pd.read_csv(NUTRITION_PATH)
-
 NUTRITION_FEATURES = [
     "protein", "fat", "carbs", "fiber", "calories", "health_score_norm"
 ]
 
-nutrition_df = nutrition_df.dropna(subset=NUTRITION_FEATURES).reset_index(drop=True)
+# Similarity backend used when the neighbor index cannot answer (see
+# NM_ann): "exact" scores every food, "ivf" only the foods in the clusters
+# nearest the selected one (for large catalogs; tune with n_lists /
+# n_probe). Change at runtime with set_similarity_backend().
+SIMILARITY_BACKEND = "exact"
+SIMILARITY_PARAMS = {}
+
+# recommend_snacks results cached per (food, user, top_n, catalog version,
+# the user's interaction scores that feed the result). REC_CACHE_SIZE entries stay in process memory
+# (0 disables); REC_DISK_CACHE_PATH adds a SQLite cache shared by the
+# processes on this machine (None disables).
+REC_CACHE_SIZE = 1024
+REC_DISK_CACHE_PATH = None
+
+# Collaborative term: item-item co-occurrence across all users' interactions
+# (NM_cooccur). Off by default; enable it with a positive
+# HYBRID_WEIGHTS["collaborative"] (e.g. 0.10 -- the other weights are not
+# rescaled, so rankings change). The model is loaded, and folds in new
+# interactions at most every COOCCUR_REFRESH_SECONDS, on a background
+# thread; build it offline first with `python NM_cooccur.py`.
+COOCCUR_REFRESH_SECONDS = 30
 
-X = nutrition_df[NUTRITION_FEATURES].values
-X_norm = (X - X.mean(axis=0)) / X.std(axis=0)
+# ---------------------------------------------------
+# LOAD NUTRITION DATA (READ-ONLY, ON FIRST USE)
+# ---------------------------------------------------
+# path=None means NUTRITION_PATH as set at call time, so tools can point
+# the module at another CSV before first use.
+def read_nutrition_csv(path=None):
+    df = pd.read_csv(path or NUTRITION_PATH)
+    return df.dropna(subset=NUTRITION_FEATURES).reset_index(drop=True)
+
+
+def load_catalog(path=None, use_artifact=True, source_sha1=None):
+    """
+    Catalog from the binary artifact written by nutri_clean.py when it is
+    fresh (memory-mapped, no CSV parsing), otherwise from the CSV itself.
+    source_sha1 is the CSV fingerprint when the caller already has it.
+    """
+    path = path or NUTRITION_PATH
+    if use_artifact:
+        catalog = load_catalog_artifact(
+            artifact_path_for(path), path, NUTRITION_FEATURES, source_sha1
+        )
+        if catalog is not None:
+            return catalog
+
+    return FoodCatalog.from_frame(read_nutrition_csv(path), NUTRITION_FEATURES)
+
+
+def build_catalog_artifact(path=None):
+    """
+    Write the binary catalog next to the nutrition CSV.
+    """
+    path = path or NUTRITION_PATH
+    catalog = FoodCatalog.from_frame(read_nutrition_csv(path), NUTRITION_FEATURES)
+    return catalog.save(artifact_path_for(path), source_path=path)
+
+
+# Module state below is filled in by _ensure_loaded() on first use, so
+# importing this module parses nothing and touches no database (loading
+# does not either: the app calls sync_food_nutrients() explicitly). The old
+# module attributes (catalog, X_norm, nutrition_df, ...) still resolve
+# through __getattr__.
+_LAZY_ATTRS = {
+    "catalog", "X", "X_norm", "X_unit", "X_unit_T",
+    "neighbor_index", "health_norm", "max_health_norm", "similarity_index",
+}
+_load_lock = threading.Lock()
+_loaded = False
+_nutrition_df = None
+
+
+def _ensure_loaded():
+    global catalog, X, X_norm, X_unit, X_unit_T
+    global neighbor_index, health_norm, max_health_norm, similarity_index, _loaded
+
+    if _loaded:
+        return
+
+    with _load_lock:
+        if _loaded:
+            return
+
+        # one pass over the CSV checks both the artifact and the index
+        path = Path(NUTRITION_PATH)
+        source_sha1 = source_fingerprint(path) if path.exists() else None
+        catalog = load_catalog(path, source_sha1=source_sha1)
+
+        X = catalog.features
+        mean, std = catalog.normalization()
+        X_norm = (X - mean) / std
+        X_unit = unit_rows(X_norm)
+        X_unit_T = np.ascontiguousarray(X_unit.T)
+
+        # per-row health term, shared by every request
+        health_norm = catalog.column("health_score_norm") / 100
+        max_health_norm = health_norm.max() if len(health_norm) else 0.0
+
+        # NEIGHBOR INDEX (built offline by NM_neighbors.py)
+        neighbor_index = None
+        if source_sha1 is not None:
+            neighbor_index = load_neighbor_index(
+                path, len(catalog), NUTRITION_FEATURES, source_sha1
+            )
+
+        similarity_index = make_index(SIMILARITY_BACKEND, X_unit, **SIMILARITY_PARAMS)
+
+        _loaded = True
+
+
+def get_catalog():
+    _ensure_loaded()
+    return catalog
+
+
+def set_similarity_backend(name, **params):
+    """
+    Select the similarity backend (a key of NM_ann.BACKENDS) and its
+    parameters. The index is rebuilt now if the catalog is loaded, and
+    on first use otherwise.
+    """
+    global SIMILARITY_BACKEND, SIMILARITY_PARAMS, similarity_index
+
+    if name not in BACKENDS:
+        raise ValueError(
+            f"unknown similarity backend {name!r}; choose from {', '.join(BACKENDS)}"
+        )
+
+    with _load_lock:
+        SIMILARITY_BACKEND, SIMILARITY_PARAMS = name, dict(params)
+        if _loaded:
+            similarity_index = make_index(name, X_unit, **params)
+        _result_cache.clear()
+
+
+def get_nutrition_df():
+    """
+    The full cleaned nutrition table (all CSV columns). Parsed on first
+    call; the recommender itself only needs get_catalog().
+    """
+    global _nutrition_df
+    if _nutrition_df is None:
+        _nutrition_df = read_nutrition_csv()
+    return _nutrition_df
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        _ensure_loaded()
+        return globals()[name]
+    if name == "nutrition_df":
+        return get_nutrition_df()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+HYBRID_WEIGHTS = {
+    "similarity": 0.55, "health": 0.25, "interaction": 0.20, "collaborative": 0.0
+}
+
+# upper bound on cells of one (batch rows x catalog) similarity block
+BATCH_MAX_CELLS = 16_000_000
 
 # ---------------------------------------------------
-# DATABASE CONNECTION
+# SIMILARITY
 # ---------------------------------------------------
-def get_connection():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+def similarity_rows(idx, cols=None):
+    """
+    Cosine similarity of catalog rows idx against cols (default: all rows).
+
+    Accumulated one feature at a time rather than through a BLAS matrix
+    product, so a score does not depend on how many rows were scored
+    together and single and batch calls rank identically.
+    """
+    _ensure_loaded()
+    idx = np.atleast_1d(idx)
+    T = X_unit_T if cols is None else X_unit_T[:, cols]
+
+    sims = np.zeros((len(idx), T.shape[1]))
+    for f in range(T.shape[0]):
+        sims += X_unit[idx, f][:, None] * T[f]
+
+    return sims
 
 # ---------------------------------------------------
 # USER INTERACTION HELPERS
 # ---------------------------------------------------
+# foods.food_id (database) -> catalog rows carrying that food name
+_food_id_rows = {}
+_NO_ROWS = np.empty(0, dtype=int)
+
+
+def _resolve_food_ids(conn, food_ids, chunk_size=500):
+    """
+    Map database food ids to catalog rows once; later lookups are a dict
+    hit, so interaction scores index the catalog arrays directly.
+    """
+    _ensure_loaded()
+    missing = [f for f in set(food_ids) if f not in _food_id_rows]
+
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(
+            f"SELECT food_id, food_name FROM foods WHERE food_id IN ({placeholders})",
+            chunk
+        ).fetchall()
+
+        for food_id, food_name in rows:
+            _food_id_rows[food_id] = catalog.ids_of(food_name)
+
+
+@timed("db.user_food_scores")
 def get_user_food_scores(user_id):
-    conn = get_connection()
-    df = pd.read_sql_query(
-        """
-        SELECT food_name, SUM(interaction_weight) AS score
-        FROM user_interactions
-        WHERE user_id = ?
-        GROUP BY food_name
-        """,
-        conn,
-        params=(user_id,)
-    )
-    conn.close()
+    with db.connection() as conn:
+        df = pd.read_sql_query(
+            """
+            SELECT f.food_name, s.score
+            FROM user_food_scores s
+            JOIN foods f ON f.food_id = s.food_id
+            WHERE s.user_id = ?
+            """,
+            conn,
+            params=(user_id,)
+        )
 
     if df.empty:
         return {}
@@ -56,149 +255,623 @@ def get_user_food_scores(user_id):
     return dict(zip(df["food_name"], df["score"]))
 
 
+@timed("db.users_food_id_scores")
+def get_users_food_id_scores(user_ids, chunk_size=500):
+    """
+    {user_id: {food_id: score}} for many users, one query per chunk of ids
+    against the user_food_scores aggregate. Users without any interactions
+    are absent from the result.
+    """
+    user_ids = list(user_ids)
+    scores = {}
+
+    with db.connection() as conn:
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"""
+                SELECT user_id, food_id, score
+                FROM user_food_scores
+                WHERE user_id IN ({placeholders})
+                """,
+                chunk
+            ).fetchall()
+
+            for user_id, food_id, score in rows:
+                scores.setdefault(user_id, {})[food_id] = score
+
+        _resolve_food_ids(conn, [f for s in scores.values() for f in s])
+
+    return scores
+
+
+@timed("db.cold_start_check")
 def is_cold_start_user(user_id):
-    conn = get_connection()
-    cursor = conn.cursor()
+    with db.connection() as conn:
+        has_interactions = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM user_summary WHERE user_id = ?)",
+            (user_id,)
+        ).fetchone()[0]
 
-    cursor.execute(
-        "SELECT COUNT(*) FROM user_interactions WHERE user_id = ?",
-        (user_id,)
-    )
-    count = cursor.fetchone()[0]
-    conn.close()
+    return not has_interactions
+
+# ---------------------------------------------------
+# COLLABORATIVE SIGNAL (ITEM CO-OCCURRENCE)
+# ---------------------------------------------------
+_cooccur = None
+_cooccur_lock = threading.Lock()
+_cooccur_task = None
+_cooccur_next_update = 0.0
+# catalog food name -> foods.food_id (None when not in the database)
+_db_food_ids = {}
+
+
+def _update_cooccurrence():
+    global _cooccur
+    try:
+        if _cooccur is None:
+            _cooccur = load_cooccurrence()
+        else:
+            with span("cooccurrence.refresh"):
+                _cooccur.refresh(model_path_for(db.DB_PATH))
+    except Exception as e:
+        print(f"⚠ Co-occurrence update failed: {e}")
+
+
+def get_cooccurrence(wait=False):
+    """
+    The co-occurrence model, or None until its first load has finished
+    (and when the collaborative term is switched off). Loading and the
+    periodic refresh run on a background thread, so requests never wait
+    for them; wait=True blocks until the current update is done.
+    """
+    global _cooccur_task, _cooccur_next_update
+
+    if not HYBRID_WEIGHTS.get("collaborative"):
+        return None
+
+    if time.monotonic() >= _cooccur_next_update:
+        with _cooccur_lock:
+            if time.monotonic() >= _cooccur_next_update and not (
+                _cooccur_task is not None and _cooccur_task.is_alive()
+            ):
+                _cooccur_next_update = time.monotonic() + COOCCUR_REFRESH_SECONDS
+                _cooccur_task = threading.Thread(
+                    target=_update_cooccurrence, name="cooccurrence", daemon=True
+                )
+                _cooccur_task.start()
+
+    task = _cooccur_task
+    if wait and task is not None:
+        task.join()
+
+    return _cooccur
+
+
+def _db_food_id(name):
+    if name not in _db_food_ids:
+        with db.connection() as conn:
+            row = conn.execute("SELECT food_id FROM foods WHERE food_name = ?", (name,)).fetchone()
+        _db_food_ids[name] = row[0] if row else None
+    return _db_food_ids[name]
+
+
+def _collaborative_key(selected_food):
+    """
+    Digest of the selected food's co-occurrence row, for the result cache
+    key: cached results go stale only when that row changes.
+    """
+    model = get_cooccurrence()
+    if model is None:
+        return None
+
+    food_ids, sims = model.similar_items(_db_food_id(selected_food))
+    return hashlib.blake2b(food_ids.tobytes() + sims.tobytes(), digest_size=8).hexdigest()
+
+
+def _interaction_key(user_id, selected_food):
+    """
+    Digest of the user's interaction scores as they feed the result, for
+    the result cache key. The selected food is never recommended, so its
+    own score only counts through the normalizer (the max): the view /
+    recommend events of a repeat click change the key only when that
+    food holds the user's top score.
+    """
+    if user_id is None:
+        return None
+
+    scores = get_users_food_id_scores([user_id]).get(user_id)
+    if not scores:
+        return None
+
+    # foods outside the catalog have no rows and do not count
+    scores = {f: s for f, s in scores.items() if len(_food_id_rows.get(f, _NO_ROWS))}
+    own = _db_food_id(selected_food)
+    others = sorted((f, s) for f, s in scores.items() if f != own)
+
+    return hashlib.blake2b(
+        repr((max(scores.values(), default=0.0), others)).encode("utf-8"), digest_size=8
+    ).hexdigest()
+
+
+def _collaborative_vectors(idx):
+    """
+    Collaborative score per catalog row for every selected row in idx:
+    the cosine co-occurrence of each food with the selected one across all
+    users' interactions (one sparse row lookup), normalized by its max.
+    """
+    collab = np.zeros((len(idx), len(catalog)))
+    model = get_cooccurrence()
+    if model is None:
+        return collab
 
-    return count == 0
+    with db.connection() as conn:
+        for j, i in enumerate(idx):
+            food_ids, sims = model.similar_items(_db_food_id(str(catalog.foods[i])))
+            _resolve_food_ids(conn, food_ids.tolist())
+            for food_id, sim in zip(food_ids.tolist(), sims):
+                collab[j, _food_id_rows.get(food_id, _NO_ROWS)] = sim
+
+    peak = collab.max(axis=1, keepdims=True, initial=0.0)
+    np.divide(collab, peak, out=collab, where=peak > 0)
+
+    return collab
 
 # ---------------------------------------------------
 # COLD START RECOMMENDATIONS
 # ---------------------------------------------------
 def cold_start_recommendations(top_n=5):
-    df = nutrition_df.copy()
+    _ensure_loaded()
+    health = catalog.column("health_score_norm")
+    rows = np.argsort(-health, kind="stable")[:top_n]
+
+    df = catalog.to_frame(rows)
     df["hybrid_score"] = df["health_score_norm"]
     df["confidence"] = 60.0  # baseline confidence
 
-    return df.sort_values(
-        "health_score_norm",
-        ascending=False
-    ).head(top_n)
+    return df
 
 # ---------------------------------------------------
 # CONFIDENCE SCORE
 # ---------------------------------------------------
+CONFIDENCE_WEIGHTS = {"similarity": 0.5, "interaction": 0.3, "health": 0.2}
+
+
 def compute_confidence(row):
     similarity = row.get("similarity", 0)
     interaction = row.get("interaction_score", 0)
     health = row.get("health_score_norm", 0) / 100
 
     confidence = (
-        0.5 * similarity +
-        0.3 * interaction +
-        0.2 * health
+        CONFIDENCE_WEIGHTS["similarity"] * similarity +
+        CONFIDENCE_WEIGHTS["interaction"] * interaction +
+        CONFIDENCE_WEIGHTS["health"] * health
     )
 
     return round(confidence * 100, 1)
 
+# ---------------------------------------------------
+# SCORING KERNEL (NumPy only)
+# ---------------------------------------------------
+RESULT_COLUMNS = [
+    "food",
+    "protein",
+    "fat",
+    "carbs",
+    "fiber",
+    "calories",
+    "health_score_norm",
+    "similarity",
+    "interaction_score",
+    "collaborative_score",
+    "hybrid_score",
+    "confidence",
+]
+
+def _interaction_vector(food_id_scores):
+    """
+    Interaction score per catalog row, normalized by its max.
+    """
+    inter = np.zeros(len(catalog))
+    for food_id, score in food_id_scores.items():
+        inter[_food_id_rows.get(food_id, _NO_ROWS)] = score
+
+    if len(inter) and inter.max() > 0:
+        inter /= inter.max()
+
+    return inter
+
+
+def _hybrid_scores(similarity, health, interaction, collaborative):
+    return (
+        HYBRID_WEIGHTS["similarity"] * similarity +
+        HYBRID_WEIGHTS["health"] * health +
+        HYBRID_WEIGHTS["interaction"] * interaction +
+        HYBRID_WEIGHTS["collaborative"] * collaborative
+    )
+
+
+def _confidence_scores(similarity, health, interaction):
+    """
+    Vectorized compute_confidence.
+    """
+    confidence = (
+        CONFIDENCE_WEIGHTS["similarity"] * similarity +
+        CONFIDENCE_WEIGHTS["interaction"] * interaction +
+        CONFIDENCE_WEIGHTS["health"] * health
+    )
+    return np.round(confidence * 100, 1)
+
+
+def _top_n_matrix(scores, top_n):
+    """
+    Column ids of the top_n scores of every row, highest first, using a
+    partial sort instead of sorting the whole catalog.
+    """
+    top_n = min(top_n, scores.shape[1])
+    if top_n <= 0:
+        return np.empty((scores.shape[0], 0), dtype=int)
+
+    top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+
+    # argpartition picks arbitrarily among ties at the cut; keep the
+    # lowest row ids there so ties resolve like a stable sort
+    kth = top_scores.min(axis=1, keepdims=True)
+    cut_ties = (scores == kth).sum(axis=1) > (top_scores == kth).sum(axis=1)
+    for r in np.flatnonzero(cut_ties):
+        cols = np.flatnonzero(scores[r] >= kth[r])
+        top[r] = cols[np.lexsort((cols, -scores[r, cols]))][:top_n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+
+    order = np.lexsort((top, -top_scores), axis=1)
+
+    return np.take_along_axis(top, order, axis=1)
+
+
+def _result_frame(rows, similarity, health, interaction, collaborative, hybrid):
+    """
+    Result frame for the winning rows only.
+    """
+    df = catalog.to_frame(rows)
+    df["similarity"] = similarity
+    df["interaction_score"] = interaction
+    df["collaborative_score"] = collaborative
+    df["hybrid_score"] = hybrid
+    df["confidence"] = _confidence_scores(similarity, health, interaction)
+    return df
+
+
+def _score_block(idx, inter, collab, top_n, cols=None):
+    """
+    Hybrid scoring kernel.
+
+    idx    : selected catalog rows, one per output
+    inter  : interaction scores, shape (len(idx), n_cols)
+    collab : collaborative scores, same shape as inter
+    cols   : candidate catalog rows (None = whole catalog)
+
+    Foods named like the selected one are excluded. Returns one result
+    frame per selected row.
+    """
+    if cols is None:
+        health, codes = health_norm, catalog.codes
+    else:
+        health, codes = health_norm[cols], catalog.codes[cols]
+
+    sims = similarity_rows(idx, cols)
+    hybrid = _hybrid_scores(sims, health, inter, collab)
+    hybrid[catalog.codes[idx][:, None] == codes[None, :]] = -np.inf
+
+    top = _top_n_matrix(hybrid, top_n)
+
+    frames = []
+    for j in range(len(idx)):
+        t = top[j][np.isfinite(hybrid[j, top[j]])]
+        rows = t if cols is None else cols[t]
+        frames.append(
+            _result_frame(
+                rows, sims[j, t], health[t], inter[j, t], collab[j, t], hybrid[j, t]
+            )
+        )
+
+    return frames
+
 # ---------------------------------------------------
 # HYBRID RECOMMENDER
 # ---------------------------------------------------
+def _recommend_from_index(idx, inter, collab, top_n):
+    """
+    Score only the precomputed neighbors of idx plus the foods the user
+    interacted with or that co-occur with idx. Every other food has
+    similarity <= the k-th neighbor's and no interaction or collaborative
+    score, so if the top_n-th candidate beats that upper bound the result
+    equals the full scan. Returns None otherwise.
+    """
+    if neighbor_index is None or top_n <= 0:
+        return None
+
+    neighbors = neighbor_index["neighbors"][idx]
+    if top_n >= len(neighbors):
+        return None
+
+    candidates = np.union1d(neighbors, np.flatnonzero(inter + collab))
+
+    recs = _score_block(
+        np.array([idx]), inter[None, candidates], collab[None, candidates], top_n, candidates
+    )[0]
+
+    if len(recs) < top_n:
+        return None
+
+    bound = (
+        HYBRID_WEIGHTS["similarity"] * (float(neighbor_index["sims"][idx, -1]) + 1e-6) +
+        HYBRID_WEIGHTS["health"] * max_health_norm
+    )
+
+    if recs["hybrid_score"].iloc[top_n - 1] <= bound:
+        return None
+
+    return recs
+
+
+def _recommend_scan(idx, inter, collab, top_n):
+    """
+    Score the similarity backend's candidates for idx plus the foods the
+    user interacted with or that co-occur with idx (the whole catalog for
+    the exact backend). Falls back to the whole catalog when the candidates
+    cannot fill top_n.
+    """
+    cols = similarity_index.candidates(X_unit[idx])
+
+    if cols is not None:
+        cols = np.union1d(cols, np.flatnonzero(inter + collab))
+        recs = _score_block(np.array([idx]), inter[None, cols], collab[None, cols], top_n, cols)[0]
+        if len(recs) >= min(top_n, len(catalog) - 1):
+            return recs
+
+    return _score_block(np.array([idx]), inter[None, :], collab[None, :], top_n)[0]
+
+
+# ---------------------------------------------------
+# RESULT CACHE
+# ---------------------------------------------------
+_result_cache = LRUCache(REC_CACHE_SIZE)
+_disk_cache = None
+
+
+def configure_result_cache(max_entries=REC_CACHE_SIZE, disk_path=REC_DISK_CACHE_PATH):
+    """
+    Resize the in-process result cache (dropping its entries) and open or
+    close the shared disk cache.
+    """
+    global _result_cache, _disk_cache
+    _result_cache = LRUCache(max_entries)
+    if _disk_cache is not None:
+        _disk_cache.close()
+    _disk_cache = DiskResultCache(disk_path) if disk_path else None
+
+
+def result_cache_stats():
+    """
+    Hit / miss / eviction counts of the result caches.
+    """
+    stats = {"memory": _result_cache.stats()}
+    if _disk_cache is not None:
+        stats["disk"] = _disk_cache.stats()
+    return stats
+
+
+def _copy_result(recs):
+    return recs.copy() if isinstance(recs, pd.DataFrame) else recs
+
+
+@timed("recommend_snacks")
 def recommend_snacks(selected_food, user_id=None, top_n=5):
+    """
+    Cached _recommend_snacks: a repeat request is served from memory until
+    the catalog or the user's interactions that feed it change. Callers
+    get their own copy of the result.
+    """
+    _ensure_loaded()
+
+    key = (
+        selected_food, user_id, top_n, catalog.version,
+        _interaction_key(user_id, selected_food), similarity_index.describe(),
+        _collaborative_key(selected_food),
+    )
+
+    recs = _result_cache.get(key)
+    if recs is None and _disk_cache is not None:
+        recs = _disk_cache.get(key)
+        if recs is not None:
+            _result_cache.put(key, recs)
+
+    if recs is None:
+        recs = _recommend_snacks(selected_food, user_id, top_n)
+        # the copy is consolidated, so copies served from it are cheap
+        stored = _copy_result(recs)
+        _result_cache.put(key, stored)
+        if _disk_cache is not None:
+            _disk_cache.put(key, stored)
+        return recs
+
+    return _copy_result(recs)
+
+
+def _recommend_snacks(selected_food, user_id=None, top_n=5):
+    _ensure_loaded()
 
     # Cold-start handling
     if user_id and is_cold_start_user(user_id):
         return cold_start_recommendations(top_n)
 
-    if selected_food not in nutrition_df["food"].values:
+    idx = catalog.food_id(selected_food)
+    if idx is None:
         return f"❌ '{selected_food}' not found in nutrition dataset."
 
-    idx = nutrition_df[nutrition_df["food"] == selected_food].index[0]
-
-    sim_scores = cosine_similarity([X_norm[idx]], X_norm)[0]
+    with span("recommend.interactions"):
+        interaction_scores = {}
+        if user_id is not None:
+            interaction_scores = get_users_food_id_scores([user_id]).get(user_id, {})
+        inter = _interaction_vector(interaction_scores)
 
-    df = nutrition_df.copy()
-    df["similarity"] = sim_scores
-    df["health_norm"] = df["health_score_norm"] / 100
+    with span("recommend.collaborative"):
+        collab = _collaborative_vectors([idx])[0]
 
-    interaction_scores = {}
-    if user_id is not None:
-        interaction_scores = get_user_food_scores(user_id)
+    # Fast path: precomputed top-K neighbors
+    with span("recommend.neighbor_index"):
+        recs = _recommend_from_index(idx, inter, collab, top_n)
 
-    df["interaction_score"] = df["food"].map(
-        lambda f: interaction_scores.get(f, 0)
-    )
+    # Fallback: the similarity backend (full scan for "exact")
+    if recs is None:
+        with span("recommend.scan"):
+            recs = _recommend_scan(idx, inter, collab, top_n)
 
-    if df["interaction_score"].max() > 0:
-        df["interaction_score"] /= df["interaction_score"].max()
+    return recs
 
-    df["hybrid_score"] = (
-        0.55 * df["similarity"] +
-        0.25 * df["health_norm"] +
-        0.20 * df["interaction_score"]
+# ---------------------------------------------------
+# BATCH RECOMMENDER
+# ---------------------------------------------------
+@timed("recommend_snacks_batch")
+def recommend_snacks_batch(pairs, top_n=5):
+    """
+    recommend_snacks for many (selected_food, user_id) pairs at once.
+
+    Interaction scores for all users come from one query, similarity is
+    computed per block of pairs, and the top_n of each row is picked
+    by partial sorting. Returns a list aligned with pairs holding what
+    recommend_snacks returns for each pair.
+    """
+    _ensure_loaded()
+    pairs = list(pairs)
+    results = [None] * len(pairs)
+
+    user_scores = get_users_food_id_scores(
+        {user_id for _, user_id in pairs if user_id is not None}
     )
 
-    df = df[df["food"] != selected_food]
-    df["confidence"] = df.apply(compute_confidence, axis=1)
-
-    return df.sort_values(
-        "hybrid_score",
-        ascending=False
-    ).head(top_n)[
-        [
-            "food",
-            "protein",
-            "fat",
-            "carbs",
-            "fiber",
-            "calories",
-            "health_score_norm",
-            "similarity",
-            "interaction_score",
-            "hybrid_score",
-            "confidence",
-        ]
-    ]
+    cold_start = None
+    pending = []
+    for i, (food, user_id) in enumerate(pairs):
+        if user_id and user_id not in user_scores:
+            if cold_start is None:
+                cold_start = cold_start_recommendations(top_n)
+            results[i] = cold_start.copy()
+        elif food not in catalog:
+            results[i] = f"❌ '{food}' not found in nutrition dataset."
+        else:
+            pending.append(i)
+
+    n_foods = len(catalog)
+    no_interactions = np.zeros(n_foods)
+    inter_vectors = {
+        user_id: _interaction_vector(scores)
+        for user_id, scores in user_scores.items()
+    }
+
+    if similarity_index.approximate:
+        # candidate sets differ per selected food, so score pair by pair
+        for i in pending:
+            food, user_id = pairs[i]
+            idx = catalog.food_id(food)
+            results[i] = _recommend_scan(
+                idx, inter_vectors.get(user_id, no_interactions),
+                _collaborative_vectors([idx])[0], top_n
+            )
+        return results
+
+    block_rows = max(1, BATCH_MAX_CELLS // max(n_foods, 1))
+
+    for start in range(0, len(pending), block_rows):
+        block = pending[start:start + block_rows]
+        idx = np.array([catalog.food_id(pairs[i][0]) for i in block])
+        inter = np.vstack([
+            inter_vectors.get(pairs[i][1], no_interactions) for i in block
+        ])
+        collab = _collaborative_vectors(idx)
+
+        for i, recs in zip(block, _score_block(idx, inter, collab, top_n)):
+            results[i] = recs
+
+    return results
 
 # ---------------------------------------------------
 # USER NUTRIENT PREFERENCES
 # ---------------------------------------------------
+def sync_food_nutrients(force=False):
+    """
+    Copy catalog nutrient values into food_nutrients, which the interaction
+    trigger uses to keep per-user nutrient sums current. Runs only when the
+    catalog changed (or force=True); existing users' sums are then rebuilt.
+    Returns the number of users rebuilt, or None when already in sync.
+
+    Not part of loading: call it once at startup, before interactions are
+    logged (app.py, bench_suite.py).
+    """
+    _ensure_loaded()
+
+    with db.connection() as conn:
+        if not force and db.get_meta(conn, "catalog_version") == catalog.version:
+            return None
+
+        names = catalog.names()
+        ids = [catalog.food_id(n) for n in names]
+        values = np.column_stack(
+            [catalog.column(c)[ids] for c in db.NUTRIENT_COLUMNS]
+        ).tolist()
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO foods (food_name) VALUES (?)",
+            ((n,) for n in names)
+        )
+        conn.execute("DELETE FROM food_nutrients")
+        conn.executemany(
+            """
+            INSERT INTO food_nutrients
+            (food_id, protein, fat, carbs, fiber, calories, health_score_norm)
+            SELECT food_id, ?, ?, ?, ?, ?, ?
+            FROM foods
+            WHERE food_name = ?
+            """,
+            (v + [n] for v, n in zip(values, names))
+        )
+
+        users = db.rebuild_nutrient_sums(conn)
+        db.set_meta(conn, "catalog_version", catalog.version)
+
+    return users
+
+
+@timed("preferences")
 def get_user_nutrient_preferences(user_id):
-    conn = get_connection()
-    rows = conn.execute(
-        """
-        SELECT food_name, interaction_weight
-        FROM user_interactions
-        WHERE user_id = ?
-        """,
-        (user_id,)
-    ).fetchall()
-    conn.close()
-
-    if not rows:
-        return None
-
-    totals = {n: 0 for n in NUTRITION_FEATURES}
-    weight_sum = 0
-
-    for food, w in rows:
-        r = nutrition_df[nutrition_df["food"] == food]
-        if r.empty:
-            continue
-
-        for n in NUTRITION_FEATURES:
-            totals[n] += r.iloc[0][n] * w
-
-        weight_sum += w
-
-    if weight_sum == 0:
+    """
+    Interaction-weighted average nutrient profile of a user, read from the
+    running sums kept by the interaction trigger. None without history.
+    """
+    _ensure_loaded()  # sums follow the current catalog
+    with db.connection() as conn:
+        row = conn.execute(
+            """
+            SELECT weight_sum, protein, fat, carbs, fiber, calories,
+                   health_score_norm
+            FROM user_nutrient_sums
+            WHERE user_id = ?
+            """,
+            (user_id,)
+        ).fetchone()
+
+    if row is None or row[0] == 0:
         return None
 
-    for n in totals:
-        totals[n] /= weight_sum
-
-    return totals
+    weight_sum, *sums = row
+    return {n: total / weight_sum for n, total in zip(db.NUTRIENT_COLUMNS, sums)}
 
 # ---------------------------------------------------
 # EXPLAINABILITY
 # ---------------------------------------------------
+@timed("explain_recommendation")
 def explain_recommendation(selected_row, recommended_row, user_prefs=None):
     reasons = []
 
@@ -0,0 +1,142 @@
+# NM_review_stats.py
+import pandas as pd
+
+from NM_columnar import read_table, write_table
+
+# ---------------------------------------------------
+# AGGREGATE CONFIG
+# ---------------------------------------------------
+# The all-products totals are stored as one more row under this key.
+GLOBAL_ASIN = "__all__"
+TOP_N_REVIEWS = 5
+
+SENTIMENT_LABELS = ["positive", "negative", "neutral"]
+STATS_COLUMNS = (
+    ["asin", "review_count"] + SENTIMENT_LABELS + ["rating_mean", "top_review_ids"]
+)
+
+RATING_COLUMNS = ["rating", "overall"]
+HELPFUL_COLUMNS = ["helpful_vote", "helpful_votes"]
+
+
+def _first_present(df, candidates):
+    for col in candidates:
+        if col in df.columns:
+            return col
+    return None
+
+
+# ---------------------------------------------------
+# BUILD (one merged chunk at a time)
+# ---------------------------------------------------
+class ReviewAggregator:
+    """
+    Per-ASIN review counts, sentiment counts, mean rating and the ids of
+    the top_n most helpful reviews, accumulated chunk by chunk.
+
+    Memory follows the number of products, not the number of reviews.
+    """
+
+    def __init__(self, top_n=TOP_N_REVIEWS):
+        self.top_n = top_n
+        self.sums = None
+        self.top = None
+
+    def add(self, merged):
+        """
+        merged needs asin, review_id and sentiment; a rating and a helpful
+        vote column are used when present.
+        """
+        if merged.empty:
+            return
+
+        rating_col = _first_present(merged, RATING_COLUMNS)
+        helpful_col = _first_present(merged, HELPFUL_COLUMNS)
+
+        labels = merged["sentiment"].astype(str).str.lower()
+        chunk = pd.DataFrame({
+            "asin": merged["asin"].astype(str),
+            "review_count": 1,
+        })
+        for label in SENTIMENT_LABELS:
+            chunk[label] = (labels == label).astype("int64")
+
+        if rating_col:
+            rating = pd.to_numeric(merged[rating_col], errors="coerce")
+            chunk["rating_sum"] = rating.fillna(0.0)
+            chunk["rating_n"] = rating.notna().astype("int64")
+        else:
+            chunk["rating_sum"] = 0.0
+            chunk["rating_n"] = 0
+
+        sums = chunk.groupby("asin").sum()
+        self.sums = sums if self.sums is None else self.sums.add(sums, fill_value=0)
+
+        helpful = (
+            pd.to_numeric(merged[helpful_col], errors="coerce").fillna(0)
+            if helpful_col else 0
+        )
+        candidates = pd.DataFrame({
+            "asin": chunk["asin"],
+            "review_id": merged["review_id"].to_numpy(),
+            "helpful": helpful,
+        })
+        if self.top is not None:
+            candidates = pd.concat([self.top, candidates], ignore_index=True)
+        self.top = self._top_n(candidates)
+
+    def _top_n(self, candidates):
+        ranked = candidates.sort_values(
+            ["helpful", "review_id"], ascending=[False, True], kind="stable"
+        )
+        return ranked.groupby("asin", sort=False).head(self.top_n)
+
+    def result(self):
+        """
+        One row per ASIN plus the GLOBAL_ASIN totals row, STATS_COLUMNS.
+        """
+        if self.sums is None:
+            return pd.DataFrame(columns=STATS_COLUMNS)
+
+        sums = self.sums.copy()
+        sums.loc[GLOBAL_ASIN] = sums.sum()
+
+        global_top = self.top.assign(asin=GLOBAL_ASIN)
+        top = pd.concat([self.top, self._top_n(global_top)], ignore_index=True)
+        top_ids = top.groupby("asin")["review_id"].agg(lambda ids: [int(i) for i in ids])
+
+        stats = pd.DataFrame({
+            "asin": sums.index,
+            "review_count": sums["review_count"].astype("int64").to_numpy(),
+        })
+        for label in SENTIMENT_LABELS:
+            stats[label] = sums[label].astype("int64").to_numpy()
+
+        rating_n = sums["rating_n"].where(sums["rating_n"] > 0)
+        stats["rating_mean"] = (sums["rating_sum"] / rating_n).to_numpy()
+        stats["top_review_ids"] = top_ids.reindex(sums.index).to_numpy()
+
+        return stats[STATS_COLUMNS]
+
+    def write(self, path):
+        stats = self.result()
+        write_table(stats, path)
+        return stats
+
+
+# ---------------------------------------------------
+# READ
+# ---------------------------------------------------
+def load_review_stats(path, asins=None, columns=None):
+    """
+    Aggregate rows for these ASINs (only their partitions are opened);
+    asins=None returns every product and the GLOBAL_ASIN row.
+    """
+    return read_table(path, columns=columns, asins=asins)
+
+
+def global_review_stats(path, columns=None):
+    """
+    The all-products totals row, as a one-row DataFrame.
+    """
+    return load_review_stats(path, asins=[GLOBAL_ASIN], columns=columns)
@@ -1,26 +1,227 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
 
-# Initialize VADER once
-sid = SentimentIntensityAnalyzer()
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
 
-def get_sentiment(text):
+# texts handed to a worker at a time by get_sentiment_batch
+BATCH_CHUNK_SIZE = 2000
+
+# Bump when scoring changes (analyzer, lexicon, text normalization) so old
+# cache entries stop matching.
+CACHE_VERSION = 1
+# keys per SELECT ... IN (...) lookup, below SQLite's bound-parameter limit
+CACHE_LOOKUP_BATCH = 900
+
+_sid = None
+
+
+def get_analyzer():
     """
-    Input  : review text (string)
-    Output : 'positive', 'negative', or 'neutral'
+    VADER analyzer, built once on first use (importing nltk and loading
+    the lexicon is slow, so it is not done at import time).
     """
+    global _sid
+    if _sid is None:
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        _sid = SentimentIntensityAnalyzer()
+    return _sid
+
 
+def _compound(text):
     # Handle missing / empty text safely
     if pd.isna(text) or str(text).strip() == "":
-        return "neutral"
-
-    text = str(text)
+        return 0.0
+    return get_analyzer().polarity_scores(str(text))["compound"]
 
-    score = sid.polarity_scores(text)["compound"]
 
-    if score >= 0.05:
+def _label(score):
+    if score >= POSITIVE_THRESHOLD:
         return "positive"
-    elif score <= -0.05:
+    elif score <= NEGATIVE_THRESHOLD:
         return "negative"
     else:
         return "neutral"
+
+
+def get_sentiment(text):
+    """
+    Input  : review text (string)
+    Output : 'positive', 'negative', or 'neutral'
+    """
+    return _label(_compound(text))
+
+
+# ---------------------------------------------------
+# BATCH SCORING (process pool)
+# ---------------------------------------------------
+_pool = None
+_pool_workers = 0
+
+
+def _score_chunk(texts):
+    return [_compound(t) for t in texts]
+
+
+def _get_pool(workers):
+    """
+    Process pool reused across calls; each worker builds its own analyzer
+    once, in the initializer.
+    """
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        _shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=get_analyzer)
+        _pool_workers = workers
+    return _pool
+
+
+def _shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
+
+
+atexit.register(_shutdown_pool)
+
+
+# ---------------------------------------------------
+# PERSISTENT CACHE (compound score by text hash)
+# ---------------------------------------------------
+def normalize_text(text):
+    """
+    Text as VADER sees it: whitespace runs collapse to one space, since the
+    analyzer tokenizes on whitespace. Missing text becomes "".
+    """
+    if pd.isna(text):
+        return ""
+    return " ".join(str(text).split())
+
+
+def text_key(normalized):
+    """
+    16-byte content hash of an already normalized text.
+    """
+    h = hashlib.blake2b(digest_size=16, person=b"vader-v%d" % CACHE_VERSION)
+    h.update(normalized.encode("utf-8"))
+    return h.digest()
+
+
+class SentimentCache:
+    """
+    On-disk map from text hash to VADER compound score (one SQLite file).
+
+    Lookups and writes are done in bulk by get_sentiment_batch; hits and
+    lookups count distinct texts across the cache's lifetime.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment_cache (
+                text_key BLOB PRIMARY KEY,
+                compound REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+        self.hits = 0
+        self.lookups = 0
+
+    def get_many(self, keys):
+        """
+        {key: compound} for the keys already cached.
+        """
+        found = {}
+        for i in range(0, len(keys), CACHE_LOOKUP_BATCH):
+            batch = keys[i:i + CACHE_LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self.conn.execute(
+                "SELECT text_key, compound FROM sentiment_cache "
+                f"WHERE text_key IN ({placeholders})",
+                batch
+            ))
+        self.lookups += len(keys)
+        self.hits += len(found)
+        return found
+
+    def put_many(self, items):
+        """
+        Store (key, compound) pairs in one transaction.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sentiment_cache (text_key, compound) "
+                "VALUES (?, ?)",
+                items
+            )
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def get_sentiment_batch(texts, workers=None, chunk_size=BATCH_CHUNK_SIZE, cache=None):
+    """
+    Score many texts at once, split into chunks across a process pool.
+
+    Returns (compound, labels): a float array of VADER compound scores and
+    an object array of get_sentiment labels, both in input order.
+    workers defaults to os.cpu_count(); workers=1 scores in-process.
+
+    Each distinct text is scored once. With a SentimentCache, cached texts
+    are not scored at all and newly scored ones are written back.
+    """
+    codes, uniques = pd.factorize(pd.Series([normalize_text(t) for t in texts], dtype=object))
+    unique_scores = np.zeros(len(uniques))
+
+    # empty text is neutral (0.0) and never scored or cached
+    todo = np.array([i for i, u in enumerate(uniques) if u], dtype=np.intp)
+
+    if cache is not None and len(todo):
+        keys = [text_key(uniques[i]) for i in todo]
+        found = cache.get_many(keys)
+        hit = np.fromiter((k in found for k in keys), dtype=bool, count=len(keys))
+        unique_scores[todo[hit]] = [found[k] for k, h in zip(keys, hit) if h]
+        miss_keys = [k for k, h in zip(keys, hit) if not h]
+        todo = todo[~hit]
+
+    to_score = [uniques[i] for i in todo]
+    workers = workers or os.cpu_count() or 1
+    chunks = [to_score[i:i + chunk_size] for i in range(0, len(to_score), chunk_size)]
+
+    if workers <= 1 or len(chunks) <= 1:
+        scored = map(_score_chunk, chunks)
+    else:
+        scored = _get_pool(workers).map(_score_chunk, chunks)
+
+    new_scores = np.fromiter(
+        (s for chunk in scored for s in chunk), dtype=float, count=len(to_score)
+    )
+    unique_scores[todo] = new_scores
+
+    if cache is not None and len(to_score):
+        cache.put_many(zip(miss_keys, new_scores.tolist()))
+
+    compound = unique_scores[codes]
+
+    labels = np.full(len(compound), "neutral", dtype=object)
+    labels[compound >= POSITIVE_THRESHOLD] = "positive"
+    labels[compound <= NEGATIVE_THRESHOLD] = "negative"
+
+    return compound, labels
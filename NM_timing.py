@@ -0,0 +1,184 @@
+# NM_timing.py
+"""
+Timing spans for the request path.
+
+    with span("recommend.scan"):
+        ...
+
+    @timed("db.user_food_scores")
+    def get_users_food_id_scores(...):
+        ...
+
+Off by default: a disabled span costs one flag check and returns a shared
+no-op context manager. Enabled spans keep the last WINDOW durations of
+every name (so percentiles follow recent traffic) plus lifetime count,
+total and max, and log their summaries every LOG_INTERVAL seconds.
+
+    enable()        # start collecting
+    stats()         # {name: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+    log_stats()     # one JSON log record per span on the "nutrimatch.timing" logger
+"""
+import atexit
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+
+# ---------------------------------------------------
+# TIMING CONFIG
+# ---------------------------------------------------
+ENABLED = False
+WINDOW = 2048              # recent durations kept per span for percentiles
+LOG_INTERVAL = 300         # seconds between automatic log dumps (None = never)
+
+logger = logging.getLogger("nutrimatch.timing")
+
+
+# ---------------------------------------------------
+# ROLLING STATS
+# ---------------------------------------------------
+class SpanStats:
+    """
+    Ring buffer of the last `window` durations plus lifetime totals.
+    """
+
+    __slots__ = ("samples", "count", "total", "max")
+
+    def __init__(self, window=WINDOW):
+        self.samples = np.zeros(window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def summary(self):
+        recent = 1000 * self.samples[:min(self.count, len(self.samples))]
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99]) if len(recent) else (0.0,) * 3
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "max_ms": 1000 * self.max,
+        }
+
+
+_spans = {}
+_lock = threading.Lock()
+_last_log = time.monotonic()
+
+
+def record(name, seconds):
+    global _last_log
+
+    with _lock:
+        stats = _spans.get(name)
+        if stats is None:
+            stats = _spans[name] = SpanStats(WINDOW)
+        stats.add(seconds)
+
+        due = LOG_INTERVAL is not None and time.monotonic() - _last_log >= LOG_INTERVAL
+        if due:
+            _last_log = time.monotonic()
+
+    if due:
+        log_stats()
+
+
+# ---------------------------------------------------
+# SPANS
+# ---------------------------------------------------
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def span(name):
+    """
+    Context manager timing its block under name (no-op when disabled).
+    """
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name):
+    """
+    Decorator timing every call of the function under name.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - t0)
+        return wrapper
+    return decorate
+
+
+# ---------------------------------------------------
+# CONTROL + REPORTING
+# ---------------------------------------------------
+def enable(flag=True):
+    global ENABLED
+    ENABLED = bool(flag)
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+
+
+def stats():
+    """
+    Summary of every span, slowest p95 first.
+    """
+    with _lock:
+        summaries = {name: s.summary() for name, s in _spans.items()}
+    return dict(sorted(summaries.items(), key=lambda kv: -kv[1]["p95_ms"]))
+
+
+def log_stats(level=logging.INFO):
+    """
+    Log one JSON record per span and return the summaries.
+    """
+    summaries = stats()
+    for name, summary in summaries.items():
+        logger.log(level, json.dumps({"event": "timing", "span": name, **{
+            k: round(v, 4) if isinstance(v, float) else v for k, v in summary.items()
+        }}))
+    return summaries
+
+
+@atexit.register
+def _log_on_exit():
+    if ENABLED and _spans:
+        log_stats()
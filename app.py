@@ -1,21 +1,28 @@
-import streamlit as st
+import os
+
 import pandas as pd
+import streamlit as st
 
 # ---------------- IMPORTS ----------------
 from auth import signup_user, login_user
 from NM_recommender import (
-    nutrition_df,
+    get_catalog,
+    sync_food_nutrients,
     recommend_snacks,
     get_user_nutrient_preferences,
     explain_recommendation,
     is_cold_start_user
 )
-from interaction_logger import log_interaction
+from interaction_logger import log_interaction, configure_writer
+import NM_timing
+from NM_linker import load_food_links
+from NM_review_stats import GLOBAL_ASIN, load_review_stats as load_stats_table
 from plots import (
-    nutrition_radar_chart,
-    nutrition_bar_chart,
+    nutrition_radar_image,
+    nutrition_bar_image,
+    nutrition_small_multiples,
     sentiment_pie_chart,
-    user_nutrient_preference_chart
+    user_nutrient_preference_image
 )
 from user_dashboard import (
     get_user_summary,
@@ -30,10 +37,34 @@ st.set_page_config(
     page_icon="🍎"
 )
 
+# Interaction events are written in batches off the request thread
+configure_writer("buffered")
+
+
+# food_nutrients must follow the catalog before any interaction is logged
+# (the trigger reads it); once per server process, not on every rerun.
+@st.cache_resource
+def sync_catalog():
+    sync_food_nutrients()
+    return True
+
+
+sync_catalog()
+
+# Span timings panel in the sidebar, for logged-in users only: everyone
+# when ADMIN_TIMING_PANEL is on, otherwise the usernames in ADMIN_USERS.
+# The panel switches collection on and off and resets the stats for the
+# whole server process.
+ADMIN_TIMING_PANEL = False
+ADMIN_USERS = set()
+
 # ---------------- SESSION INIT ----------------
 if "user_id" not in st.session_state:
     st.session_state.user_id = None
 
+if "username" not in st.session_state:
+    st.session_state.username = None
+
 if "last_recs" not in st.session_state:
     st.session_state.last_recs = None
 
@@ -41,14 +72,37 @@ if "selected_food" not in st.session_state:
     st.session_state.selected_food = None
 
 # ---------------- LOAD REVIEWS ----------------
+# Per-product and all-products sentiment / rating aggregates written by the
+# merge pipeline; small and independent of review volume.
+REVIEW_STATS_PATH = "C:/Users/Chandu/OneDrive/Desktop/NutriMatch/final/review_stats.parquet"
+
 @st.cache_data
-def load_reviews():
-    return pd.read_csv(
-        "C:/Users/Chandu/OneDrive/Desktop/NutriMatch/final/merged_reviews_metadata.csv",
-        low_memory=False
-    )
+def load_review_stats(asins=(GLOBAL_ASIN,)):
+    return load_stats_table(REVIEW_STATS_PATH, asins=asins)
 
-merged_df = load_reviews()
+# Food <-> ASIN links written by NM_linker.py
+FOOD_LINKS_PATH = "C:/Users/Chandu/OneDrive/Desktop/NutriMatch/final/food_links.parquet"
+
+@st.cache_data
+def load_food_review_summary(food):
+    """
+    Review totals over the Amazon products linked to a food, or None when
+    no product is linked to it or the link / review stats files are absent.
+    """
+    if not (os.path.exists(FOOD_LINKS_PATH) and os.path.exists(REVIEW_STATS_PATH)):
+        return None
+
+    asins = tuple(load_food_links(FOOD_LINKS_PATH, foods=[food])["asin"])
+    if not asins:
+        return None
+
+    stats = load_review_stats(asins)
+    reviews = int(stats["review_count"].sum())
+    return {
+        "products": len(asins),
+        "reviews": reviews,
+        "positive_pct": 100 * stats["positive"].sum() / reviews if reviews else 0.0,
+    }
 
 # ---------------- HEADER ----------------
 st.markdown("""
@@ -78,6 +132,7 @@ if st.session_state.user_id is None:
         success, result = login_user(username, password)
         if success:
             st.session_state.user_id = result
+            st.session_state.username = username
             st.rerun()
         else:
             st.sidebar.error(result)
@@ -86,6 +141,7 @@ else:
     st.sidebar.success("Logged in")
     if st.sidebar.button("Logout"):
         st.session_state.user_id = None
+        st.session_state.username = None
         st.session_state.last_recs = None
         st.rerun()
 
@@ -94,6 +150,28 @@ if st.session_state.user_id is None:
     st.info("Please log in to use NutriMatch.")
     st.stop()
 
+# ---------------- ADMIN: TIMINGS ----------------
+if ADMIN_TIMING_PANEL or st.session_state.username in ADMIN_USERS:
+    with st.sidebar.expander("⏱ Timings"):
+        NM_timing.enable(st.checkbox("Collect timings", value=NM_timing.ENABLED))
+
+        timings = NM_timing.stats()
+        if timings:
+            st.dataframe(
+                pd.DataFrame.from_dict(timings, orient="index")
+                [["count", "p50_ms", "p95_ms", "p99_ms", "max_ms"]].round(2),
+                use_container_width=True
+            )
+        else:
+            st.caption("No spans recorded yet.")
+
+        col1, col2 = st.columns(2)
+        if col1.button("Reset"):
+            NM_timing.reset()
+            st.rerun()
+        if col2.button("Write to log"):
+            NM_timing.log_stats()
+
 # ---------------- TABS ----------------
 tab1, tab2, tab3 = st.tabs(["👤 Dashboard", "🔍 Search & Recommend", "📊 Profile"])
 
@@ -128,14 +206,17 @@ with tab1:
 with tab2:
     st.markdown("## 🔍 Find Healthy Alternatives")
 
-    food_list = sorted(nutrition_df["food"].unique())
+    catalog = get_catalog()
+    food_list = sorted(catalog.names())
     selected_food = st.selectbox("Choose a snack:", food_list)
     top_n = st.slider("Number of recommendations:", 3, 10, 5)
+    compact_charts = st.checkbox("Show all charts in one grid", value=False)
 
     if st.button("Get Recommendations"):
         st.session_state.selected_food = selected_food
 
-        log_interaction(st.session_state.user_id, selected_food, "view")
+        # written before recommending: a first view ends the cold start
+        log_interaction(st.session_state.user_id, selected_food, "view", sync=True)
 
         recs = recommend_snacks(
             selected_food,
@@ -148,15 +229,24 @@ with tab2:
 
     if st.session_state.last_recs is not None:
         recs = st.session_state.last_recs
-        selected_row = nutrition_df[nutrition_df["food"] == st.session_state.selected_food].iloc[0]
+        selected_row = catalog.lookup(st.session_state.selected_food)
         prefs = get_user_nutrient_preferences(st.session_state.user_id)
 
         st.markdown("### 🥗 Recommended Alternatives")
 
         for _, row in recs.iterrows():
-            recommended_row = nutrition_df[nutrition_df["food"] == row["food"]].iloc[0]
+            recommended_row = catalog.lookup(row["food"])
             explanation = explain_recommendation(selected_row, recommended_row, prefs)
 
+            review_summary = load_food_review_summary(row["food"])
+            review_line = ""
+            if review_summary:
+                review_line = (
+                    f"<b>Amazon Reviews:</b> {review_summary['reviews']} across "
+                    f"{review_summary['products']} products "
+                    f"({review_summary['positive_pct']:.0f}% positive)<br>"
+                )
+
             st.markdown(f"""
             <div class='card'>
                 <h4 style='color:#1B5E20'>{row['food']}</h4>
@@ -164,16 +254,27 @@ with tab2:
                 <b>Health Score:</b> {row['health_score_norm']:.2f}<br>
                 <b>Protein:</b> {row['protein']}g |
                 <b>Fiber:</b> {row['fiber']}g |
-                <b>Calories:</b> {row['calories']} kcal
+                <b>Calories:</b> {row['calories']} kcal<br>
+                {review_line}
                 <p><i>🧠 {explanation}</i></p>
             </div>
             """, unsafe_allow_html=True)
 
-            col1, col2 = st.columns(2)
-            with col1:
-                st.pyplot(nutrition_bar_chart(recommended_row))
-            with col2:
-                st.pyplot(nutrition_radar_chart(selected_row, recommended_row))
+            if not compact_charts:
+                col1, col2 = st.columns(2)
+                col1.image(nutrition_bar_image(recommended_row), use_container_width=True)
+                col2.image(
+                    nutrition_radar_image(selected_row, recommended_row),
+                    use_container_width=True
+                )
+
+        if compact_charts:
+            st.image(
+                nutrition_small_multiples(
+                    selected_row, [catalog.lookup(food) for food in recs["food"]]
+                ),
+                use_container_width=True
+            )
 
 # ======================================================
 # TAB 3 — PROFILE
@@ -193,4 +294,4 @@ with tab3:
             st.metric("Fat", round(prefs["fat"], 2))
             st.metric("Calories", round(prefs["calories"], 2))
         with col2:
-            st.pyplot(user_nutrient_preference_chart(prefs))
+            st.image(user_nutrient_preference_image(prefs), use_container_width=True)
@@ -0,0 +1,86 @@
+# bench_ingest.py
+"""
+Lines/sec of the serial `json.loads` loop vs the parallel NM_ingest reader.
+
+    python bench_ingest.py --path .../Grocery_and_Gourmet_Food.jsonl.gz
+    python bench_ingest.py --fields asin text rating --workers 1 2 4 8
+
+Without --path, a synthetic review dump is written to a temp file.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+
+from NM_ingest import JSON_BACKEND, iter_jsonl_batches
+
+
+def write_synthetic(path, n, seed=0):
+    rng = random.Random(seed)
+    words = "great tasty fresh stale chips tea coffee box price would buy again".split()
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "rating": float(rng.randint(1, 5)),
+                "title": " ".join(rng.choices(words, k=4)),
+                "text": " ".join(rng.choices(words, k=rng.randint(10, 80))),
+                "images": [],
+                "asin": f"B{rng.randrange(50_000):07d}",
+                "parent_asin": f"B{rng.randrange(50_000):07d}",
+                "user_id": f"U{rng.randrange(10**9)}",
+                "timestamp": 1_600_000_000_000 + i,
+                "helpful_vote": rng.randint(0, 20),
+                "verified_purchase": rng.random() < 0.9,
+            }) + "\n")
+
+
+def serial_lines(path, fields):
+    n = 0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if fields:
+                record = {k: record.get(k) for k in fields}
+            n += 1
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONL ingest benchmark.")
+    parser.add_argument("--path", help="gzip JSONL dump")
+    parser.add_argument("--lines", type=int, default=500_000, help="synthetic lines")
+    parser.add_argument("--fields", nargs="+", help="fields to extract (default: all)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmp, "reviews.jsonl.gz")
+            write_synthetic(path, args.lines)
+
+        print(f"{path}, JSON backend: {JSON_BACKEND}, {os.cpu_count()} cores")
+
+        t0 = time.perf_counter()
+        n = serial_lines(path, args.fields)
+        serial_s = time.perf_counter() - t0
+        print(f"{'serial json.loads':<22} {n / serial_s:12,.0f} lines/s")
+
+        for workers in args.workers:
+            t0 = time.perf_counter()
+            rows = sum(b[0] for b in iter_jsonl_batches(path, args.fields, workers=workers))
+            elapsed = time.perf_counter() - t0
+
+            same = "ok" if rows == n else f"MISMATCH ({rows:,} rows)"
+            print(f"{f'NM_ingest workers={workers}':<22} {rows / elapsed:12,.0f} lines/s"
+                  f"   x{serial_s / elapsed:5.2f}   {same}")
+
+
+if __name__ == "__main__":
+    main()
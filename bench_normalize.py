@@ -0,0 +1,45 @@
+# bench_normalize.py
+"""
+Row-wise Series.apply helpers (as the ETL scripts had them) vs the
+column-wise NM_normalize functions, on a typical synthetic metadata/review
+sample and on an edge-case sample that takes the exact fallbacks.
+Every transform is also checked to give the same values.
+
+    python bench_normalize.py --rows 1000000
+"""
+import argparse
+import time
+
+from normalize_reference import CASES, make_sample, same
+
+
+def run_cases(df):
+    for name, column, ref, fast in CASES:
+        t0 = time.perf_counter()
+        expected = df[column].apply(ref)
+        ref_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        got = fast(df[column])
+        fast_s = time.perf_counter() - t0
+
+        ok = "ok" if same(expected, got) else "MISMATCH"
+        print(f"{name:<26} row-wise {ref_s:7.2f}s   column-wise {fast_s:7.2f}s"
+              f"   x{ref_s / fast_s:5.2f}   {ok}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalization benchmark.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--edge-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"--- typical sample, {args.rows:,} rows")
+    run_cases(make_sample(args.rows))
+
+    print(f"\n--- edge-case sample (mixed types, non-ASCII), {args.edge_rows:,} rows")
+    run_cases(make_sample(args.edge_rows, edge=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# bench_sentiment.py
+"""
+Reviews/sec of serial get_sentiment vs get_sentiment_batch, then a cold
+and a warm pass through a fresh SentimentCache (a rerun on unchanged data).
+
+    python bench_sentiment.py --parquet .../merged_reviews_metadata.parquet --rows 200000
+    python bench_sentiment.py --csv .../merged_reviews_metadata.csv --rows 200000
+    python bench_sentiment.py --workers 1 2 4 8
+
+Without --parquet or --csv, synthetic review texts are scored.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from NM_columnar import read_table
+from NM_sentiment import SentimentCache, get_analyzer, get_sentiment, get_sentiment_batch
+
+WORDS = (
+    "great tasty fresh love good bad awful stale crunchy sweet salty okay "
+    "product snack tea coffee chips box price delivery would buy again not"
+).split()
+
+
+def synthetic_texts(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(5, 60))) for _ in range(n)]
+
+
+def load_texts(args):
+    if args.parquet:
+        texts = read_table(args.parquet, columns=[args.column])[args.column]
+        return texts.head(args.rows).tolist()
+    if args.csv:
+        df = pd.read_csv(args.csv, usecols=[args.column], nrows=args.rows)
+        return df[args.column].tolist()
+    return synthetic_texts(args.rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentiment scoring benchmark.")
+    parser.add_argument("--parquet", help="Parquet dataset holding review text")
+    parser.add_argument("--csv", help="CSV holding review text")
+    parser.add_argument("--column", default="review_clean")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    texts = load_texts(args)
+    get_analyzer()  # lexicon load is not part of the measurement
+    print(f"{len(texts):,} texts, {os.cpu_count()} cores")
+
+    t0 = time.perf_counter()
+    serial = [get_sentiment(t) for t in texts]
+    serial_s = time.perf_counter() - t0
+    print(f"{'serial get_sentiment':<24} {len(texts) / serial_s:12,.0f} reviews/s")
+
+    for workers in args.workers:
+        get_sentiment_batch(texts[:workers], workers=workers)  # start the pool
+
+        t0 = time.perf_counter()
+        _, labels = get_sentiment_batch(texts, workers=workers)
+        elapsed = time.perf_counter() - t0
+
+        same = "ok" if list(labels) == serial else "MISMATCH"
+        print(f"{f'batch workers={workers}':<24} {len(texts) / elapsed:12,.0f} reviews/s"
+              f"   x{serial_s / elapsed:5.2f}   labels {same}")
+
+    workers = max(args.workers)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SentimentCache(os.path.join(tmp, "sentiment_cache.sqlite"))
+        for run in ("cold", "warm"):
+            hits, lookups = cache.hits, cache.lookups
+
+            t0 = time.perf_counter()
+            _, labels = get_sentiment_batch(texts, workers=workers, cache=cache)
+            elapsed = time.perf_counter() - t0
+
+            hit_rate = (cache.hits - hits) / max(cache.lookups - lookups, 1)
+            same = "ok" if list(labels) == serial else "MISMATCH"
+            print(f"{f'cache {run} workers={workers}':<24} {len(texts) / elapsed:12,.0f} reviews/s"
+                  f"   x{serial_s / elapsed:5.2f}   labels {same}   hits {hit_rate:.1%}")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
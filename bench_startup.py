@@ -0,0 +1,80 @@
+# bench_startup.py
+"""
+Cold-start timing: each measurement runs in a fresh interpreter.
+
+  import   : cost of `import <module>` alone (should parse nothing)
+  first use: import + loading the catalog
+  catalog  : CSV parse vs memory-mapped binary artifact
+
+    python bench_startup.py --repeat 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+IMPORT_MODULES = ["NM_recommender", "auth", "interaction_logger", "NM_sentiment", "db"]
+
+FIRST_USE = {
+    "recommender first use": "import NM_recommender; NM_recommender.get_catalog()",
+    "sentiment first use": "import NM_sentiment; NM_sentiment.get_analyzer()",
+}
+
+CATALOG_LOAD = {
+    "catalog from CSV": "load_catalog(use_artifact=False)",
+    "catalog from artifact": "load_catalog(use_artifact=True)",
+}
+
+TIMER = """
+import time
+t0 = time.perf_counter()
+{setup}
+t1 = time.perf_counter()
+{stmt}
+print((time.perf_counter() - t1) * 1000 if {only_stmt} else (time.perf_counter() - t0) * 1000)
+"""
+
+
+def run_ms(stmt, setup="pass", only_stmt=False):
+    code = TIMER.format(setup=setup, stmt=stmt, only_stmt=only_stmt)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if out.returncode != 0:
+        error = out.stderr.strip().splitlines()
+        reason = next((line for line in reversed(error) if "Error" in line), None)
+        raise RuntimeError(reason or f"exit status {out.returncode}")
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def report(label, stmt, repeat, **kwargs):
+    try:
+        samples = [run_ms(stmt, **kwargs) for _ in range(repeat)]
+    except RuntimeError as e:
+        print(f"{label:<28} skipped: {e}")
+        return
+    print(f"{label:<28} median {statistics.median(samples):9.1f} ms   "
+          f"min {min(samples):9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import / cold-start benchmark.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("-- import only --")
+    for module in IMPORT_MODULES:
+        report(f"import {module}", f"import {module}", args.repeat)
+
+    print("-- first use --")
+    for label, stmt in FIRST_USE.items():
+        report(label, stmt, args.repeat)
+
+    print("-- catalog load (excluding import) --")
+    for label, stmt in CATALOG_LOAD.items():
+        report(
+            label, stmt, args.repeat,
+            setup="from NM_recommender import load_catalog", only_stmt=True
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+# bench_suite.py
+"""
+Latency / throughput of the request-path functions on synthetic data.
+
+A nutrition catalog of --foods rows and --events interactions from --users
+users are generated into a temp directory (CSV + SQLite), so neither the
+configured database nor the real datasets are touched. Every benchmark
+reports mean / p50 / p95 / p99 latency and calls per second; the run is
+written as JSON so runs can be compared:
+
+    python bench_suite.py --foods 10000 --events 1000000 --out base.json
+    python bench_suite.py --foods 10000 --events 1000000 --compare base.json
+    python bench_suite.py --foods 1000000 --events 10000000 --data-dir /tmp/nm_bench
+
+--data-dir keeps the generated data and reuses it when the sizes match.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import db
+import interaction_logger
+import NM_recommender as recommender
+import user_dashboard
+
+# ---------------------------------------------------
+# DATA CONFIG
+# ---------------------------------------------------
+CATEGORIES = [
+    "Dairy products", "Fruits A-F", "Fruits G-P", "Fruits R-Z", "Breads, cereals, fastfood,grains",
+    "Meat, Poultry", "Fish, Seafood", "Vegetables A-E", "Vegetables F-P", "Vegetables R-Z",
+    "Desserts, sweets", "Seeds and Nuts", "Drinks,Alcohol, Beverages", "Soups",
+]
+EVENT_TYPES = list(interaction_logger.INTERACTION_WEIGHTS)
+EVENT_SHARES = [0.5, 0.3, 0.15, 0.05]      # view, recommend, select, like
+POPULARITY_ZIPF = 1.3                      # skew of food popularity
+EVENTS_PER_USER = 50                       # default --users = events / this
+INSERT_CHUNK = 500_000
+
+
+def write_catalog(path, n_foods, rng):
+    """
+    Nutrition CSV with the columns nutri_clean.py writes.
+    """
+    grams = rng.uniform(10, 500, n_foods).round(1)
+    protein, fat, carbs, fiber = (rng.gamma(2.0, s, n_foods).round(1) for s in (5, 6, 15, 1.5))
+    pd.DataFrame({
+        "food": [f"food {i:07d}" for i in range(n_foods)],
+        "measure": "1 serving",
+        "grams": grams,
+        "calories": (4 * protein + 9 * fat + 4 * carbs).round(0),
+        "protein": protein,
+        "fat": fat,
+        "sat_fat": (fat * rng.uniform(0, 0.6, n_foods)).round(1),
+        "fiber": fiber,
+        "carbs": carbs,
+        "category": rng.choice(CATEGORIES, n_foods),
+        "health_score_norm": rng.uniform(0, 100, n_foods).round(2),
+    }).to_csv(path, index=False)
+
+
+def load_events(n_events, n_users, rng, chunk_size=INSERT_CHUNK):
+    """
+    Insert synthetic interactions for catalog foods. The aggregate trigger
+    is dropped during the bulk insert and the aggregates rebuilt after.
+    """
+    names = recommender.get_catalog().names()
+
+    with db.connection() as conn:
+        food_ids = dict(conn.execute("SELECT food_name, food_id FROM foods"))
+        ids = np.array([food_ids[n] for n in names])
+        ids = ids[rng.permutation(len(ids))]        # popular foods at random rows
+        weights = np.array([interaction_logger.INTERACTION_WEIGHTS[t] for t in EVENT_TYPES])
+        start_ts = np.datetime64("2024-01-01T00:00:00")
+
+        conn.execute("DROP TRIGGER IF EXISTS interactions_aggregate")
+        for start in range(0, n_events, chunk_size):
+            n = min(chunk_size, n_events - start)
+            types = rng.choice(len(EVENT_TYPES), n, p=EVENT_SHARES)
+            foods = ids[(rng.zipf(POPULARITY_ZIPF, n) - 1) % len(ids)]
+            stamps = start_ts + np.arange(start, start + n).astype("timedelta64[s]")
+
+            conn.executemany(
+                """
+                INSERT INTO interactions
+                (user_id, food_id, interaction_type, interaction_weight, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                zip(
+                    rng.integers(1, n_users + 1, n).tolist(),
+                    foods.tolist(),
+                    np.array(EVENT_TYPES)[types].tolist(),
+                    weights[types].tolist(),
+                    stamps.astype(str).tolist(),
+                )
+            )
+
+        db.rebuild_aggregates(conn)
+        conn.executescript(db.AGGREGATE_TRIGGERS)
+
+
+def prepare_data(data_dir, n_foods, n_events, n_users, seed, neighbor_index=False):
+    """
+    Point the recommender and the database at data_dir, generating the
+    data there unless a previous run left the same sizes behind. Returns
+    setup timings in seconds.
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = data_dir / "nutrition.csv"
+    manifest_path = data_dir / "manifest.json"
+    sizes = {"foods": n_foods, "events": n_events, "users": n_users, "seed": seed}
+
+    db.DB_PATH = data_dir / "bench.db"
+    recommender.NUTRITION_PATH = csv_path
+
+    reuse = manifest_path.exists() and json.loads(manifest_path.read_text()) == sizes
+    timings = {"reused_data": reuse}
+    rng = np.random.default_rng(seed)
+
+    if not reuse:
+        for pattern in ("nutrition*", "bench.*", "manifest.json"):
+            for path in data_dir.glob(pattern):
+                path.unlink()
+        t0 = time.perf_counter()
+        write_catalog(csv_path, n_foods, rng)
+        timings["write_catalog_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    recommender.get_catalog()
+    timings["load_catalog_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    recommender.sync_food_nutrients()
+    timings["sync_food_nutrients_s"] = time.perf_counter() - t0
+
+    if not reuse:
+        t0 = time.perf_counter()
+        load_events(n_events, n_users, rng)
+        timings["load_events_s"] = time.perf_counter() - t0
+
+    if neighbor_index and recommender.neighbor_index is None:
+        from NM_neighbors import build_neighbor_index, save_neighbor_index
+        t0 = time.perf_counter()
+        neighbors, sims = build_neighbor_index(recommender.X_norm)
+        save_neighbor_index(csv_path, neighbors, sims, recommender.NUTRITION_FEATURES)
+        recommender.neighbor_index = recommender.load_neighbor_index(
+            csv_path, n_foods, recommender.NUTRITION_FEATURES
+        )
+        timings["neighbor_index_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    recommender.get_cooccurrence(wait=True)
+    timings["cooccurrence_s"] = time.perf_counter() - t0
+
+    manifest_path.write_text(json.dumps(sizes))
+    return timings
+
+
+# ---------------------------------------------------
+# MEASUREMENT
+# ---------------------------------------------------
+def summarize(samples, total_s):
+    ms = 1000 * np.asarray(samples)
+    return {
+        "calls": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "ops_per_s": len(ms) / total_s if total_s else 0.0,
+    }
+
+
+def measure(fn, calls, warmup=10, after=None):
+    """
+    Time fn(*args) for every args tuple in calls, after warmup untimed
+    calls. after() runs inside the throughput window (e.g. a flush).
+    """
+    for args in calls[:warmup]:
+        fn(*args)
+
+    samples = []
+    t_start = time.perf_counter()
+    for args in calls:
+        t0 = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - t0)
+    if after is not None:
+        after()
+    return summarize(samples, time.perf_counter() - t_start)
+
+
+def run_benchmarks(n_queries, n_users, batch_size, seed):
+    rng = np.random.default_rng(seed + 1)
+    names = recommender.get_catalog().names()
+    users = rng.integers(1, n_users + 1, n_queries).tolist()
+    foods = [names[i] for i in rng.integers(0, len(names), n_queries)]
+    pairs = list(zip(foods, users))
+    results = {}
+
+    def bench(label, fn, calls, **kwargs):
+        results[label] = r = measure(fn, calls, **kwargs)
+        print(f"{label:<36} p50 {r['p50_ms']:8.3f} ms  p95 {r['p95_ms']:8.3f} ms  "
+              f"p99 {r['p99_ms']:8.3f} ms  {r['ops_per_s']:11,.0f} ops/s")
+
+    # reads first, so logged events do not change what they see
+    recommender.configure_result_cache(0)
+    bench("recommend_snacks (uncached)", recommender.recommend_snacks, pairs)
+
+    recommender.configure_result_cache(recommender.REC_CACHE_SIZE)
+    for food, user_id in pairs:
+        recommender.recommend_snacks(food, user_id)
+    bench("recommend_snacks (cached)", recommender.recommend_snacks, pairs)
+
+    label = f"recommend_snacks_batch ({batch_size})"
+    batches = [(pairs[i:i + batch_size],) for i in range(0, len(pairs), batch_size)]
+    bench(label, recommender.recommend_snacks_batch, batches, warmup=1)
+    results[label]["pairs_per_s"] = results[label]["ops_per_s"] * batch_size
+
+    user_calls = [(u,) for u in users]
+    bench("get_user_nutrient_preferences", recommender.get_user_nutrient_preferences, user_calls)
+    bench("get_user_summary", user_dashboard.get_user_summary, user_calls)
+    bench("get_top_snacks", user_dashboard.get_top_snacks, user_calls)
+    bench("get_recent_activity", user_dashboard.get_recent_activity, user_calls)
+
+    events = [(u, f, "view") for f, u in pairs]
+    interaction_logger.configure_writer("sync")
+    bench("log_interaction (sync)", interaction_logger.log_interaction, events)
+
+    interaction_logger.configure_writer("buffered")
+    bench("log_interaction (buffered)", interaction_logger.log_interaction, events,
+          after=interaction_logger.flush)
+    interaction_logger.configure_writer("sync")
+
+    return results
+
+
+# ---------------------------------------------------
+# REPORT
+# ---------------------------------------------------
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sqlite": sqlite3.sqlite_version,
+    }
+
+
+def compare(run, base):
+    """
+    Print p50 / throughput of this run against a previous JSON run.
+    """
+    if run["sizes"] != base["sizes"]:
+        print(f"⚠ sizes differ from the baseline: {base['sizes']}")
+
+    print(f"\n{'vs ' + (base['environment'].get('commit') or '?'):<36} {'p50 ms':>19} {'ops/s':>25}")
+    for label, r in run["results"].items():
+        b = base["results"].get(label)
+        if b is None:
+            print(f"{label:<36} (new)")
+            continue
+        change = r["p50_ms"] / b["p50_ms"] - 1 if b["p50_ms"] else 0.0
+        mark = "⚠" if change > 0.10 else " "
+        print(f"{label:<36} {b['p50_ms']:8.3f} -> {r['p50_ms']:8.3f} "
+              f"{b['ops_per_s']:11,.0f} -> {r['ops_per_s']:11,.0f}  {change:+6.1%} {mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic-data benchmark of the request path.")
+    parser.add_argument("--foods", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=None,
+                        help=f"default: events / {EVENTS_PER_USER}")
+    parser.add_argument("--queries", type=int, default=1_000, help="calls per benchmark")
+    parser.add_argument("--batch", type=int, default=100, help="pairs per batch call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--collaborative", type=float, default=None,
+                        help="weight of the collaborative term (default: as configured)")
+    parser.add_argument("--neighbor-index", action="store_true",
+                        help="build the top-K neighbor index (quadratic in --foods)")
+    parser.add_argument("--data-dir", help="keep and reuse generated data here")
+    parser.add_argument("--out", help="write the run as JSON")
+    parser.add_argument("--compare", help="previous JSON run to compare against")
+    args = parser.parse_args()
+
+    n_users = args.users or max(1, args.events // EVENTS_PER_USER)
+    if args.collaborative is not None:
+        recommender.HYBRID_WEIGHTS["collaborative"] = args.collaborative
+    sizes = {"foods": args.foods, "events": args.events, "users": n_users}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        print(f"{args.foods:,} foods, {args.events:,} events, {n_users:,} users in {data_dir}")
+
+        setup = prepare_data(
+            data_dir, args.foods, args.events, n_users, args.seed, args.neighbor_index
+        )
+        print("setup: " + ", ".join(
+            f"{k[:-2]} {v:.2f}s" for k, v in setup.items() if k.endswith("_s")
+        ))
+
+        results = run_benchmarks(args.queries, n_users, args.batch, args.seed)
+
+        recommender.configure_result_cache(0)
+        db.close_all()
+
+    run = {
+        "environment": environment(),
+        "sizes": sizes,
+        "args": vars(args),
+        "setup": setup,
+        "results": results,
+    }
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(run, indent=2), encoding="utf-8")
+        print(f"✅ Results written to: {args.out}")
+
+    if args.compare:
+        compare(run, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+# db.py
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+# -----------------------------
+# DATABASE CONFIG (SINGLE SOURCE)
+# -----------------------------
+DB_PATH = Path("C:/Users/Chandu/OneDrive/Desktop/NutriMatch/nutrimatchDB.db")
+
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",       # ~16 MB page cache per connection
+    "PRAGMA mmap_size = 268435456",     # 256 MB
+]
+
+
+# -----------------------------
+# CONNECTION POOL
+# -----------------------------
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+
+def _open_connection():
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+@contextmanager
+def connection():
+    """
+    Borrow a pooled connection.
+
+    Commits when the block succeeds and rolls back when it raises. A
+    connection is used by one thread at a time and then goes back to the
+    pool, so its prepared-statement cache survives between calls.
+
+    The schema is created on first use, not at import time.
+    """
+    if not _schema_ready:
+        init_schema()
+
+    with _pooled() as conn:
+        yield conn
+
+
+@contextmanager
+def _pooled():
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        try:
+            _pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def close_all():
+    """
+    Close every idle pooled connection.
+    """
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+
+# -----------------------------
+# SCHEMA
+# -----------------------------
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS foods (
+        food_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        food_name TEXT UNIQUE NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS interactions (
+        interaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        food_id INTEGER NOT NULL REFERENCES foods (food_id),
+        interaction_type TEXT NOT NULL,
+        interaction_weight REAL NOT NULL,
+        timestamp TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS user_food_scores (
+        user_id INTEGER NOT NULL,
+        food_id INTEGER NOT NULL,
+        score REAL NOT NULL,
+        n_events INTEGER NOT NULL,
+        PRIMARY KEY (user_id, food_id)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS user_summary (
+        user_id INTEGER PRIMARY KEY,
+        total_interactions INTEGER NOT NULL,
+        unique_foods INTEGER NOT NULL
+    );
+
+    -- nutrient values per food, synced from the nutrition catalog
+    CREATE TABLE IF NOT EXISTS food_nutrients (
+        food_id INTEGER PRIMARY KEY REFERENCES foods (food_id),
+        protein REAL NOT NULL,
+        fat REAL NOT NULL,
+        carbs REAL NOT NULL,
+        fiber REAL NOT NULL,
+        calories REAL NOT NULL,
+        health_score_norm REAL NOT NULL
+    );
+
+    -- running interaction-weighted nutrient sums per user
+    CREATE TABLE IF NOT EXISTS user_nutrient_sums (
+        user_id INTEGER PRIMARY KEY,
+        weight_sum REAL NOT NULL,
+        protein REAL NOT NULL,
+        fat REAL NOT NULL,
+        carbs REAL NOT NULL,
+        fiber REAL NOT NULL,
+        calories REAL NOT NULL,
+        health_score_norm REAL NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS app_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+NUTRIENT_COLUMNS = [
+    "protein", "fat", "carbs", "fiber", "calories", "health_score_norm"
+]
+
+# Aggregates are maintained inside the inserting transaction, so readers
+# touch O(foods per user) rows instead of the user's whole history.
+AGGREGATE_TRIGGERS = """
+    CREATE TRIGGER IF NOT EXISTS interactions_aggregate
+    AFTER INSERT ON interactions
+    BEGIN
+        INSERT INTO user_summary (user_id, total_interactions, unique_foods)
+        VALUES (NEW.user_id, 1, 1)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_interactions = total_interactions + 1,
+            unique_foods = unique_foods + NOT EXISTS (
+                SELECT 1 FROM user_food_scores
+                WHERE user_id = NEW.user_id AND food_id = NEW.food_id
+            );
+
+        INSERT INTO user_food_scores (user_id, food_id, score, n_events)
+        VALUES (NEW.user_id, NEW.food_id, NEW.interaction_weight, 1)
+        ON CONFLICT (user_id, food_id) DO UPDATE SET
+            score = score + excluded.score,
+            n_events = n_events + 1;
+
+        -- foods outside the nutrition catalog have no nutrient row
+        INSERT INTO user_nutrient_sums
+        (user_id, weight_sum, protein, fat, carbs, fiber, calories,
+         health_score_norm)
+        SELECT
+            NEW.user_id,
+            NEW.interaction_weight,
+            n.protein * NEW.interaction_weight,
+            n.fat * NEW.interaction_weight,
+            n.carbs * NEW.interaction_weight,
+            n.fiber * NEW.interaction_weight,
+            n.calories * NEW.interaction_weight,
+            n.health_score_norm * NEW.interaction_weight
+        FROM food_nutrients n
+        WHERE n.food_id = NEW.food_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            weight_sum = weight_sum + excluded.weight_sum,
+            protein = protein + excluded.protein,
+            fat = fat + excluded.fat,
+            carbs = carbs + excluded.carbs,
+            fiber = fiber + excluded.fiber,
+            calories = calories + excluded.calories,
+            health_score_norm = health_score_norm + excluded.health_score_norm;
+    END;
+"""
+
+# Per-user queries: recent activity orders by timestamp, the score /
+# preference / summary queries read (food_id, weight) for one user and
+# are fully answered by the covering index.
+INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_interactions_user_time
+        ON interactions (user_id, timestamp);
+
+    CREATE INDEX IF NOT EXISTS idx_interactions_user_food
+        ON interactions (user_id, food_id, interaction_weight);
+"""
+
+# Interactions reference foods by integer id. The user_interactions view
+# keeps exposing food_name for old readers, and its INSTEAD OF trigger
+# keeps old writers working.
+COMPAT_VIEW = """
+    CREATE VIEW IF NOT EXISTS user_interactions AS
+        SELECT
+            i.interaction_id,
+            i.user_id,
+            f.food_name,
+            i.interaction_type,
+            i.interaction_weight,
+            i.timestamp
+        FROM interactions i
+        JOIN foods f ON f.food_id = i.food_id;
+
+    CREATE TRIGGER IF NOT EXISTS user_interactions_insert
+    INSTEAD OF INSERT ON user_interactions
+    BEGIN
+        INSERT OR IGNORE INTO foods (food_name) VALUES (NEW.food_name);
+
+        INSERT INTO interactions
+        (user_id, food_id, interaction_type, interaction_weight, timestamp)
+        SELECT
+            NEW.user_id,
+            food_id,
+            NEW.interaction_type,
+            NEW.interaction_weight,
+            COALESCE(NEW.timestamp, CURRENT_TIMESTAMP)
+        FROM foods
+        WHERE food_name = NEW.food_name;
+    END;
+"""
+
+
+def _is_legacy_interactions_table(conn):
+    row = conn.execute(
+        "SELECT type FROM sqlite_master WHERE name = 'user_interactions'"
+    ).fetchone()
+    return row is not None and row[0] == "table"
+
+
+def migrate_interactions(conn):
+    """
+    One-shot migration of a legacy user_interactions table (food_name TEXT
+    on every row) to foods + interactions. Keeps interaction ids.
+    Returns the number of migrated rows, or 0 if there was nothing to do.
+    """
+    if not _is_legacy_interactions_table(conn):
+        return 0
+
+    conn.execute("""
+        INSERT OR IGNORE INTO foods (food_name)
+        SELECT DISTINCT food_name
+        FROM user_interactions
+        WHERE food_name IS NOT NULL
+    """)
+
+    migrated = conn.execute("""
+        INSERT INTO interactions
+        (interaction_id, user_id, food_id, interaction_type,
+         interaction_weight, timestamp)
+        SELECT
+            u.interaction_id,
+            u.user_id,
+            f.food_id,
+            u.interaction_type,
+            u.interaction_weight,
+            COALESCE(u.timestamp, CURRENT_TIMESTAMP)
+        FROM user_interactions u
+        JOIN foods f ON f.food_name = u.food_name
+        WHERE u.user_id IS NOT NULL
+    """).rowcount
+
+    conn.execute("DROP TABLE user_interactions")
+    conn.commit()
+
+    return migrated
+
+
+def rebuild_aggregates(conn):
+    """
+    Recompute user_food_scores and user_summary from the raw interaction
+    log. Returns the number of users rebuilt.
+    """
+    conn.execute("DELETE FROM user_food_scores")
+    conn.execute("DELETE FROM user_summary")
+
+    conn.execute("""
+        INSERT INTO user_food_scores (user_id, food_id, score, n_events)
+        SELECT user_id, food_id, SUM(interaction_weight), COUNT(*)
+        FROM interactions
+        GROUP BY user_id, food_id
+    """)
+
+    users = conn.execute("""
+        INSERT INTO user_summary (user_id, total_interactions, unique_foods)
+        SELECT user_id, SUM(n_events), COUNT(*)
+        FROM user_food_scores
+        GROUP BY user_id
+    """).rowcount
+
+    rebuild_nutrient_sums(conn)
+
+    return users
+
+
+def rebuild_nutrient_sums(conn):
+    """
+    Recompute user_nutrient_sums from user_food_scores and food_nutrients.
+    Returns the number of users with a preference vector.
+    """
+    conn.execute("DELETE FROM user_nutrient_sums")
+
+    users = conn.execute("""
+        INSERT INTO user_nutrient_sums
+        (user_id, weight_sum, protein, fat, carbs, fiber, calories,
+         health_score_norm)
+        SELECT
+            s.user_id,
+            SUM(s.score),
+            SUM(s.score * n.protein),
+            SUM(s.score * n.fat),
+            SUM(s.score * n.carbs),
+            SUM(s.score * n.fiber),
+            SUM(s.score * n.calories),
+            SUM(s.score * n.health_score_norm)
+        FROM user_food_scores s
+        JOIN food_nutrients n ON n.food_id = s.food_id
+        GROUP BY s.user_id
+    """).rowcount
+
+    return users
+
+
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM app_meta WHERE key = ?", (key,)).fetchone()
+    return default if row is None else row[0]
+
+
+def set_meta(conn, key, value):
+    conn.execute(
+        "INSERT INTO app_meta (key, value) VALUES (?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+        (key, value)
+    )
+
+
+def _aggregates_missing(conn):
+    return conn.execute("""
+        SELECT EXISTS (SELECT 1 FROM interactions)
+           AND NOT EXISTS (SELECT 1 FROM user_summary)
+    """).fetchone()[0]
+
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def init_schema():
+    """
+    Create tables, indexes and the compatibility view, migrating a legacy
+    interaction table first. Runs once per process, on the first
+    connection() unless called earlier.
+    """
+    global _schema_ready
+
+    with _schema_lock:
+        if _schema_ready:
+            return
+
+        with _pooled() as conn:
+            conn.executescript(SCHEMA)
+            migrated = migrate_interactions(conn)
+            conn.executescript(INDEXES)
+            conn.executescript(COMPAT_VIEW)
+            conn.executescript(AGGREGATE_TRIGGERS)
+
+            # first start after upgrading: aggregates are empty
+            if _aggregates_missing(conn):
+                rebuild_aggregates(conn)
+
+        if migrated:
+            print(f"✅ Migrated {migrated} legacy interactions to foods/interactions")
+
+        _schema_ready = True
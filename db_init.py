@@ -1,16 +1,11 @@
-import sqlite3
+import db
 
-conn = sqlite3.connect("C:/Users/Chandu/OneDrive/Desktop/NutriMatch/nutrtimatchDB.db")
-cursor = conn.cursor()
-
-cursor.executescript("""
-CREATE TABLE IF NOT EXISTS users (
-    user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    password_hash TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
+# users, foods, interactions, per-user aggregates, indexes and the
+# user_interactions view
+db.init_schema()
 
+with db.connection() as conn:
+    conn.executescript("""
 CREATE TABLE IF NOT EXISTS user_preferences (
     pref_id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER,
@@ -22,15 +17,6 @@ CREATE TABLE IF NOT EXISTS user_preferences (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE IF NOT EXISTS user_interactions (
-    interaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER,
-    food_name TEXT,
-    interaction_type TEXT,
-    interaction_weight REAL,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-
 CREATE TABLE IF NOT EXISTS recommendation_logs (
     log_id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER,
@@ -44,7 +30,4 @@ CREATE TABLE IF NOT EXISTS recommendation_logs (
 );
 """)
 
-conn.commit()
-conn.close()
-
 print("✅ Database initialized successfully")
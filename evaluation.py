@@ -1,27 +1,23 @@
 # evaluation.py
-import sqlite3
 import numpy as np
-from pathlib import Path
 
-DB_PATH = Path(__file__).resolve().parent / "nutrimatchDB.db"
+import db
 
 
 def precision_at_k(user_id, recommended_items, k=5):
     """
     recommended_items: list of food names
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT DISTINCT food_name
-        FROM user_interactions
-        WHERE user_id = ?
-        AND interaction_type IN ('select', 'like')
-    """, (user_id,))
-
-    relevant_items = {row[0] for row in cursor.fetchall()}
-    conn.close()
+    with db.connection() as conn:
+        rows = conn.execute("""
+            SELECT DISTINCT f.food_name
+            FROM interactions i
+            JOIN foods f ON f.food_id = i.food_id
+            WHERE i.user_id = ?
+            AND i.interaction_type IN ('select', 'like')
+        """, (user_id,)).fetchall()
+
+    relevant_items = {row[0] for row in rows}
 
     if not relevant_items:
         return 0.0
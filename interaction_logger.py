@@ -1,47 +1,216 @@
 # interaction_logger.py
-import sqlite3
+import argparse
+import atexit
+import queue
+import threading
+import time
 from datetime import datetime
-from pathlib import Path
+
+import db
+from NM_timing import timed
+
+
+# -----------------------------
+# ENSURE TABLES EXIST
+# -----------------------------
+def init_interaction_table():
+    db.init_schema()
+
 
 # -----------------------------
-# DATABASE PATH (SINGLE SOURCE)
+# WRITER CONFIG
 # -----------------------------
-DB_PATH = Path("C:/Users/Chandu/OneDrive/Desktop/NutriMatch/nutrimatchDB.db")
+# "sync" writes each event on the caller's thread; "buffered" queues it
+# for a background thread that inserts whole batches in one transaction.
+WRITER_MODE = "sync"
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.5        # seconds a partial batch may wait
+MAX_QUEUE = 100_000         # beyond this, callers fall back to sync writes
 
+INTERACTION_WEIGHTS = {
+    "view": 0.2,
+    "recommend": 0.5,
+    "select": 0.7,
+    "like": 1.0
+}
 
-def get_connection():
+INSERT_FOOD_SQL = "INSERT OR IGNORE INTO foods (food_name) VALUES (?)"
+
+INSERT_INTERACTION_SQL = """
+    INSERT INTO interactions
+    (user_id, food_id, interaction_type, interaction_weight, timestamp)
+    SELECT ?, food_id, ?, ?, ?
+    FROM foods
+    WHERE food_name = ?
+"""
+
+
+@timed("db.write_events")
+def _write_events(events):
     """
-    Streamlit-safe SQLite connection
+    Insert (user_id, food_name, interaction_type, weight, timestamp)
+    events in a single transaction.
     """
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    with db.connection() as conn:
+        conn.executemany(INSERT_FOOD_SQL, ((e[1],) for e in events))
+        conn.executemany(
+            INSERT_INTERACTION_SQL,
+            ((user_id, itype, weight, ts, food) for user_id, food, itype, weight, ts in events)
+        )
 
 
 # -----------------------------
-# ENSURE TABLE EXISTS
+# BUFFERED WRITER
 # -----------------------------
-def init_interaction_table():
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_interactions (
-            interaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            food_name TEXT NOT NULL,
-            interaction_type TEXT NOT NULL,
-            interaction_weight REAL NOT NULL,
-            timestamp TEXT NOT NULL
+# queued by flush() / close() so the writer ends its batch without
+# waiting out flush_interval
+_WAKE = object()
+
+
+class InteractionWriter:
+    """
+    Background thread that drains queued events with executemany, one
+    transaction per batch of up to batch_size events or per flush_interval,
+    whichever comes first.
+
+    Events become visible to readers once their batch is written.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_queue=MAX_QUEUE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._closing = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="interaction-writer", daemon=True
         )
-    """)
+        self._thread.start()
+
+    def submit(self, event):
+        """
+        Queue one event. Returns False if the writer cannot take it (closed
+        or queue full) so the caller can write it synchronously.
+        """
+        if self._closing.is_set() or not self._thread.is_alive():
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    def flush(self):
+        """
+        Block until every event queued so far has been written.
+        """
+        if self._thread.is_alive():
+            self.queue.put(_WAKE)
+        self.queue.join()
+
+    def close(self):
+        self._closing.set()
+        try:
+            self.queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass
+        self._thread.join()
 
-    conn.commit()
-    conn.close()
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _WAKE:
+                break
+
+        return batch
+
+    def _run(self):
+        while not (self._closing.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            events = [e for e in batch if e is not _WAKE]
+
+            try:
+                if events:
+                    _write_events(events)
+            except Exception as e:
+                print(f"⚠ Interaction batch failed ({e}); retrying one by one")
+                for event in events:
+                    try:
+                        _write_events([event])
+                    except Exception as e:
+                        print(f"⚠ Dropped interaction {event}: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def configure_writer(mode="buffered", batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_queue=MAX_QUEUE):
+    """
+    Switch log_interaction between "sync" and "buffered" writes. Pending
+    buffered events are flushed before the old writer is replaced.
+    """
+    global WRITER_MODE, _writer
+
+    if mode not in ("sync", "buffered"):
+        raise ValueError(f"Unknown writer mode: {mode}")
+
+    with _writer_lock:
+        if mode == WRITER_MODE == "sync":
+            return
+
+        # already running with these settings (e.g. a Streamlit rerun)
+        if (
+            mode == WRITER_MODE == "buffered"
+            and _writer is not None
+            and _writer._thread.is_alive()
+            and (_writer.batch_size, _writer.flush_interval, _writer.queue.maxsize)
+            == (batch_size, flush_interval, max_queue)
+        ):
+            return
+
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+        if mode == "buffered":
+            _writer = InteractionWriter(batch_size, flush_interval, max_queue)
+
+        WRITER_MODE = mode
+
+
+def flush():
+    """
+    Write out every buffered event (no-op in sync mode).
+    """
+    writer = _writer
+    if writer is not None:
+        writer.flush()
+
+
+@atexit.register
+def _close_writer():
+    writer = _writer
+    if writer is not None:
+        writer.close()
 
 
 # -----------------------------
 # LOG INTERACTION
 # -----------------------------
-def log_interaction(user_id, food_name, interaction_type):
+def log_interaction(user_id, food_name, interaction_type, sync=False):
     """
     Log a user-food interaction.
 
@@ -50,39 +219,64 @@ def log_interaction(user_id, food_name, interaction_type):
     - recommend
     - select
     - like
+
+    sync=True writes the event before returning even in buffered mode,
+    for events the caller's next read must already see.
     """
 
     # Safety checks
     if user_id is None or not food_name:
         return
 
-    weights = {
-        "view": 0.2,
-        "recommend": 0.5,
-        "select": 0.7,
-        "like": 1.0
-    }
-
-    weight = weights.get(interaction_type, 0.1)
-
-    conn = get_connection()
-    cursor = conn.cursor()
+    weight = INTERACTION_WEIGHTS.get(interaction_type, 0.1)
 
-    cursor.execute("""
-        INSERT INTO user_interactions
-        (user_id, food_name, interaction_type, interaction_weight, timestamp)
-        VALUES (?, ?, ?, ?, ?)
-    """, (
+    event = (
         user_id,
         food_name,
         interaction_type,
         weight,
         datetime.utcnow().isoformat()
-    ))
+    )
+
+    writer = _writer
+    if not sync and writer is not None and writer.submit(event):
+        return
+
+    # sync mode, or the buffered writer cannot take the event
+    _write_events([event])
+
+
+# -----------------------------
+# MAINTENANCE COMMANDS
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Interaction log maintenance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="convert a legacy user_interactions table")
+    sub.add_parser(
+        "rebuild-aggregates",
+        help="recompute user_food_scores / user_summary from the raw log"
+    )
+    sub.add_parser(
+        "backfill-preferences",
+        help="sync catalog nutrients and recompute user nutrient sums"
+    )
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        init_interaction_table()
+        print("✅ Interaction schema is up to date")
+
+    elif args.command == "rebuild-aggregates":
+        with db.connection() as conn:
+            users = db.rebuild_aggregates(conn)
+        print(f"✅ Rebuilt aggregates for {users} users")
 
-    conn.commit()
-    conn.close()
+    elif args.command == "backfill-preferences":
+        from NM_recommender import sync_food_nutrients
+        users = sync_food_nutrients(force=True)
+        print(f"✅ Backfilled nutrient preferences for {users} users")
 
 
-# Initialize table ON IMPORT
-init_interaction_table()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# normalize_reference.py
+"""
+The row-wise helpers NM_normalize replaced, paired with their column-wise
+versions in CASES, and synthetic samples to compare them on. Shared by
+test_normalize.py and bench_normalize.py.
+"""
+import random
+import re
+
+import pandas as pd
+
+import NM_normalize as norm
+
+
+# ---------------------------------------------------
+# ROW-WISE REFERENCE (the helpers NM_normalize replaced)
+# ---------------------------------------------------
+def ref_join_categories(cat):
+    if isinstance(cat, list) and len(cat) > 0:
+        if isinstance(cat[0], list):
+            return " > ".join(str(x) for x in cat[0])
+        else:
+            return " > ".join(str(x) for x in cat)
+    return None
+
+def ref_join_categories_keep_strings(cat):
+    if isinstance(cat, list) and len(cat) > 0:
+        try:
+            if isinstance(cat[0], list):
+                return " > ".join([str(x) for x in cat[0]])
+            else:
+                return " > ".join([str(x) for x in cat])
+        except Exception:
+            return str(cat)
+    elif isinstance(cat, str):
+        return cat
+    else:
+        return None
+
+def ref_last_category(cat):
+    if isinstance(cat, list) and len(cat) > 0:
+        try:
+            return cat[0][-1]
+        except:
+            return None
+    return None
+
+def ref_clean_price(p):
+    if pd.isna(p):
+        return None
+    if isinstance(p, str):
+        p = re.sub(r"[^0-9.]", "", p)
+        try:
+            return float(p)
+        except:
+            return None
+    return p
+
+def ref_clean_text(t):
+    if isinstance(t, str):
+        t = t.lower()
+        t = re.sub(r"[^a-z0-9 ]", "", t)
+        return t.strip()
+    return ""
+
+def ref_simple_clean(s):
+    if pd.isna(s):
+        return ""
+    return str(s).replace("\n", " ").strip().lower()
+
+
+CASES = [
+    ("join_categories", "categories", ref_join_categories,
+     norm.join_categories),
+    ("join_categories keep_str", "categories", ref_join_categories_keep_strings,
+     lambda s: norm.join_categories(s, keep_strings=True)),
+    ("last_category", "categories", ref_last_category, norm.last_category),
+    ("clean_price", "price", ref_clean_price, norm.clean_price),
+    ("clean_text", "title", ref_clean_text, norm.clean_text),
+    ("simple_clean", "text", ref_simple_clean, norm.simple_clean),
+]
+
+
+# ---------------------------------------------------
+# SAMPLES
+# ---------------------------------------------------
+WORDS = [
+    "Great", "snack!", "TASTY", "crunchy,", "100%", "gluten-free",
+    "Tea", "0.5oz", "would", "buy", "again.", "\n", "  ",
+]
+CATEGORIES = [
+    ["Grocery & Gourmet Food", "Snacks", "Chips"],
+    ["Grocery & Gourmet Food", "Beverages", "Tea"],
+    ["Grocery & Gourmet Food"],
+    [],
+]
+PRICES = ["$3.99", "12.50", "from $5", "", "None", None]
+
+# values that exercise the exact fallbacks
+EDGE_WORDS = ["Délicieux", "ÉCOLE", "İstanbul", "\x1c", "\t", "\x85"]
+EDGE_CATEGORIES = [
+    [["Grocery & Gourmet Food", "Beverages"], ["Other"]],
+    [[]], [""], ["Snacks", 7], [[1, 2]], ["Snacks", None],
+    "Snacks > Chips", None, float("nan"), 3,
+]
+EDGE_PRICES = ["1.2.3", "—", "5.", ".", 4.5, 7, float("nan")]
+
+
+def make_sample(n, edge=False, seed=0):
+    rng = random.Random(seed)
+    words = WORDS + EDGE_WORDS if edge else WORDS
+    categories = CATEGORIES + EDGE_CATEGORIES if edge else CATEGORIES
+    prices = PRICES + EDGE_PRICES if edge else PRICES
+
+    def text():
+        return " ".join(rng.choices(words, k=rng.randint(0, 20)))
+
+    def maybe(value):
+        r = rng.random()
+        return None if r < 0.03 else float("nan") if r < 0.05 and edge else value
+
+    return pd.DataFrame({
+        "categories": [rng.choice(categories) for _ in range(n)],
+        "price": [rng.choice(prices) for _ in range(n)],
+        "title": [maybe(text()) for _ in range(n)],
+        "text": [maybe(text()) for _ in range(n)],
+    })
+
+
+def same(a, b):
+    a = pd.Series(a, dtype=object).reset_index(drop=True)
+    b = pd.Series(b, dtype=object).reset_index(drop=True)
+    both_missing = a.isna() & b.isna()
+    return bool((both_missing | (a == b)).all())
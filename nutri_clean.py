@@ -1,6 +1,8 @@
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 
+from NM_recommender import build_catalog_artifact
+
 # -------------------------------------------------
 # 1. LOAD RAW NUTRITION DATA
 # -------------------------------------------------
@@ -89,3 +91,10 @@ nutri_df.to_csv(OUTPUT_PATH, index=False)
 
 print(f"\n✅ Clean nutrition dataset saved to: {OUTPUT_PATH}")
 print(nutri_df.head())
+
+# -------------------------------------------------
+# 7. SAVE BINARY CATALOG (memory-mapped by NM_recommender)
+# -------------------------------------------------
+artifact_path = build_catalog_artifact(OUTPUT_PATH)
+
+print(f"\n✅ Catalog artifact saved to: {artifact_path}")
@@ -1,20 +1,58 @@
+import io
+import time
+
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+import NM_timing
+from NM_rec_cache import LRUCache
+from NM_timing import timed
+
+NUTRIENTS = ["protein", "fat", "carbs", "fiber", "calories"]
+
+# Rendered images are cached by chart kind and the nutrient values drawn
+# (plus food names where they are printed), so a repeat render on a
+# Streamlit rerun is a dictionary lookup. The cached entry points time
+# themselves as chart.<kind>.hit / chart.<kind>.miss.
+CHART_CACHE_SIZE = 512
+CHART_DPI = 100
+RADAR_SIZE = (6, 6)
+BAR_SIZE = (7, 4)
+PREFERENCE_SIZE = (6.4, 4.8)
+PREFERENCE_NUTRIENTS = ["protein", "fiber", "fat", "calories"]
+
+
+def _values(snack, nutrients=NUTRIENTS):
+    """
+    Nutrient values of a snack as a tuple of floats, or None if any is
+    missing.
+    """
+    try:
+        return tuple(float(snack[n]) for n in nutrients)
+    except KeyError:
+        return None
+
+
+def _no_data(ax, message):
+    ax.text(0.5, 0.5, message, ha="center", va="center", transform=ax.transAxes)
+    ax.axis("off")
+
 
 # -------------------------------------------------
 # 1. NUTRITION RADAR CHART
 # -------------------------------------------------
-def nutrition_radar_chart(snack1, snack2):
-    nutrients = ["protein", "fat", "carbs", "fiber", "calories"]
+def _draw_radar(ax, v1, v2, title="Nutritional Comparison (Normalized)", legend=True):
+    """
+    Selected (v1) vs recommended (v2) values, each nutrient scaled by the
+    larger of the two, on polar axes.
+    """
+    if v1 is None or v2 is None:
+        _no_data(ax, "Insufficient data")
+        return
 
-    try:
-        v1 = np.array([snack1[n] for n in nutrients], dtype=float)
-        v2 = np.array([snack2[n] for n in nutrients], dtype=float)
-    except KeyError:
-        fig, ax = plt.subplots()
-        ax.text(0.5, 0.5, "Insufficient data", ha="center", va="center")
-        ax.axis("off")
-        return fig
+    v1 = np.array(v1, dtype=float)
+    v2 = np.array(v2, dtype=float)
 
     max_vals = np.maximum(v1, v2)
     max_vals[max_vals == 0] = 1
@@ -22,54 +60,77 @@ def nutrition_radar_chart(snack1, snack2):
     v1 /= max_vals
     v2 /= max_vals
 
-    angles = np.linspace(0, 2 * np.pi, len(nutrients), endpoint=False)
+    angles = np.linspace(0, 2 * np.pi, len(NUTRIENTS), endpoint=False)
     angles = np.append(angles, angles[0])
     v1 = np.append(v1, v1[0])
     v2 = np.append(v2, v2[0])
 
-    fig = plt.figure(figsize=(6, 6))
-    ax = plt.subplot(111, polar=True)
-
     ax.plot(angles, v1, label="Selected Snack")
     ax.fill(angles, v1, alpha=0.25)
 
     ax.plot(angles, v2, label="Recommended Snack")
     ax.fill(angles, v2, alpha=0.25)
 
-    ax.set_thetagrids(angles[:-1] * 180 / np.pi, nutrients)
-    ax.set_title("Nutritional Comparison (Normalized)")
-    ax.legend()
+    ax.set_thetagrids(angles[:-1] * 180 / np.pi, NUTRIENTS)
+    ax.set_title(title)
+    if legend:
+        ax.legend()
+
 
+@timed("chart.radar")
+def nutrition_radar_chart(snack1, snack2):
+    fig = plt.figure(figsize=RADAR_SIZE)
+    _draw_radar(fig.add_subplot(111, polar=True), _values(snack1), _values(snack2))
     return fig
 
 
 # -------------------------------------------------
 # 2. NUTRITION BAR CHART
 # -------------------------------------------------
-def nutrition_bar_chart(snack):
-    nutrients = ["protein", "fat", "carbs", "fiber", "calories"]
-    values = [snack[n] for n in nutrients]
+def _draw_bar(ax, values, title="Nutritional Breakdown"):
+    if values is None:
+        _no_data(ax, "Insufficient data")
+        return
 
-    fig, ax = plt.subplots(figsize=(7, 4))
-    ax.bar(nutrients, values, color="#66BB6A")
-    ax.set_title("Nutritional Breakdown")
+    ax.bar(NUTRIENTS, values, color="#66BB6A")
+    ax.set_title(title)
     ax.set_ylabel("Value (g / kcal)")
+
+
+@timed("chart.bar")
+def nutrition_bar_chart(snack):
+    values = [snack[n] for n in NUTRIENTS]
+
+    fig, ax = plt.subplots(figsize=BAR_SIZE)
+    _draw_bar(ax, values)
     return fig
 
 
 # -------------------------------------------------
 # 3. SENTIMENT PIE CHART
 # -------------------------------------------------
+@timed("chart.sentiment_pie")
 def sentiment_pie_chart(reviews_df):
+    """
+    reviews_df is either review_stats rows (positive / negative / neutral
+    count columns, summed) or raw reviews with a sentiment column.
+    """
     fig, ax = plt.subplots()
 
-    if reviews_df is None or reviews_df.empty or "sentiment" not in reviews_df.columns:
+    if reviews_df is None or reviews_df.empty:
+        counts = None
+    elif {"positive", "negative", "neutral"} <= set(reviews_df.columns):
+        counts = reviews_df[["positive", "negative", "neutral"]].sum()
+    elif "sentiment" in reviews_df.columns:
+        counts = reviews_df["sentiment"].astype(str).str.lower().value_counts()
+    else:
+        counts = None
+
+    if counts is None:
         ax.text(0.5, 0.5, "No sentiment data available", ha="center", va="center")
         ax.axis("off")
         return fig
 
-    counts = reviews_df["sentiment"].str.lower().value_counts()
-
     sizes = [
         counts.get("positive", 0),
         counts.get("negative", 0),
@@ -96,19 +157,143 @@ def sentiment_pie_chart(reviews_df):
 # -------------------------------------------------
 # 4. USER NUTRIENT PREFERENCE CHART
 # -------------------------------------------------
-def user_nutrient_preference_chart(prefs):
-    fig, ax = plt.subplots()
-
+def _preference_values(prefs):
+    """
+    Preference values rounded to 2 decimals (what the profile tab shows),
+    or None without history.
+    """
     if prefs is None:
-        ax.text(0.5, 0.5, "No preference data yet", ha="center", va="center")
-        ax.axis("off")
-        return fig
+        return None
+    return tuple(round(float(prefs.get(n, 0)), 2) for n in PREFERENCE_NUTRIENTS)
 
-    nutrients = ["protein", "fiber", "fat", "calories"]
-    values = [prefs.get(n, 0) for n in nutrients]
 
-    ax.bar(nutrients, values, color="#4CAF50")
+def _draw_preferences(ax, values):
+    if values is None:
+        _no_data(ax, "No preference data yet")
+        return
+
+    ax.bar(PREFERENCE_NUTRIENTS, values, color="#4CAF50")
     ax.set_title("User Nutrient Preference Profile")
     ax.set_ylabel("Preference Strength")
 
+
+@timed("chart.preferences")
+def user_nutrient_preference_chart(prefs):
+    fig, ax = plt.subplots(figsize=PREFERENCE_SIZE)
+    _draw_preferences(ax, _preference_values(prefs))
     return fig
+
+
+# -------------------------------------------------
+# 5. IMAGE RENDERING (CACHED PNG / SVG BYTES)
+# -------------------------------------------------
+_chart_cache = LRUCache(CHART_CACHE_SIZE)
+
+
+@timed("chart.render")
+def render_chart(fig, fmt="png", dpi=CHART_DPI, tight=True):
+    """
+    PNG or SVG bytes of fig. The figure is closed afterwards, also when
+    saving fails, so pyplot never accumulates open figures. tight=False
+    skips the extra layout pass of a tight bounding box.
+    """
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches="tight" if tight else None)
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def _cached_image(key, figsize, draw, fmt, t0, tight=True):
+    """
+    Cached bytes for key, drawing on a fresh Figure on a miss. The figure
+    is not registered with pyplot, so rendering is safe from the threads
+    Streamlit serves sessions on.
+
+    key[0] is the chart kind; the time since t0 (perf_counter() at the
+    start of the entry point) is recorded as chart.<kind>.hit or .miss.
+    """
+    key = key + (fmt,)
+    image = _chart_cache.get(key)
+    hit = image is not None
+    if not hit:
+        fig = Figure(figsize=figsize)
+        draw(fig)
+        image = render_chart(fig, fmt, tight=tight)
+        _chart_cache.put(key, image)
+
+    if NM_timing.ENABLED:
+        NM_timing.record(f"chart.{key[0]}.{'hit' if hit else 'miss'}", time.perf_counter() - t0)
+    return image
+
+
+def nutrition_bar_image(snack, fmt="png"):
+    """
+    nutrition_bar_chart as cached image bytes.
+    """
+    t0 = time.perf_counter()
+    values = _values(snack)
+    return _cached_image(
+        ("bar", values), BAR_SIZE,
+        lambda fig: _draw_bar(fig.add_subplot(), values), fmt, t0
+    )
+
+
+def nutrition_radar_image(snack1, snack2, fmt="png"):
+    """
+    nutrition_radar_chart as cached image bytes.
+    """
+    t0 = time.perf_counter()
+    v1, v2 = _values(snack1), _values(snack2)
+    return _cached_image(
+        ("radar", v1, v2), RADAR_SIZE,
+        lambda fig: _draw_radar(fig.add_subplot(111, polar=True), v1, v2), fmt, t0
+    )
+
+
+def user_nutrient_preference_image(prefs, fmt="png"):
+    """
+    user_nutrient_preference_chart as cached image bytes, keyed on the
+    rounded preference values.
+    """
+    t0 = time.perf_counter()
+    values = _preference_values(prefs)
+    return _cached_image(
+        ("preferences", values), PREFERENCE_SIZE,
+        lambda fig: _draw_preferences(fig.add_subplot(), values), fmt, t0
+    )
+
+
+# -------------------------------------------------
+# 6. SMALL MULTIPLES
+# -------------------------------------------------
+def nutrition_small_multiples(selected, recommended, fmt="png"):
+    """
+    All recommendations in one cached image: a row per recommended food
+    with its nutrient bars and its radar against the selected snack.
+    """
+    t0 = time.perf_counter()
+    selected_values = _values(selected)
+    rows = tuple((str(r["food"]), _values(r)) for r in recommended)
+
+    def draw(fig):
+        if not rows:
+            _no_data(fig.add_subplot(), "No recommendations")
+            return
+        for i, (food, values) in enumerate(rows):
+            _draw_bar(fig.add_subplot(len(rows), 2, 2 * i + 1), values, title=food)
+            _draw_radar(
+                fig.add_subplot(len(rows), 2, 2 * i + 2, polar=True),
+                selected_values, values, title=f"vs. selected: {food}", legend=False
+            )
+        fig.legend(*fig.axes[1].get_legend_handles_labels(), loc="upper center", ncol=2)
+        # fixed spacing: tight layout would measure every axis again
+        fig.subplots_adjust(left=0.08, right=0.95, top=1 - 0.8 / height,
+                            bottom=0.4 / height, hspace=0.55, wspace=0.3)
+
+    height = 3.8 * max(len(rows), 1)
+    return _cached_image(
+        ("small_multiples", selected_values, rows), (11, height), draw, fmt, t0,
+        tight=False
+    )
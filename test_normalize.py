@@ -0,0 +1,124 @@
+# test_normalize.py
+"""
+Pins every NM_normalize transform to the row-wise helpers the ETL scripts
+used before (kept in normalize_reference.py).
+
+    python -m pytest -q test_normalize.py
+"""
+import pandas as pd
+import pytest
+
+import NM_normalize as norm
+from normalize_reference import (
+    CASES,
+    make_sample,
+    ref_clean_price,
+    ref_clean_text,
+    ref_join_categories,
+    ref_join_categories_keep_strings,
+    ref_last_category,
+    ref_simple_clean,
+    same,
+)
+
+CONTROL_CHARS = ["\x1c", "\x1d", "\x1e", "\x1f"]
+
+TEXTS = [
+    # ASCII
+    "Great snack!", "  TASTY  ", "crunchy,\nchips", "100% gluten-free", "", " ",
+    # non-ASCII
+    "Délicieux", "ÉCOLE", "İstanbul", "straße", "ΣΊΣΥΦΟΣ", "日本茶 tea", "café ",
+    " wide space ", "\x85next line\x85",
+    # \x1c-\x1f separators, which str.strip() treats as whitespace
+    *[f"{c}word{c}" for c in CONTROL_CHARS],
+    "".join(CONTROL_CHARS), "a\x1fb", " \x1c\t mixed \x1d\n",
+    # missing and non-string values
+    None, float("nan"), 3, 4.5, True, ["list"],
+]
+
+PRICES = [
+    "$3.99", "12.50", "from $5", "", "None", None, float("nan"),
+    "1.2.3", "—", "5.", ".", "€4,99", "\x1c7\x1f", "١٢", 4.5, 7, True,
+]
+
+CATEGORIES = [
+    ["Grocery & Gourmet Food", "Snacks", "Chips"],
+    ["Grocery & Gourmet Food"], [],
+    [["Grocery & Gourmet Food", "Beverages"], ["Other"]],
+    [[]], [""], ["Snacks", 7], [[1, 2]], ["Snacks", None],
+    ["Épicerie", "Thé"], ["a\x1cb", "\x1f"],
+    "Snacks > Chips", "", None, float("nan"), 3, 2.5,
+]
+
+
+def series(values):
+    return pd.Series(values, dtype=object)
+
+
+def assert_matches(ref, fast, values):
+    s = series(values)
+    expected = s.apply(ref)
+    got = fast(s)
+    assert len(got) == len(s)
+    for value, e, g in zip(values, expected, pd.Series(got, dtype=object)):
+        assert same([e], [g]), f"{value!r}: expected {e!r}, got {g!r}"
+
+
+# ---------------------------------------------------
+# EDGE CASES, ONE VALUE AT A TIME IN THE FAILURE MESSAGE
+# ---------------------------------------------------
+def test_simple_clean():
+    assert_matches(ref_simple_clean, norm.simple_clean, TEXTS)
+
+
+def test_clean_text():
+    assert_matches(ref_clean_text, norm.clean_text, TEXTS)
+
+
+def test_clean_price():
+    assert_matches(ref_clean_price, norm.clean_price, PRICES)
+
+
+def test_join_categories():
+    assert_matches(ref_join_categories, norm.join_categories, CATEGORIES)
+
+
+def test_join_categories_keep_strings():
+    assert_matches(
+        ref_join_categories_keep_strings,
+        lambda s: norm.join_categories(s, keep_strings=True),
+        CATEGORIES,
+    )
+
+
+def test_last_category():
+    assert_matches(ref_last_category, norm.last_category, CATEGORIES)
+
+
+@pytest.mark.parametrize("char", CONTROL_CHARS)
+def test_control_char_only_values_strip_to_empty(char):
+    s = series([char, f" {char} ", f"{char}x{char}"])
+    assert list(norm.simple_clean(s)) == ["", "", "x"]
+    assert list(norm.clean_text(s)) == ["", "", "x"]
+
+
+def test_lower_strip_matches_pandas_expression():
+    s = series(TEXTS[:-1])
+    expected = s.fillna("").astype(str).str.lower().str.strip()
+    assert list(norm.lower_strip(s)) == list(expected)
+
+
+def test_index_is_preserved():
+    s = pd.Series(["A ", None, " b"], index=[10, 20, 30], dtype=object)
+    assert list(norm.simple_clean(s).index) == [10, 20, 30]
+    assert list(norm.clean_price(series(["$1", None]).set_axis([5, 6])).index) == [5, 6]
+
+
+# ---------------------------------------------------
+# RANDOM SAMPLES (typical and edge mixes, as in the benchmark)
+# ---------------------------------------------------
+@pytest.mark.parametrize("edge", [False, True], ids=["typical", "edge"])
+@pytest.mark.parametrize("name, column, ref, fast", CASES, ids=[c[0] for c in CASES])
+def test_sample_matches_row_wise(name, column, ref, fast, edge):
+    df = make_sample(5_000, edge=edge, seed=1)
+    assert same(df[column].apply(ref), fast(df[column]))
@@ -1,37 +1,25 @@
 # user_dashboard.py
-import sqlite3
 import pandas as pd
-from pathlib import Path
 
-# -----------------------------
-# DATABASE PATH (SINGLE SOURCE)
-# -----------------------------
-DB_PATH = Path("C:/Users/Chandu/OneDrive/Desktop/NutriMatch/nutrimatchDB.db")
-
-
-def get_connection():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+import db
+from NM_timing import timed
 
 
 # -----------------------------
 # USER SUMMARY
 # -----------------------------
+@timed("db.dashboard.summary")
 def get_user_summary(user_id):
-    conn = get_connection()
-
-    df = pd.read_sql(
-        """
-        SELECT
-            COUNT(*) AS total_interactions,
-            COUNT(DISTINCT food_name) AS unique_foods
-        FROM user_interactions
-        WHERE user_id = ?
-        """,
-        conn,
-        params=(user_id,)
-    )
-
-    conn.close()
+    with db.connection() as conn:
+        df = pd.read_sql(
+            """
+            SELECT total_interactions, unique_foods
+            FROM user_summary
+            WHERE user_id = ?
+            """,
+            conn,
+            params=(user_id,)
+        )
 
     if df.empty:
         return pd.Series(
@@ -44,23 +32,21 @@ def get_user_summary(user_id):
 # -----------------------------
 # TOP SNACKS
 # -----------------------------
+@timed("db.dashboard.top_snacks")
 def get_top_snacks(user_id, limit=5):
-    conn = get_connection()
-
-    df = pd.read_sql(
-        """
-        SELECT food_name, SUM(interaction_weight) AS score
-        FROM user_interactions
-        WHERE user_id = ?
-        GROUP BY food_name
-        ORDER BY score DESC
-        LIMIT ?
-        """,
-        conn,
-        params=(user_id, limit)
-    )
-
-    conn.close()
+    with db.connection() as conn:
+        df = pd.read_sql(
+            """
+            SELECT f.food_name, s.score
+            FROM user_food_scores s
+            JOIN foods f ON f.food_id = s.food_id
+            WHERE s.user_id = ?
+            ORDER BY s.score DESC
+            LIMIT ?
+            """,
+            conn,
+            params=(user_id, limit)
+        )
 
     return df if not df.empty else pd.DataFrame(
         columns=["food_name", "score"]
@@ -70,22 +56,21 @@ def get_top_snacks(user_id, limit=5):
 # -----------------------------
 # RECENT ACTIVITY
 # -----------------------------
+@timed("db.dashboard.recent_activity")
 def get_recent_activity(user_id, limit=5):
-    conn = get_connection()
-
-    df = pd.read_sql(
-        """
-        SELECT food_name, interaction_type, timestamp
-        FROM user_interactions
-        WHERE user_id = ?
-        ORDER BY timestamp DESC
-        LIMIT ?
-        """,
-        conn,
-        params=(user_id, limit)
-    )
-
-    conn.close()
+    with db.connection() as conn:
+        df = pd.read_sql(
+            """
+            SELECT f.food_name, i.interaction_type, i.timestamp
+            FROM interactions i
+            JOIN foods f ON f.food_id = i.food_id
+            WHERE i.user_id = ?
+            ORDER BY i.timestamp DESC
+            LIMIT ?
+            """,
+            conn,
+            params=(user_id, limit)
+        )
 
     return df if not df.empty else pd.DataFrame(
         columns=["food_name", "interaction_type", "timestamp"]